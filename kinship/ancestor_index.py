@@ -0,0 +1,188 @@
+from array import array
+from collections import OrderedDict
+from typing import List, Optional
+
+from .graph import KinshipGraph
+from .tables import NO_ROW
+
+# Cap for the bitsets a lazily filled index keeps
+DEFAULT_MAX_BYTES = 256 << 20
+
+
+class AncestorIndex:
+    """
+    Ancestor closure of every individual as an int bitset, so common ancestors of two people are one AND.
+
+    Bits are numbered in an ancestor-first order of the parent edges, so an individual's ancestors
+    all have lower bit positions than the individual, which keeps the ints short for the founders of a tree.
+
+    By default every bitset is built up front, parents before children. With lazy=True a bitset is built
+    the first time it is needed, and with max_bytes the cached bitsets are also capped, evicting
+    the least recently used (they are rebuilt from their parents' bitsets when needed again).
+    """
+
+    def __init__(self, graph: KinshipGraph, lazy: bool = False, max_bytes: Optional[int] = None):
+        self.graph = graph
+        self.max_bytes = max_bytes
+        self.rank, self.order = self._ancestor_first_order()
+        self.cached_bytes = 0
+        self._closure = None  # node -> bitset, when built up front
+        self._cache = None  # node -> bitset, least recently used first
+        if lazy or max_bytes is not None:
+            self._cache = OrderedDict()
+        else:
+            self._build()
+
+    def _ancestor_first_order(self):
+        """Depth-first post-order along the parent edges: (rank of each node, nodes by rank)."""
+        self.graph.parents_csr.compact()
+        offsets, targets = self.graph.parents_csr.offsets, self.graph.parents_csr.targets
+        n = len(self.graph.parents_csr)
+        rank = array("q", [NO_ROW]) * n
+        order = array("q")
+        state = bytearray(n)  # 0 unseen, 1 on the stack, 2 ranked
+        for root in range(n):
+            if state[root]:
+                continue
+            state[root] = 1
+            stack = [[root, offsets[root]]]
+            while stack:
+                top = stack[-1]
+                node, i = top
+                if i < offsets[node + 1]:
+                    top[1] += 1
+                    parent = targets[i]
+                    if parent != NO_ROW and not state[parent]:
+                        state[parent] = 1
+                        stack.append([parent, offsets[parent]])
+                else:
+                    stack.pop()
+                    state[node] = 2
+                    rank[node] = len(order)
+                    order.append(node)
+        return rank, order
+
+    def _parent_bits(self, node: int, closure) -> int:
+        """Bitset of node's ancestors from its parents' bitsets. Parents without one (a parent cycle) are skipped."""
+        rank = self.rank
+        bits = 0
+        for parent in self.graph.parents(node):
+            if parent != NO_ROW:
+                parent_bits = closure(parent)
+                if parent_bits is not None:
+                    bits |= parent_bits | (1 << rank[parent])
+        return bits
+
+    def _build(self):
+        closure = [0] * len(self.order)
+        for node in self.order:
+            closure[node] = self._parent_bits(node, closure.__getitem__)
+        self._closure = closure
+
+    def _store(self, node: int, bits: int):
+        self._cache[node] = bits
+        self.cached_bytes += (bits.bit_length() + 7) // 8
+        if self.max_bytes is not None:
+            while self.cached_bytes > self.max_bytes and len(self._cache) > 1:
+                _, evicted = self._cache.popitem(last=False)
+                self.cached_bytes -= (evicted.bit_length() + 7) // 8
+
+    def ancestors(self, node: int) -> int:
+        """Bitset of all ancestors of node, excluding node itself."""
+        if node is None or not 0 <= node < len(self.rank):
+            return 0
+        if self._closure is not None:
+            return self._closure[node]
+        bits = self._cache.get(node)
+        if bits is not None:
+            self._cache.move_to_end(node)
+            return bits
+
+        # Build the bitsets of node and of its ancestors that are not cached, parents first
+        needed = [node]
+        seen = {node}
+        for current in needed:
+            for parent in self.graph.parents(current):
+                if parent != NO_ROW and parent not in seen and parent not in self._cache:
+                    seen.add(parent)
+                    needed.append(parent)
+        needed.sort(key=self.rank.__getitem__)
+        built = {}
+        for current in needed:
+            built[current] = self._parent_bits(
+                current, lambda parent: built.get(parent, self._cache.get(parent)))
+        for current in needed:
+            self._store(current, built[current])
+        return built[node]
+
+    @property
+    def complete(self) -> bool:
+        """True when every bitset was built up front, rather than on first use."""
+        return self._closure is not None
+
+    """ Queries """
+
+    def nodes(self, bits: int) -> List[int]:
+        """Nodes of a bitset, in ancestor-first order."""
+        digits = bin(bits)[:1:-1]  # least significant bit first
+        order = self.order
+        found = []
+        i = digits.find("1")
+        while i != -1:
+            found.append(order[i])
+            i = digits.find("1", i + 1)
+        return found
+
+    def bit(self, node: int) -> int:
+        return 1 << self.rank[node]
+
+    def is_ancestor(self, ancestor: int, node: int) -> bool:
+        return bool(self.ancestors(node) >> self.rank[ancestor] & 1)
+
+    def common_ancestors(self, node1: int, node2: int) -> int:
+        """
+        Bitset of the common ancestors of two individuals. Each counts as their own ancestor here,
+        so a parent is the common ancestor of themself and their child.
+        """
+        if node1 is None or node2 is None or not 0 <= node1 < len(self.rank) or not 0 <= node2 < len(self.rank):
+            return 0
+        return (self.ancestors(node1) | self.bit(node1)) & (self.ancestors(node2) | self.bit(node2))
+
+    def most_recent_common_ancestors(self, node1: int, node2: int) -> List[int]:
+        """
+        Common ancestors that are not an ancestor of another common ancestor,
+        the most recent generation (by the graph's cached generation depths) first.
+        """
+        common = self.common_ancestors(node1, node2)
+        lowest = common
+        # Latest first: an ancestor already removed is covered by the descendant that removed it
+        for node in reversed(self.nodes(common)):
+            if lowest >> self.rank[node] & 1:
+                lowest &= ~self.ancestors(node)
+        generations = self.graph.generations()
+        rank = self.rank
+        return sorted(self.nodes(lowest), key=lambda node: (-generations[node], rank[node]))
+
+    def distance(self, node: int, ancestor: int) -> Optional[int]:
+        """
+        Fewest parent steps from node up to ancestor, or None if it is not node's ancestor.
+        Only the lines that lead to the ancestor are walked.
+        """
+        if node == ancestor:
+            return 0
+        if not self.is_ancestor(ancestor, node):
+            return None
+        ancestor_rank = self.rank[ancestor]
+        frontier, seen, steps = [node], {node}, 0
+        while frontier:
+            steps += 1
+            next_frontier = []
+            for current in frontier:
+                for parent in self.graph.parents(current):
+                    if parent == ancestor:
+                        return steps
+                    if parent != NO_ROW and parent not in seen and self.ancestors(parent) >> ancestor_rank & 1:
+                        seen.add(parent)
+                        next_frontier.append(parent)
+            frontier = next_frontier
+        return None
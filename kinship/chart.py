@@ -3,7 +3,7 @@ from .relationship_manager import RelationshipManager
 
 def draw_family_tree(rm: RelationshipManager):
     # Get data from parser
-    relationships = rm.relationships
+    relationships = rm.iter_relationships()
     individuals = rm.individuals
 
     # Determine generations based on relationships
@@ -63,9 +63,8 @@ def draw_family_tree(rm: RelationshipManager):
         G.add_edge(husband, wife, style="dashed", color="black", constraint="false")
 
     # Isolate unrelated individuals
-    for ind_id in individuals.keys():
-        if not rm.is_connected(ind_id):
-            G.add_node(ind_id, group="isolated")
+    for ind_id in rm.isolated_individuals():
+        G.add_node(ind_id, group="isolated")
 
     # Use hierarchical layout
     G.layout(prog="dot")
@@ -0,0 +1,132 @@
+from array import array
+from collections.abc import Mapping
+from typing import Iterable, Iterator, List, Optional
+
+from .id_table import IdTable
+from .tables import NO_ROW, TableView
+
+
+class ComponentIndex:
+    """
+    Connected components of individuals linked through families: spouses, parents and children of a family
+    all fall in one component. Built by union-find in one pass over the families; families added later
+    are joined in with union(). Components are numbered largest first, on first use after a change.
+    """
+
+    def __init__(self, n: int, family_members: Iterable[Iterable[int]]):
+        self.parent = array("q", range(n))
+        self.size = array("q", [1]) * n
+        self._numbered = None  # (component of each node, size of each component), see _number()
+        self._members = None  # component -> nodes, built on first use
+        for members in family_members:
+            self.union(members)
+
+    def find(self, node: int) -> int:
+        parent = self.parent
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:  # Path compression
+            parent[node], node = root, parent[node]
+        return root
+
+    def union(self, members: Iterable[int]):
+        """Join the components of members, skipping NO_ROW."""
+        parent, size = self.parent, self.size
+        first = None
+        for member in members:
+            if member == NO_ROW:
+                continue
+            if first is None:
+                first = self.find(member)
+                continue
+            root = self.find(member)
+            if root != first:
+                # Union by size, keeping first as the root
+                if size[root] > size[first]:
+                    root, first = first, root
+                parent[root] = first
+                size[first] += size[root]
+                self._numbered = self._members = None
+
+    def grow(self, n: int):
+        """Add nodes in components of their own up to n."""
+        if n > len(self.parent):
+            self.parent.extend(range(len(self.parent), n))
+            self.size.extend([1] * (n - len(self.size)))
+            self._numbered = self._members = None
+
+    def _number(self):
+        if self._numbered is None:
+            n = len(self.parent)
+            roots = {}
+            for node in range(n):
+                root = self.find(node)
+                roots[root] = self.size[root]
+            ordered = sorted(roots, key=lambda root: (-roots[root], root))
+            numbers = {root: number for number, root in enumerate(ordered)}
+            self._numbered = (array("q", (numbers[self.find(node)] for node in range(n))),
+                              array("q", (roots[root] for root in ordered)))
+        return self._numbered
+
+    @property
+    def components(self) -> array:
+        """Component number of each node."""
+        return self._number()[0]
+
+    @property
+    def sizes(self) -> array:
+        """Size of each component, largest first."""
+        return self._number()[1]
+
+    @classmethod
+    def from_data(cls, families: Mapping, ids: IdTable) -> "ComponentIndex":
+        """Build from whatever families a FamilyTreeData holds: a table view or a mapping of Family objects."""
+        if isinstance(families, TableView) and ids is families.table.individuals.ids:
+            table = families.table
+            husbands, wives, offsets, children = table.husbands, table.wives, table.child_offsets, table.children
+
+            def table_members() -> Iterator[List[int]]:
+                for row in table.rows():
+                    yield [husbands[row], wives[row], *children[offsets[row]:offsets[row + 1]]]
+
+            return cls(len(ids), table_members())
+
+        def node(xref_id) -> int:
+            number = ids.get(xref_id)
+            return NO_ROW if number is None else number
+
+        def family_members() -> Iterator[List[int]]:
+            for family in families.values():
+                yield [node(family.husband_id), node(family.wife_id), *(node(child.id) for child in family.children)]
+
+        return cls(len(ids), family_members())
+
+    def component_of(self, node: int) -> Optional[int]:
+        if node is None or not 0 <= node < len(self.components):
+            return None
+        return self.components[node]
+
+    def size_of(self, node: int) -> int:
+        if node is None or not 0 <= node < len(self.parent):
+            return 0
+        return self.size[self.find(node)]
+
+    def members(self, component: int) -> List[int]:
+        if self._members is None:
+            self._members = [[] for _ in self.sizes]
+            for node, number in enumerate(self.components):
+                self._members[number].append(node)
+        return self._members[component]
+
+    def __iter__(self) -> Iterator[List[int]]:
+        """Nodes of each component, largest component first."""
+        for component in range(len(self.sizes)):
+            yield self.members(component)
+
+    def isolated(self) -> List[int]:
+        """Nodes in a component of their own."""
+        return [node for node in range(len(self.parent)) if self.size[self.find(node)] == 1]
+
+    def __len__(self) -> int:
+        return len(self.sizes)
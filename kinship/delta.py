@@ -0,0 +1,80 @@
+import hashlib
+from typing import Dict, Optional, Set
+
+from .gedcom_index import GedcomIndex, RecordTable
+from .gedcom_reader import decode_individual, family_refs
+from .individual import Individual
+
+# Record type -> xref_id -> digest of the record's bytes
+RecordDigests = Dict[str, Dict[str, bytes]]
+
+INDI = "INDI"
+FAM = "FAM"
+
+
+def _table_digests(index: GedcomIndex, table: RecordTable) -> Dict[str, bytes]:
+    offsets, lengths = table.offsets, table.lengths
+    return {xref_id: hashlib.blake2b(index.record_bytes(offsets[row], lengths[row]), digest_size=16).digest()
+            for xref_id, row in table.rows.items()}
+
+
+def record_digests(index: GedcomIndex) -> RecordDigests:
+    """Digest of every INDI and FAM record of an indexed GEDCOM file, hashed straight from the memory map."""
+    return {INDI: _table_digests(index, index.individual_table), FAM: _table_digests(index, index.family_table)}
+
+
+class Changeset:
+    """
+    INDI and FAM records added, modified or removed between two exports of a GEDCOM file, found by comparing
+    record digests. Only the added and modified records are decoded: individuals to Individual objects and
+    families to their unresolved (xref_id, husband_id, wife_id, child_ids, marr_date) refs.
+    """
+
+    def __init__(self, digests: RecordDigests):
+        self.digests = digests  # of the new export, to diff the next one against
+        self.added_individuals: Set[str] = set()
+        self.modified_individuals: Set[str] = set()
+        self.removed_individuals: Set[str] = set()
+        self.added_families: Set[str] = set()
+        self.modified_families: Set[str] = set()
+        self.removed_families: Set[str] = set()
+        self.individuals: Dict[str, Individual] = {}  # added and modified, in file order
+        self.families: Dict[str, tuple] = {}
+
+    @classmethod
+    def from_index(cls, index: GedcomIndex, previous: Optional[RecordDigests]) -> "Changeset":
+        """Diff an indexed export against the digests of the previous one; no digests means every record is new."""
+        changeset = cls(record_digests(index))
+        previous = previous or {INDI: {}, FAM: {}}
+        for tag, added, modified, removed in (
+                (INDI, changeset.added_individuals, changeset.modified_individuals, changeset.removed_individuals),
+                (FAM, changeset.added_families, changeset.modified_families, changeset.removed_families)):
+            old, new = previous.get(tag, {}), changeset.digests[tag]
+            for xref_id, digest in new.items():
+                before = old.get(xref_id)
+                if before is None:
+                    added.add(xref_id)
+                elif before != digest:
+                    modified.add(xref_id)
+            removed.update(xref_id for xref_id in old if xref_id not in new)
+
+        for xref_id in index.individual_table.rows:
+            if xref_id in changeset.added_individuals or xref_id in changeset.modified_individuals:
+                raw = index.raw_record(*index.individual_table.span(xref_id))
+                changeset.individuals[xref_id] = decode_individual(raw, index.codec)
+        for xref_id in index.family_table.rows:
+            if xref_id in changeset.added_families or xref_id in changeset.modified_families:
+                raw = index.raw_record(*index.family_table.span(xref_id))
+                changeset.families[xref_id] = family_refs(raw, index.codec)
+        return changeset
+
+    def __len__(self) -> int:
+        """Number of changed records."""
+        return sum(len(changed) for changed in (
+            self.added_individuals, self.modified_individuals, self.removed_individuals,
+            self.added_families, self.modified_families, self.removed_families))
+
+    def __str__(self):
+        return (f"Individuals: {len(self.added_individuals)} added, {len(self.modified_individuals)} modified, "
+                f"{len(self.removed_individuals)} removed. Families: {len(self.added_families)} added, "
+                f"{len(self.modified_families)} modified, {len(self.removed_families)} removed.")
@@ -0,0 +1,199 @@
+from array import array
+from collections.abc import Sequence
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+from .id_table import IdTable
+from .tables import NO_ROW
+
+PARENT_CHILD = "parent-child"
+SPOUSE = "spouse"
+SIBLING = "sibling"
+STEP_PARENT = "step-parent"
+RELATIONSHIP_TYPES = (PARENT_CHILD, SPOUSE, SIBLING, STEP_PARENT)
+
+
+class EdgeTable(Sequence):
+    """
+    Relationships stored as parallel arrays: source node, target node and relationship type code,
+    with nodes numbered by an IdTable (NO_ROW for a missing individual).
+
+    Indexing and iterating return {"Source", "Target", "Relationship"} dicts, so the table can stand in
+    for the list of dicts callers used before. Filtering by type and looking up the edges of a node use
+    indexes built on first use, without creating a dict per row.
+    """
+
+    def __init__(self, ids: IdTable, sources: array = None, targets: array = None, types: array = None,
+                 type_names: Iterable[str] = RELATIONSHIP_TYPES):
+        self.ids = ids
+        self.sources = sources if sources is not None else array("q")
+        self.targets = targets if targets is not None else array("q")
+        self.types = types if types is not None else array("b")
+        self.type_names: List[str] = list(type_names)
+        self._type_codes = {name: code for code, name in enumerate(self.type_names)}
+        self._by_type = None  # (edge indices grouped by type, offsets per type code)
+        self._by_node = None  # (edge indices grouped by node, offsets per node)
+
+    @classmethod
+    def from_rows(cls, ids: IdTable, rows: Iterable[dict]) -> "EdgeTable":
+        edges = cls(ids)
+        for row in rows:
+            edges.append(row["Source"], row["Target"], row["Relationship"])
+        return edges
+
+    def type_code(self, relationship: str) -> int:
+        """Code of a relationship type, registering types outside RELATIONSHIP_TYPES as they are seen."""
+        code = self._type_codes.get(relationship)
+        if code is None:
+            code = self._type_codes[relationship] = len(self.type_names)
+            self.type_names.append(relationship)
+        return code
+
+    def add(self, source: int, target: int, code: int):
+        """Append an edge between node numbers."""
+        self.sources.append(source)
+        self.targets.append(target)
+        self.types.append(code)
+        self._by_type = self._by_node = None
+
+    def append(self, source_id: Optional[str], target_id: Optional[str], relationship: str):
+        """Append an edge between xref ids."""
+        source, target = self.ids.intern(source_id), self.ids.intern(target_id)
+        self.add(NO_ROW if source is None else source, NO_ROW if target is None else target,
+                 self.type_code(relationship))
+
+    def remove_edges_of(self, nodes: Set[int], relationships: Iterable[str] = RELATIONSHIP_TYPES):
+        """
+        Remove the edges of the given relationship types with an endpoint in nodes. The edges are found by
+        searching the bytes of the node arrays and the arrays rebuilt from the slices between them,
+        so the cost in Python grows with the nodes and their edges rather than with the table.
+        """
+        codes = {self._type_codes[relationship] for relationship in relationships if relationship in self._type_codes}
+        types = self.types
+        doomed = sorted({i for values in (self.sources, self.targets) for i in _positions(values, nodes)
+                         if types[i] in codes})
+        if not doomed:
+            return
+        self.sources, self.targets, self.types = (_without(values, doomed)
+                                                  for values in (self.sources, self.targets, self.types))
+        self._by_type = self._by_node = None
+
+    """ Indexes """
+
+    @staticmethod
+    def _group(keys: array, n_keys: int):
+        """Stable counting sort of edge indices by key. Returns (indices, offsets)."""
+        offsets = array("q", bytes(8 * (n_keys + 1)))
+        for key in keys:
+            offsets[key + 1] += 1
+        for key in range(n_keys):
+            offsets[key + 1] += offsets[key]
+        indices = array("q", bytes(8 * len(keys)))
+        position = offsets[:-1]
+        for i, key in enumerate(keys):
+            indices[position[key]] = i
+            position[key] += 1
+        return indices, offsets
+
+    def of_type(self, relationship: str) -> array:
+        """Indices of the edges of one relationship type, in table order."""
+        code = self._type_codes.get(relationship)
+        if code is None:
+            return array("q")
+        if self._by_type is None:
+            self._by_type = self._group(self.types, len(self.type_names))
+        indices, offsets = self._by_type
+        return indices[offsets[code]:offsets[code + 1]]
+
+    def pairs(self, relationship: str) -> Iterator[Tuple[int, int]]:
+        """(source, target) node numbers of the edges of one relationship type."""
+        sources, targets = self.sources, self.targets
+        for i in self.of_type(relationship):
+            yield sources[i], targets[i]
+
+    def edges_of(self, node: int) -> array:
+        """Indices of the edges with node as source or target."""
+        if node is None or node < 0:
+            return array("q")
+        if self._by_node is None or len(self._by_node[1]) != len(self.ids) + 2:
+            n = len(self.ids)
+            # Both endpoints of each edge, shifted so NO_ROW groups under key 0
+            keys = array("q", bytes(8 * 2 * len(self.sources)))
+            keys[0::2] = array("q", (source + 1 for source in self.sources))
+            keys[1::2] = array("q", (target + 1 for target in self.targets))
+            indices, offsets = self._group(keys, n + 1)
+            self._by_node = (array("q", (i // 2 for i in indices)), offsets)
+        indices, offsets = self._by_node
+        if node + 2 >= len(offsets):
+            return array("q")
+        return indices[offsets[node + 1]:offsets[node + 2]]
+
+    def degree(self, node: int) -> int:
+        return len(self.edges_of(node))
+
+    """ Rows """
+
+    def xref_rows(self) -> Iterator[Tuple[Optional[str], Optional[str], str]]:
+        """(source id, target id, relationship) tuples, for exporting without dict rows."""
+        xrefs, names = self.ids.xrefs, self.type_names
+        for source, target, code in zip(self.sources, self.targets, self.types):
+            yield (None if source == NO_ROW else xrefs[source],
+                   None if target == NO_ROW else xrefs[target],
+                   names[code])
+
+    def row(self, i: int) -> dict:
+        source, target = self.sources[i], self.targets[i]
+        return {
+            "Source": None if source == NO_ROW else self.ids.xrefs[source],
+            "Target": None if target == NO_ROW else self.ids.xrefs[target],
+            "Relationship": self.type_names[self.types[i]],
+        }
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.row(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("edge index out of range")
+        return self.row(i)
+
+    def __iter__(self):
+        for source, target, relationship in self.xref_rows():
+            yield {"Source": source, "Target": target, "Relationship": relationship}
+
+    def __len__(self):
+        return len(self.types)
+
+    def __eq__(self, other):
+        if isinstance(other, EdgeTable):
+            return list(self.xref_rows()) == list(other.xref_rows())
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    __hash__ = None
+
+
+def _positions(values: array, wanted: Iterable[int]) -> Iterator[int]:
+    """Indices of the entries of values equal to one of wanted, found with bytes.find instead of a loop per entry."""
+    data, size = values.tobytes(), values.itemsize
+    for value in wanted:
+        pattern = array(values.typecode, [value]).tobytes()
+        i = data.find(pattern)
+        while i != -1:
+            if i % size:
+                # Straddles two entries
+                i = data.find(pattern, i + 1)
+                continue
+            yield i // size
+            i = data.find(pattern, i + size)
+
+
+def _without(values: array, indices: List[int]) -> array:
+    """Copy of an array without the entries at indices, which are sorted."""
+    kept, start = array(values.typecode), 0
+    for i in indices:
+        kept.extend(values[start:i])
+        start = i + 1
+    kept.extend(values[start:])
+    return kept
@@ -3,6 +3,8 @@ from .util import normalize_id, date_string
 from .individual import Individual
 
 class Family:
+    __slots__ = ("id", "husband_name", "husband_id", "wife_name", "wife_id", "marr_date", "children")
+
     def __init__(
         self,
         xref_id: str,
@@ -19,5 +21,22 @@ class Family:
         self.marr_date = date_string(marr_date)
         self.children = children if children else []
 
+    @classmethod
+    def from_individuals(
+        cls,
+        xref_id: str,
+        husband: Individual = None,
+        wife: Individual = None,
+        marr_date=None,
+        children: List[Individual] = None,
+    ):
+        """Build a Family from kinship Individuals rather than ged4py records."""
+        fam = cls(xref_id, marr_date=marr_date, children=children)
+        fam.husband_name = husband.full_name if husband else None
+        fam.husband_id = husband.id if husband else None
+        fam.wife_name = wife.full_name if wife else None
+        fam.wife_id = wife.id if wife else None
+        return fam
+
     def __str__(self):
         return f"Family: {self.id}\n{self.husband_name} ({self.husband_id}) + {self.wife_name} ({self.wife_id}) m{self.marr_date}\n{self.children}\n"
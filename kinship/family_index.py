@@ -0,0 +1,105 @@
+from array import array
+from collections.abc import Mapping
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .graph import CSR
+from .id_table import IdTable
+from .tables import NO_ROW, TableView
+
+# (family id, husband row, wife row, child rows) of one family
+_Members = Tuple[str, int, int, List[int]]
+
+
+class FamilyIndex:
+    """
+    Families of each individual: those listing them as a child (GEDCOM FAMC) and those listing them
+    as husband or wife (FAMS), one CSR each from individual rows to family numbers.
+    Families are numbered in the order of the families mapping, so lookups return them in file order.
+    Families added later are numbered after them, and a removed family leaves its number unused (None).
+    """
+
+    def __init__(self, family_ids: List[Optional[str]], as_child: CSR, as_spouse: CSR):
+        self.family_ids = family_ids
+        self.numbers = {family_id: number for number, family_id in enumerate(family_ids)}
+        self.as_child_csr = as_child
+        self.as_spouse_csr = as_spouse
+
+    @classmethod
+    def from_data(cls, families: Mapping, ids: IdTable) -> "FamilyIndex":
+        """Build from whatever families a FamilyTreeData holds: a table view or a mapping of Family objects."""
+        if isinstance(families, TableView) and ids is families.table.individuals.ids:
+            table = families.table
+            husbands, wives, offsets, children = table.husbands, table.wives, table.child_offsets, table.children
+
+            def members() -> Iterator[_Members]:
+                for row in table.rows():
+                    yield table.ids.xrefs[row], husbands[row], wives[row], children[offsets[row]:offsets[row + 1]]
+        else:
+            def node(xref_id) -> int:
+                number = ids.get(xref_id)
+                return NO_ROW if number is None else number
+
+            def members() -> Iterator[_Members]:
+                for family_id, family in families.items():
+                    yield (family_id, node(family.husband_id), node(family.wife_id),
+                           [node(child.id) for child in family.children])
+
+        family_ids = []
+        child_sources, child_targets = array("q"), array("q")
+        spouse_sources, spouse_targets = array("q"), array("q")
+        for number, (family_id, husband, wife, child_rows) in enumerate(members()):
+            family_ids.append(family_id)
+            for child in child_rows:
+                if child != NO_ROW:
+                    child_sources.append(child)
+                    child_targets.append(number)
+            for spouse in (husband, wife):
+                if spouse != NO_ROW:
+                    spouse_sources.append(spouse)
+                    spouse_targets.append(number)
+        n = len(ids)
+        return cls(family_ids, CSR.from_edges(n, child_sources, child_targets),
+                   CSR.from_edges(n, spouse_sources, spouse_targets))
+
+    def number(self, family_id: str) -> int:
+        """Number of a family, numbering it after every other family if it is new."""
+        number = self.numbers.get(family_id)
+        if number is None:
+            number = self.numbers[family_id] = len(self.family_ids)
+            self.family_ids.append(family_id)
+        return number
+
+    def update(self, family_id: str, old_members: Tuple[Iterable[int], Iterable[int]],
+               new_members: Tuple[Iterable[int], Iterable[int]]):
+        """
+        Move a family's entries from its old (spouses, children) to its new ones.
+        Use new_members of ((), ()) for a removed family.
+        """
+        number = self.number(family_id)
+        for csr, old, new in ((self.as_spouse_csr, old_members[0], new_members[0]),
+                              (self.as_child_csr, old_members[1], new_members[1])):
+            old, new = set(old) - {NO_ROW}, set(new) - {NO_ROW}
+            for node in old - new:
+                csr.set_neighbors(node, set(csr.neighbors(node)) - {number})
+            for node in new - old:
+                csr.set_neighbors(node, set(csr.neighbors(node)) | {number})
+
+    def remove(self, family_id: str):
+        number = self.numbers.pop(family_id, None)
+        if number is not None:
+            self.family_ids[number] = None
+
+    def grow(self, n: int):
+        self.as_child_csr.grow(n)
+        self.as_spouse_csr.grow(n)
+
+    def as_child(self, node: int) -> List[str]:
+        return [self.family_ids[family] for family in self.as_child_csr.neighbors(node)]
+
+    def as_spouse(self, node: int) -> List[str]:
+        return [self.family_ids[family] for family in self.as_spouse_csr.neighbors(node)]
+
+    def first(self, node: int) -> Optional[str]:
+        """The first family listing node in either role, or None."""
+        families = list(self.as_child_csr.neighbors(node)) + list(self.as_spouse_csr.neighbors(node))
+        return self.family_ids[min(families)] if families else None
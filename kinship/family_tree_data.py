@@ -1,6 +1,9 @@
 
-from archive.poc_gpt import calculate_relationship
+from kinship.components import ComponentIndex
 from kinship.gedcom_parser import GedcomParser
+from kinship.id_table import IdTable
+from kinship.snapshot import load_snapshot, save_snapshot
+from kinship.sqlite_store import SqliteStore, save_sqlite
 
 
 class FamilyTreeData:
@@ -12,6 +15,10 @@ class FamilyTreeData:
         self.individuals = {}  # Dictionary of individual_id -> individual details
         self.families = {}  # Dictionary of family_id -> family details
         self.relationships = []  # Dictionary of individual_id -> list of relationships
+        self.ids = None  # IdTable numbering the individuals, when loaded from a parser or snapshot
+        self.analyses = {}  # Whole-tree results of RelationshipManager, e.g. inbreeding coefficients
+        self.record_digests = None  # Digests of the GEDCOM records loaded, to diff the next export against
+        self.store = None  # SqliteStore the individuals and families are read from, see load_sqlite()
 
     def load_from_gedcom(self, gedcom_parser: GedcomParser):
         """
@@ -20,6 +27,52 @@ class FamilyTreeData:
         self.individuals = gedcom_parser.get_individuals()
         self.families = gedcom_parser.get_families()
         self.relationships = gedcom_parser.get_relationships()
+        self.ids = gedcom_parser.ids
+        self.record_digests = gedcom_parser.record_digests
+        return self
+
+    def load_snapshot(self, path):
+        """
+        Load data from a binary snapshot written by save_snapshot().
+        Raises SnapshotError if the snapshot is unreadable or from another format version.
+        """
+        load_snapshot(self, path)
+        return self
+
+    def save_snapshot(self, path):
+        """
+        Save the data, including any analyses computed so far, as a binary snapshot.
+        """
+        save_snapshot(self, path)
+
+    def save_sqlite(self, path):
+        """
+        Save the data as a SQLite database, for load_sqlite() or for several processes to share.
+        """
+        save_sqlite(self, path)
+
+    def load_sqlite(self, path):
+        """
+        Open a SQLite database written by save_sqlite(). Individuals and families become views that read
+        a record when it is looked up, and RelationshipManager answers ancestor and descendant queries in SQL.
+        Relationships stay in the database, see SqliteStore.relationships_of().
+        Raises SqliteError if the file is not a kinship database of the current schema version.
+        """
+        self.store = SqliteStore(path)
+        self.individuals = self.store.individuals
+        self.families = self.store.families
+        self.relationships = []
+        self.ids = None
+        return self
+
+    def load_from_index(self, gedcom_index):
+        """
+        Load lazy views from a GedcomIndex; records are decoded only when looked up.
+        Relationships are not generated, since that would decode every record.
+        """
+        self.individuals = gedcom_index.individuals
+        self.families = gedcom_index.families
+        self.relationships = []
         return self
 
     def load_from_processed_files(self, individuals_file, families_file, relationships_file):
@@ -86,6 +139,7 @@ class FamilyTreeData:
         try:
             return individual_id2 in self.get_relationships(individual_id1)
         except KeyError:
+            from archive.poc_gpt import calculate_relationship
             return calculate_relationship(individual_id1, individual_id2)
 
 
@@ -93,11 +147,10 @@ class FamilyTreeData:
         """
         Verify the integrity of the data.
         """
-        # Check for orphaned individuals (not part of any family or relationships)
-        orphaned_individuals = [
-            ind for ind in self.individuals.keys()
-            if ind not in self.relationships and not any(ind in fam for fam in self.families.values())
-        ]
+        # Check for orphaned individuals (sharing no family with anyone)
+        ids = self.ids if self.ids is not None else IdTable(self.individuals)
+        components = ComponentIndex.from_data(self.families, ids)
+        orphaned_individuals = [ind for ind in self.individuals.keys() if components.size_of(ids.get(ind)) <= 1]
         if orphaned_individuals:
             raise ValueError(f"Orphaned individuals detected: {orphaned_individuals}")
 
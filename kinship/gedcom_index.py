@@ -0,0 +1,208 @@
+import io
+import mmap
+import os
+import pickle
+import re
+from array import array
+from collections.abc import Mapping
+from typing import Dict
+
+from .gedcom_reader import INDI, FAM, open_gedcom, scan_records, decode_individual, family_refs, build_family
+from .util import normalize_id
+
+INDEX_VERSION = 2
+INDEX_MAGIC = b"KINIDX\n"
+INDEX_SUFFIX = ".kidx"
+
+_RECORD0 = re.compile(rb"^[ \t]*0[ \t]+(?:(@[^@\r\n]+@)[ \t]+([A-Za-z0-9_]+))?", re.M)
+
+
+def _map(file):
+    """Memory-map an open file; mmap refuses an empty file, which maps to empty bytes instead."""
+    if os.fstat(file.fileno()).st_size == 0:
+        return b""
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _unmap(data):
+    if isinstance(data, mmap.mmap):
+        data.close()
+
+
+class RecordTable:
+    """xref_id -> (offset, length) table for one record type, kept in file order."""
+
+    def __init__(self, rows: Dict[str, int] = None, offsets: array = None, lengths: array = None):
+        self.rows = rows if rows is not None else {}  # xref_id -> row
+        self.offsets = offsets if offsets is not None else array("q")
+        self.lengths = lengths if lengths is not None else array("q")
+
+    def add(self, xref_id: str, offset: int, length: int):
+        if xref_id in self.rows:
+            # Later duplicates win, as they do when parsing
+            row = self.rows[xref_id]
+            self.offsets[row] = offset
+            self.lengths[row] = length
+            return
+        self.rows[xref_id] = len(self.offsets)
+        self.offsets.append(offset)
+        self.lengths.append(length)
+
+    def span(self, xref_id: str):
+        row = self.rows[xref_id]
+        return self.offsets[row], self.lengths[row]
+
+
+class LazyRecords(Mapping):
+    """
+    Read-only dict-like view that decodes a record the first time it is accessed.
+    Decoded records are kept, so repeated lookups return the same object.
+    """
+
+    def __init__(self, index: "GedcomIndex", table: RecordTable, decode):
+        self._index = index
+        self._table = table
+        self._decode = decode
+        self._cache = {}
+
+    def __getitem__(self, xref_id):
+        try:
+            return self._cache[xref_id]
+        except KeyError:
+            pass
+        offset, length = self._table.span(xref_id)
+        record = self._decode(self._index.raw_record(offset, length))
+        self._cache[xref_id] = record
+        return record
+
+    def __contains__(self, xref_id):
+        return xref_id in self._table.rows
+
+    def __iter__(self):
+        return iter(self._table.rows)
+
+    def __len__(self):
+        return len(self._table.rows)
+
+    @property
+    def materialized(self) -> int:
+        """Number of records decoded so far."""
+        return len(self._cache)
+
+
+class GedcomIndex:
+    """
+    Memory-mapped GEDCOM file with an xref_id -> (offset, length) index of its INDI and FAM records.
+    Records are decoded only when individuals[...] or families[...] is accessed.
+    """
+
+    def __init__(self, file_path, codec: str, individuals: RecordTable, families: RecordTable):
+        self.file_path = file_path
+        self.codec = codec
+        self._file = io.open(file_path, "rb")
+        self._data = _map(self._file)
+        self.individual_table = individuals
+        self.family_table = families
+        self.individuals = LazyRecords(self, individuals, self._decode_individual)
+        self.families = LazyRecords(self, families, self._decode_family)
+
+    @classmethod
+    def build(cls, file_path):
+        """Index a GEDCOM file in a single scan of its memory-mapped contents. An empty file has no records."""
+        if os.path.getsize(file_path) == 0:
+            return cls(file_path, "utf-8", RecordTable(), RecordTable())
+        file, codec = open_gedcom(file_path)
+        file.close()
+        individuals, families = RecordTable(), RecordTable()
+        with io.open(file_path, "rb") as file:
+            data = _map(file)
+            try:
+                previous = None
+                for match in _RECORD0.finditer(data):
+                    if previous is not None:
+                        previous[0].add(previous[1], previous[2], match.start() - previous[2])
+                    previous = None
+                    tag = match.group(2)
+                    if tag == INDI or tag == FAM:
+                        xref_id = normalize_id(match.group(1).decode(codec))
+                        previous = (individuals if tag == INDI else families, xref_id, match.start())
+                if previous is not None:
+                    previous[0].add(previous[1], previous[2], len(data) - previous[2])
+            finally:
+                _unmap(data)
+        return cls(file_path, codec, individuals, families)
+
+    @classmethod
+    def open(cls, file_path, index_path=None, save=True):
+        """
+        Open a GEDCOM file through its saved index, building (and saving) the index
+        when it is missing or the GEDCOM file has changed since it was written.
+        """
+        index_path = index_path or file_path + INDEX_SUFFIX
+        index = cls.load(file_path, index_path)
+        if index is None:
+            index = cls.build(file_path)
+            if save:
+                index.save(index_path)
+        return index
+
+    def save(self, index_path=None):
+        index_path = index_path or self.file_path + INDEX_SUFFIX
+        stat = os.stat(self.file_path)
+        payload = {
+            "version": INDEX_VERSION,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "codec": self.codec,
+            "individuals": (self.individual_table.rows, self.individual_table.offsets, self.individual_table.lengths),
+            "families": (self.family_table.rows, self.family_table.offsets, self.family_table.lengths),
+        }
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(INDEX_MAGIC)
+            pickle.dump(payload, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def load(cls, file_path, index_path):
+        """
+        Load a saved index, or return None if it is missing, from another version, stale or unreadable,
+        e.g. truncated by an interrupted write, so the caller rebuilds it.
+        """
+        try:
+            with open(index_path, "rb") as file:
+                if file.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                    return None
+                payload = pickle.load(file)
+            stat = os.stat(file_path)
+            if payload["version"] != INDEX_VERSION or \
+                    payload["size"] != stat.st_size or payload["mtime_ns"] != stat.st_mtime_ns:
+                return None
+            individuals, families = RecordTable(*payload["individuals"]), RecordTable(*payload["families"])
+            codec = payload["codec"]
+        except Exception:
+            # Whatever a damaged or foreign file makes unpickling raise, it is only a cache
+            return None
+        return cls(file_path, codec, individuals, families)
+
+    def record_bytes(self, offset: int, length: int) -> bytes:
+        return self._data[offset:offset + length]
+
+    def raw_record(self, offset: int, length: int):
+        return next(scan_records(self.record_bytes(offset, length).splitlines()))
+
+    def _decode_individual(self, raw):
+        return decode_individual(raw, self.codec)
+
+    def _decode_family(self, raw):
+        return build_family(family_refs(raw, self.codec), self.individuals)
+
+    def close(self):
+        _unmap(self._data)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
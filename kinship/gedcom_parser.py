@@ -1,36 +1,136 @@
 import os
 import csv
 import datetime
-from typing import Dict, Set
+from typing import Dict, Iterator, Optional, Tuple
 from itertools import combinations
 from ged4py.parser import GedcomReader
 
 from .individual import Individual
 from .family import Family
+from .delta import Changeset, RecordDigests, record_digests
+from .gedcom_reader import read_gedcom, read_gedcom_parallel
+from .edges import EdgeTable, PARENT_CHILD, SPOUSE, SIBLING, STEP_PARENT
+from .gedcom_index import GedcomIndex
+from .graph import KinshipGraph
+from .id_table import IdTable
+from .tables import NO_ROW, TableView
 from .util import normalize_id
 
 
 class GedcomParser:
     def __init__(self, file_path):
         self.file_path = file_path
+        self.index = None
         self.base_gedcom_filename = os.path.splitext(os.path.basename(file_path))[0]
         self.individuals: Dict[str, Individual] = {}
         self.families: Dict[str, Family] = {}
         self.relationships = []
-        self.child_to_parents: Dict[str, Set[str]] = {}
-        self.parent_to_children: Dict[str, Set[str]] = {}
-        self.parent_to_step_children: Dict[str, Set[str]] = {}
-
-    def parse_gedcom_file(self):
-        with GedcomReader(self.file_path) as ged_parser:
-            for individual in ged_parser.records0("INDI"):
-                self.parse_individual(individual)
-            for family in ged_parser.records0("FAM"):
-                fam = self.parse_family(family)
-                for child in self.families[fam.id].children:
-                    self.child_to_parents[child.id] = {fam.husband_id, fam.wife_id}
-        self.parent_to_children = create_parent_to_children(self.families)
-        self.parent_to_step_children = create_parent_to_step_children(self.families, self.parent_to_children)
+        # Relationships are keyed by the integers in self.ids, not by xref ids
+        self.ids = IdTable()
+        self.record_digests: Optional[RecordDigests] = None  # of the file's INDI and FAM records, see hash_records()
+
+    def parse_gedcom_file(self, reader="stream", workers=None):
+        """
+        Parse the GEDCOM file into individuals and families.
+        :param reader: "stream" reads the file in a single line-level pass,
+                       "parallel" parses ranges of records in a process pool,
+                       "ged4py" walks the file with ged4py's record model (slower, kept for compatibility).
+        :param workers: Process pool size for the "parallel" reader, defaults to the number of CPUs.
+        """
+        if reader == "stream":
+            self.individuals, self.families = read_gedcom(self.file_path)
+        elif reader == "parallel":
+            self.individuals, self.families = read_gedcom_parallel(self.file_path, workers)
+        elif reader == "ged4py":
+            with GedcomReader(self.file_path) as ged_parser:
+                for individual in ged_parser.records0("INDI"):
+                    self.parse_individual(individual)
+                for family in ged_parser.records0("FAM"):
+                    self.parse_family(family)
+        else:
+            raise ValueError("Invalid reader. Choose 'stream', 'parallel' or 'ged4py'.")
+
+        if isinstance(self.individuals, TableView):
+            # Share row numbers with the individuals table
+            self.ids = self.individuals.table.ids
+        else:
+            self.ids = IdTable(self.individuals)
+
+    def load_from_data(self, data):
+        """
+        Restore parsed state from a FamilyTreeData, e.g. one loaded from a snapshot,
+        so the CSV writers can run without parsing the GEDCOM file again.
+        """
+        self.individuals = data.individuals
+        self.families = data.families
+        self.relationships = data.relationships
+        self.ids = data.ids
+        self.record_digests = data.record_digests
+        return self
+
+    def hash_records(self) -> RecordDigests:
+        """Digest every INDI and FAM record of the file, so the next export can be diffed against this one."""
+        with GedcomIndex.build(self.file_path) as index:
+            self.record_digests = record_digests(index)
+        return self.record_digests
+
+    def parse_delta(self) -> Changeset:
+        """
+        Delta ingest: diff the file against the record digests of the previous export (restored with
+        load_from_data()), decoding only the added and modified records. Records are found and hashed
+        straight from the memory-mapped file, so the cost beyond that scan grows with the changed records.
+        Apply the result with apply_changeset().
+        """
+        with GedcomIndex.build(self.file_path) as index:
+            changeset = Changeset.from_index(index, self.record_digests)
+        self.record_digests = changeset.digests
+        return changeset
+
+    def apply_changeset(self, changeset: Changeset, manager):
+        """
+        Apply a changeset to the tree through a RelationshipManager over the data restored with load_from_data(),
+        then patch the relationships the CSV is written from: the edges of the individuals the changeset touched
+        are regenerated from their families and the step-parents of the manager's patched graph.
+        """
+        touched = manager.apply_changeset(changeset)
+        edges = self.relationships
+        if not isinstance(edges, EdgeTable) or edges.ids is not self.ids or manager.ids is not self.ids:
+            self.relationships = []
+            self.get_relationships(manager.graph)
+            return
+        edges.remove_edges_of(touched, (PARENT_CHILD, SPOUSE, STEP_PARENT))
+        start = len(edges)
+        family_ids = {family_id for node in touched for family_id in
+                      (*manager.family_index.as_child(node), *manager.family_index.as_spouse(node))}
+        families = [self.families[family_id] for family_id in sorted(family_ids)]
+
+        def touches(source, target):
+            return source in touched or target in touched
+
+        self._add_family_edges(edges, families, touches)
+        # A step-parent is a spouse of a parent, so the step-parents of a touched node are among its parents' spouses
+        graph = manager.graph
+        step_parent = edges.type_code(STEP_PARENT)
+        for node in sorted(touched):
+            for child in graph.step_children(node):
+                edges.add(node, child, step_parent)
+            candidates = {spouse for parent in graph.known_parents(node) for spouse in graph.spouses(parent)}
+            for parent in sorted(candidates - touched):
+                if node in graph.step_children(parent):
+                    edges.add(parent, node, step_parent)
+        if manager.edges is edges:
+            manager.relationships_patched(touched, start)
+
+    def open_index(self, index_path=None):
+        """
+        Open the GEDCOM file through a memory-mapped record index instead of parsing it.
+        individuals and families become lazy views that decode a record when it is first accessed.
+        :param index_path: Where the index is saved, defaults to the GEDCOM path with a .kidx suffix.
+        """
+        self.index = GedcomIndex.open(self.file_path, index_path)
+        self.individuals = self.index.individuals
+        self.families = self.index.families
+        return self.index
 
     def parse_individual(self, individual):
         try:
@@ -72,11 +172,6 @@ class GedcomParser:
         self.families[fam.id] = fam
         return fam
 
-    def add_step_child_to_parent(self, child_id, parent_id):
-        if parent_id not in self.parent_to_step_children:
-            self.parent_to_step_children[parent_id] = set()
-        self.parent_to_step_children[parent_id].add(child_id)
-
     def write_individuals(self):
         os.makedirs("output", exist_ok=True)
         filename = os.path.join(
@@ -126,7 +221,8 @@ class GedcomParser:
             writer.writeheader()
 
             for family in self.families.values():
-                for i in range(len(family.children)):
+                children = family.children
+                for i in range(len(children)):
                     row = {
                         "Family_ID": family.id,
                         "Husband_ID": family.husband_id,
@@ -134,14 +230,18 @@ class GedcomParser:
                         "Wife_ID": family.wife_id,
                         "Wife_Name": family.wife_name,
                         "Marriage_Date": family.marr_date,
-                        "Child_ID": family.children[i].id if i < len(family.children) else ""
+                        "Child_ID": children[i].id if i < len(children) else ""
                     }
                     writer.writerow(row)
 
 
-    def get_relationships(self):
+    def get_relationships(self, graph: Optional[KinshipGraph] = None):
         """
-        Generate and return the network graph as a list of dictionaries without saving to disk.
+        Generate and return the network graph as an EdgeTable without saving to disk.
+        The table reads as a list of {"Source", "Target", "Relationship"} dictionaries.
+        Sibling relationships are not stored, they grow with the square of the family size;
+        iter_relationships() derives them on demand.
+        :param graph: KinshipGraph of the families to take the step-parents from, built for the call if not given.
         """
         if len(self.relationships) > 0:
             return self.relationships
@@ -149,82 +249,74 @@ class GedcomParser:
         if not self.individuals or not self.families:
             raise ValueError("Parser has not loaded individuals or families. Ensure parse() is called.")
 
-        # Add parent-child relationships
+        edges = EdgeTable(self.ids)
+        self._add_family_edges(edges, self.families.values())
+
+        # Add step-parent relationships
+        step_parent = edges.type_code(STEP_PARENT)
+        all_spouses = {}
         for family in self.families.values():
+            all_spouses[family.husband_id] = all_spouses[family.wife_id] = None
+
+        if graph is None or graph.ids is not self.ids:
+            graph = KinshipGraph.from_data(self.families, self.ids)
+        for spouse_id in all_spouses:
+            parent = self.ids.get(spouse_id)
+            for child in graph.step_children(parent):
+                edges.add(parent, child, step_parent)
+
+        self.relationships = edges
+        return self.relationships
+
+    def _add_family_edges(self, edges: EdgeTable, families, keep=None):
+        """
+        Add the parent-child and spousal relationships of families to edges.
+        :param keep: Predicate on (source, target) nodes choosing the edges to add, all of them if not given.
+        """
+        intern = self.ids.intern
+
+        def node(xref_id):
+            number = intern(xref_id)
+            return NO_ROW if number is None else number
+
+        def add(source, target, code):
+            if keep is None or keep(source, target):
+                edges.add(source, target, code)
+
+        # Add parent-child relationships
+        parent_child = edges.type_code(PARENT_CHILD)
+        for family in families:
+            husband, wife = node(family.husband_id), node(family.wife_id)
             for child in family.children:
+                child = node(child.id)
                 if family.husband_id != "Unknown":
-                    self.relationships.append({
-                        "Source": family.husband_id,
-                        "Target": child.id,
-                        "Relationship": "parent-child"
-                    })
+                    add(husband, child, parent_child)
                 if family.wife_id != "Unknown":
-                    self.relationships.append({
-                        "Source": family.wife_id,
-                        "Target": child.id,
-                        "Relationship": "parent-child"
-                    })
+                    add(wife, child, parent_child)
 
         # Add spousal relationships
-        for family in self.families.values():
+        spouse = edges.type_code(SPOUSE)
+        for family in families:
             if family.husband_name != "Unknown" and family.wife_name != "Unknown":
-                self.relationships.append({
-                    "Source": family.husband_id,
-                    "Target": family.wife_id,
-                    "Relationship": "spouse"
-                })
-                self.relationships.append({
-                    "Source": family.wife_id,
-                    "Target": family.husband_id,
-                    "Relationship": "spouse"
-                })
-
-        # Add sibling relationships
-        for family in self.families.values():
-            child_ids = [child.id for child in family.children]
-            sibling_pairs = combinations(child_ids, 2)
-            for sibling1, sibling2 in sibling_pairs:
-                self.relationships.append({
-                    "Source": sibling1,
-                    "Target": sibling2,
-                    "Relationship": "sibling"
-                })
-                self.relationships.append({
-                    "Source": sibling2,
-                    "Target": sibling1,
-                    "Relationship": "sibling"
-                })
+                husband, wife = node(family.husband_id), node(family.wife_id)
+                add(husband, wife, spouse)
+                add(wife, husband, spouse)
 
-        # Add step-parent relationships
-        all_spouses = set()
-        for family in self.families.values():
-            all_spouses.add(family.husband_id)
-            all_spouses.add(family.wife_id)
-
-        for spouse_id in all_spouses:
-            if spouse_id in self.parent_to_step_children:
-                for child_id in self.parent_to_step_children[spouse_id]:
-                    self.relationships.append({
-                        "Source": spouse_id,
-                        "Target": child_id,
-                        "Relationship": "step-parent"
-                    })
-
-        return self.relationships
+    def iter_relationships(self):
+        """Iterate the full network graph: the stored relationships followed by the derived sibling relationships."""
+        yield from self.get_relationships()
+        yield from iter_sibling_relationships(self.families)
 
     def write_relationships(self, relationships=None):
         """
         Generate a CSV representing the family tree network graph data,
         including step-parent relationships. Optionally accepts a precomputed
-        network map from get_relationships().
+        network map, otherwise writes iter_relationships().
         """
         # Ensure parser has parsed the data
         if not self.individuals or not self.families:
             raise ValueError("Parser has not loaded individuals or families. Ensure parse() is called.")
 
-        if relationships is None:
-            relationships = self.get_relationships()
-
         filename = os.path.join(
             "output",
             f"relationships_{self.base_gedcom_filename}_{datetime.datetime.now():%Y%b%d}.csv",
@@ -232,11 +324,21 @@ class GedcomParser:
 
         with open(filename, "w", newline="", encoding="utf-8") as csvfile:
             fieldnames = ["Source", "Target", "Relationship"]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-
-            for entry in relationships:
-                writer.writerow(entry)
+            if relationships is not None:
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                writer.writeheader()
+                for entry in relationships:
+                    writer.writerow(entry)
+                return
+
+            # Write straight from the edge arrays and the families, without a dict per row
+            edges = self.get_relationships()
+            if not isinstance(edges, EdgeTable):
+                edges = EdgeTable.from_rows(self.ids, edges)
+            writer = csv.writer(csvfile)
+            writer.writerow(fieldnames)
+            writer.writerows(edges.xref_rows())
+            writer.writerows((sibling1, sibling2, SIBLING) for sibling1, sibling2 in iter_sibling_pairs(self.families))
 
     def get_individuals(self):
         return self.individuals
@@ -245,35 +347,19 @@ class GedcomParser:
         return self.families
 
 
-def create_parent_to_children(families: dict[str, Family]) -> dict[str, Set[str]]:
-    parent_to_children = {}
+def iter_sibling_pairs(families: dict[str, Family]) -> Iterator[Tuple[str, str]]:
+    """
+    (sibling, sibling) ids of the children of each family, in both directions.
+    Pairs are generated lazily, so only the family's children are held in memory.
+    """
     for family in families.values():
-        for parent_id in [family.husband_id, family.wife_id]:
-            if parent_id not in parent_to_children:
-                parent_to_children[parent_id] = set()
-            for child in family.children:
-                parent_to_children[parent_id].add(child.id)
-    return parent_to_children
+        child_ids = [child.id for child in family.children]
+        for sibling1, sibling2 in combinations(child_ids, 2):
+            yield sibling1, sibling2
+            yield sibling2, sibling1
 
 
-def create_parent_to_step_children(families: dict[str, Family], parent_to_children: dict[str, Set[str]]) -> dict[
-    str, Set[str]]:
-    parent_to_step_children = {}
-
-    for family in families.values():
-        # Biological children in the current family
-        family_biological_children = set(child.id for child in family.children)
-
-        # Husband: Add wife's other children
-        for child_id in parent_to_children.get(family.wife_id, set()):
-            if child_id not in family_biological_children and \
-                    child_id not in parent_to_children.get(family.husband_id, set()):
-                parent_to_step_children.setdefault(family.husband_id, set()).add(child_id)
-
-        # Wife: Add husband's other children
-        for child_id in parent_to_children.get(family.husband_id, set()):
-            if child_id not in family_biological_children and \
-                    child_id not in parent_to_children.get(family.wife_id, set()):
-                parent_to_step_children.setdefault(family.wife_id, set()).add(child_id)
-
-    return parent_to_step_children
+def iter_sibling_relationships(families: dict[str, Family]) -> Iterator[dict]:
+    """Sibling relationships between the children of each family, as relationship dictionaries."""
+    for sibling1, sibling2 in iter_sibling_pairs(families):
+        yield {"Source": sibling1, "Target": sibling2, "Relationship": SIBLING}
@@ -0,0 +1,320 @@
+import io
+import mmap
+import os
+import re
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from ged4py.date import DateValue
+from ged4py.parser import guess_codec
+
+from .individual import Individual
+from .family import Family
+from .tables import IndividualTable, FamilyTable, TableView
+from .util import normalize_id, date_string
+
+INDI = b"INDI"
+FAM = b"FAM"
+
+# Level 1 tags whose DATE/PLAC sub-records kinship keeps
+_EVENTS = {b"BIRT", b"DEAT", b"MARR"}
+_CONTINUATIONS = {b"CONC", b"CONT"}
+_LEVEL0 = re.compile(rb"^[ \t]*0[ \t]", re.M)
+
+
+class RawRecord:
+    """Undecoded fields of one INDI or FAM record, as bytes straight from the file."""
+    __slots__ = (
+        "tag", "xref_id", "names", "birth_date", "birth_place", "death_date", "death_place",
+        "husband", "wife", "children", "marr_date",
+    )
+
+    def __init__(self, tag: bytes, xref_id: bytes):
+        self.tag = tag
+        self.xref_id = xref_id
+        self.names: List[list] = []  # [value, has TYPE sub-record]
+        self.birth_date = None
+        self.birth_place = None
+        self.death_date = None
+        self.death_place = None
+        self.husband = None
+        self.wife = None
+        self.children: List[bytes] = []
+        self.marr_date = None
+
+
+def open_gedcom(file_path):
+    """
+    Open a GEDCOM file for line-level reading.
+    Returns the binary file positioned after any BOM, and the codec named by the header.
+    """
+    file = io.open(file_path, "rb")
+    try:
+        codec, bom_size = guess_codec(file, warn=False)
+    except Exception:
+        file.close()
+        raise
+    file.seek(bom_size)
+    return file, codec
+
+
+def iter_lines(file) -> Iterator[bytes]:
+    """Iterate raw lines of a binary GEDCOM file, including files that end lines with a bare CR."""
+    start = file.tell()
+    head = file.read(65536)
+    file.seek(start)
+    if b"\r" in head and b"\n" not in head:
+        # Old Mac exports; these are small enough to split in memory
+        yield from file.read().split(b"\r")
+    else:
+        yield from file
+
+
+def scan_records(lines: Iterable[bytes]) -> Iterator[RawRecord]:
+    """
+    Group GEDCOM lines into INDI and FAM records in a single pass,
+    keeping only the tags kinship uses. All other records and tags are skipped undecoded.
+    """
+    record = None
+    event = None  # current level 1 tag inside the record
+    continues = None  # (level, attribute) that CONC/CONT lines append to
+
+    for line in lines:
+        parts = line.split(None, 2)
+        if len(parts) < 2:
+            continue
+        level = parts[0]
+
+        if level == b"0":
+            if record is not None:
+                yield record
+            record = None
+            if len(parts) == 3 and parts[1][:1] == b"@":
+                tag = parts[2].split(None, 1)[0]
+                if tag == INDI or tag == FAM:
+                    record = RawRecord(tag, parts[1])
+            continue
+
+        if record is None:
+            continue
+        tag = parts[1]
+        value = parts[2].rstrip(b"\r\n") if len(parts) == 3 else b""
+
+        if tag in _CONTINUATIONS:
+            if continues is not None and continues[0] == level:
+                # Leading spaces are significant in continued values
+                value = line[line.index(tag) + len(tag) + 1:].rstrip(b"\r\n")
+                if tag == b"CONT":
+                    value = b"\n" + value
+                attr = continues[1]
+                if attr == "names":
+                    record.names[-1][0] += value
+                else:
+                    setattr(record, attr, getattr(record, attr) + value)
+            continue
+        continues = None
+
+        if level == b"1":
+            event = tag
+            if tag == b"NAME":
+                record.names.append([value, False])
+                continues = (b"2", "names")
+            elif tag == b"CHIL":
+                record.children.append(value)
+            elif tag == b"HUSB":
+                if record.husband is None:
+                    record.husband = value
+            elif tag == b"WIFE":
+                if record.wife is None:
+                    record.wife = value
+        elif level == b"2":
+            if event in _EVENTS:
+                if tag == b"DATE":
+                    attr = {b"BIRT": "birth_date", b"DEAT": "death_date", b"MARR": "marr_date"}[event]
+                elif tag == b"PLAC" and event != b"MARR":
+                    attr = "birth_place" if event == b"BIRT" else "death_place"
+                else:
+                    continue
+                if getattr(record, attr) is None:
+                    setattr(record, attr, value)
+                    continues = (b"3", attr)
+            elif event == b"NAME" and tag == b"TYPE":
+                record.names[-1][1] = True
+
+    if record is not None:
+        yield record
+
+
+@lru_cache(maxsize=65536)
+def parse_date(value: str):
+    """Parse a GEDCOM date the same way ged4py does; exports repeat the same dates a lot."""
+    return DateValue.parse(value)
+
+
+def format_name(raw: RawRecord, codec: str) -> str:
+    """Format the primary NAME the way ged4py's Name.format() does."""
+    if not raw.names:
+        return ""
+    # First name without a TYPE sub-record, otherwise the first name
+    value = next((name for name, typed in raw.names if not typed), raw.names[0][0])
+    given1, _, rest = value.decode(codec).partition("/")
+    surname, _, given2 = rest.partition("/")
+    return " ".join(part for part in (given1.strip(), surname.strip(), given2.strip()) if part)
+
+
+def _text(value: Optional[bytes], codec: str) -> Optional[str]:
+    return value.decode(codec) if value else None
+
+
+def _date(value: Optional[bytes], codec: str):
+    return parse_date(value.decode(codec)) if value else None
+
+
+def individual_fields(raw: RawRecord, codec: str) -> tuple:
+    """Decode an INDI record to the Individual constructor arguments."""
+    return (
+        normalize_id(raw.xref_id.decode(codec)),
+        format_name(raw, codec),
+        _date(raw.birth_date, codec),
+        _text(raw.birth_place, codec),
+        _date(raw.death_date, codec),
+        _text(raw.death_place, codec),
+    )
+
+
+def decode_individual(raw: RawRecord, codec: str) -> Individual:
+    return Individual(*individual_fields(raw, codec))
+
+
+def family_refs(raw: RawRecord, codec: str) -> tuple:
+    """Decode a FAM record to (xref_id, husband_id, wife_id, child_ids, marr_date) without resolving pointers."""
+    return (
+        raw.xref_id.decode(codec),
+        normalize_id(raw.husband.decode(codec)) if raw.husband else None,
+        normalize_id(raw.wife.decode(codec)) if raw.wife else None,
+        [normalize_id(child.decode(codec)) for child in raw.children],
+        _date(raw.marr_date, codec),
+    )
+
+
+def build_family(refs: tuple, individuals: Dict[str, Individual]) -> Family:
+    """
+    Build a Family, resolving HUSB/WIFE/CHIL pointers against already decoded individuals.
+    Pointers to individuals not in the file are dropped, leaving the spouse unknown or the child out.
+    The ged4py reader drops dangling pointers too, but raises for a HUSB or CHIL pointing at a record
+    that is not an INDI, where this reader drops that pointer as well.
+    """
+    xref_id, husband_id, wife_id, child_ids, marr_date = refs
+    children = [individuals[child_id] for child_id in child_ids if child_id in individuals]
+    return Family.from_individuals(
+        xref_id,
+        individuals.get(husband_id) if husband_id else None,
+        individuals.get(wife_id) if wife_id else None,
+        marr_date,
+        children,
+    )
+
+
+def add_family(families: FamilyTable, refs: tuple) -> int:
+    """Add a family to a table, resolving its pointers to rows of the table's individuals."""
+    xref_id, husband_id, wife_id, child_ids, marr_date = refs
+    individuals = families.individuals
+    index = individuals.ids.index
+
+    def row(ind_id):
+        ind_row = index.get(ind_id)
+        return ind_row if ind_row is not None and individuals.has_row(ind_row) else None
+
+    child_rows = [child_row for child_row in map(row, child_ids) if child_row is not None]
+    return families.add(normalize_id(xref_id), row(husband_id), row(wife_id), date_string(marr_date), child_rows)
+
+
+def read_gedcom(file_path):
+    """
+    Read individuals and families from a GEDCOM file in one pass into column tables.
+    Family pointers are resolved after the pass, so FAM records may
+    reference individuals that appear later in the file.
+    Returns dict-like views of the individuals and families tables.
+    """
+    individuals = IndividualTable()
+    pending_families = []
+
+    file, codec = open_gedcom(file_path)
+    with file:
+        for raw in scan_records(iter_lines(file)):
+            if raw.tag == INDI:
+                individuals.add(*individual_fields(raw, codec))
+            else:
+                pending_families.append(family_refs(raw, codec))
+
+    families = FamilyTable(individuals)
+    for refs in pending_families:
+        add_family(families, refs)
+    return TableView(individuals), TableView(families)
+
+
+def level0_offsets(file_path) -> List[int]:
+    """Byte offsets of every level 0 line, found in a single scan of the memory-mapped file."""
+    with io.open(file_path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return [match.start() for match in _LEVEL0.finditer(data)]
+
+
+def read_gedcom_range(file_path, codec: str, start: int, end: int):
+    """
+    Decode the records between two level 0 offsets.
+    Returns individual fields and unresolved family refs, both in file order.
+    """
+    with io.open(file_path, "rb") as file:
+        file.seek(start)
+        lines = file.read(end - start).splitlines()
+    individuals = []
+    families = []
+    for raw in scan_records(lines):
+        if raw.tag == INDI:
+            individuals.append(individual_fields(raw, codec))
+        else:
+            families.append(family_refs(raw, codec))
+    return individuals, families
+
+
+def read_gedcom_parallel(file_path, workers: Optional[int] = None, chunks_per_worker: int = 4):
+    """
+    Read individuals and families by parsing ranges of level 0 records in a process pool.
+    Ranges are merged in file order, so the result matches read_gedcom() exactly.
+    :param workers: Pool size, defaults to the number of CPUs.
+    :param chunks_per_worker: Ranges handed to each worker, smaller ranges balance uneven records better.
+    """
+    workers = workers or os.cpu_count() or 1
+    offsets = level0_offsets(file_path)
+    if workers == 1 or len(offsets) < 2:
+        return read_gedcom(file_path)
+
+    file, codec = open_gedcom(file_path)
+    file.close()
+
+    # Split on byte size rather than record count, INDI records are much larger than FAM records
+    size = os.path.getsize(file_path)
+    n_chunks = min(len(offsets), workers * chunks_per_worker)
+    starts = sorted({offsets[min(bisect_left(offsets, size * i // n_chunks), len(offsets) - 1)]
+                     for i in range(n_chunks)})
+    ends = starts[1:] + [size]
+
+    individuals = IndividualTable()
+    pending_families = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_individuals, chunk_families in pool.map(
+                read_gedcom_range, repeat(file_path), repeat(codec), starts, ends):
+            for fields in chunk_individuals:
+                individuals.add(*fields)
+            pending_families.extend(chunk_families)
+
+    families = FamilyTable(individuals)
+    for refs in pending_families:
+        add_family(families, refs)
+    return TableView(individuals), TableView(families)
@@ -0,0 +1,688 @@
+import heapq
+from array import array
+from collections.abc import Mapping
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+from .id_table import IdTable
+from .tables import NO_ROW, FamilyTable, TableView
+
+# (husband row, wife row, child rows) of one family, NO_ROW for a missing spouse
+FamilyRows = Tuple[int, int, array]
+
+# Hops of a relationship path, each named for what the next person is to the previous one
+PARENT = "parent"
+CHILD = "child"
+SPOUSE = "spouse"
+SIBLING = "sibling"
+STEP_PARENT = "step-parent"
+STEP_CHILD = "step-child"
+HOP_TYPES = (PARENT, CHILD, SPOUSE, SIBLING, STEP_PARENT, STEP_CHILD)
+# Hop type whose edges from a node are the edges of the other type into it
+INVERSE_HOP = {PARENT: CHILD, CHILD: PARENT, SPOUSE: SPOUSE, SIBLING: SIBLING,
+               STEP_PARENT: STEP_CHILD, STEP_CHILD: STEP_PARENT}
+
+# Kinds of sibling
+FULL_SIBLINGS = "full"
+HALF_SIBLINGS = "half"
+STEP_SIBLINGS = "step"
+
+# (hop type, node) steps of a path, after its first node
+Path = List[Tuple[str, int]]
+
+
+class CSR:
+    """
+    Compressed sparse row adjacency for nodes 0..n-1:
+    the neighbors of node i are targets[offsets[i]:offsets[i + 1]].
+
+    Rows replaced by set_neighbors() are kept in an overrides dict, so an edit costs the size of the row
+    rather than of the arrays. Whole-graph algorithms that read the arrays call compact() first,
+    which merges the overrides back in one pass.
+    """
+    __slots__ = ("offsets", "targets", "overrides")
+
+    def __init__(self, offsets: array, targets: array):
+        self.offsets = offsets
+        self.targets = targets
+        self.overrides = None  # node -> sorted neighbors replacing its row
+
+    @classmethod
+    def from_edges(cls, n: int, sources: Iterable[int], targets: Iterable[int]) -> "CSR":
+        """Build from parallel source/target sequences. Duplicate edges are dropped, neighbors are sorted."""
+        edges = sorted(set(zip(sources, targets)))
+        counts = array("q", bytes(8 * (n + 1)))
+        for source, _ in edges:
+            counts[source + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        return cls(counts, array("q", [target for _, target in edges]))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def neighbors(self, node: int) -> array:
+        if node is None or not 0 <= node < len(self.offsets) - 1:
+            return array("q")
+        if self.overrides is not None:
+            row = self.overrides.get(node)
+            if row is not None:
+                return row
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def degree(self, node: int) -> int:
+        if node is None or not 0 <= node < len(self.offsets) - 1:
+            return 0
+        if self.overrides is not None and node in self.overrides:
+            return len(self.overrides[node])
+        return self.offsets[node + 1] - self.offsets[node]
+
+    @property
+    def edge_count(self) -> int:
+        self.compact()
+        return len(self.targets)
+
+    """ Edits """
+
+    def grow(self, n: int):
+        """Add empty rows up to n nodes."""
+        if n > len(self):
+            self.offsets.extend([self.offsets[-1]] * (n - len(self)))
+
+    def set_neighbors(self, node: int, neighbors: Iterable[int]):
+        """Replace the neighbors of a node."""
+        self.grow(node + 1)
+        if self.overrides is None:
+            self.overrides = {}
+        self.overrides[node] = array("q", sorted(set(neighbors)))
+
+    def compact(self):
+        """Merge the rows replaced by set_neighbors() back into the arrays."""
+        if not self.overrides:
+            self.overrides = None
+            return
+        offsets, targets, overrides = self.offsets, self.targets, self.overrides
+        new_offsets, new_targets = array("q", [0]), array("q")
+        for node in range(len(offsets) - 1):
+            row = overrides.get(node)
+            new_targets.extend(targets[offsets[node]:offsets[node + 1]] if row is None else row)
+            new_offsets.append(len(new_targets))
+        self.offsets, self.targets, self.overrides = new_offsets, new_targets, None
+
+    def topological_order(self) -> array:
+        """Nodes ordered so that every edge points forward. Raises ValueError if the edges contain a cycle."""
+        self.compact()
+        offsets, targets = self.offsets, self.targets
+        n = len(self)
+        pending = array("q", bytes(8 * n))  # incoming edges from nodes not yet ordered
+        for target in targets:
+            pending[target] += 1
+        order = array("q", (node for node in range(n) if not pending[node]))
+        position = 0
+        while position < len(order):
+            node = order[position]
+            position += 1
+            for i in range(offsets[node], offsets[node + 1]):
+                target = targets[i]
+                pending[target] -= 1
+                if not pending[target]:
+                    order.append(target)
+        if len(order) < n:
+            raise ValueError(f"Edges contain a cycle through {n - len(order)} nodes, they have no longest path.")
+        return order
+
+    def longest_paths(self, k: int = 1) -> List[Tuple[int, List[int]]]:
+        """
+        The k longest paths as (number of edges, nodes), longest first, ending at distinct nodes
+        without outgoing edges. Dynamic programming over a topological order, O(N + E) plus the output.
+        Raises ValueError if the edges contain a cycle.
+        """
+        self.compact()
+        offsets, targets = self.offsets, self.targets
+        n = len(self)
+        length = array("q", bytes(8 * n))  # edges on the longest path ending at each node
+        previous = array("q", [NO_ROW]) * n
+        for node in self.topological_order():
+            depth = length[node] + 1
+            for i in range(offsets[node], offsets[node + 1]):
+                target = targets[i]
+                if depth > length[target]:
+                    length[target] = depth
+                    previous[target] = node
+
+        ends = [node for node in range(n) if length[node] and offsets[node] == offsets[node + 1]]
+        paths = []
+        for end in heapq.nlargest(k, ends, key=length.__getitem__):
+            path = [end]
+            while previous[path[-1]] != NO_ROW:
+                path.append(previous[path[-1]])
+            path.reverse()
+            paths.append((length[end], path))
+        return paths
+
+
+class KinshipGraph:
+    """
+    Parent, child, spouse and step-child edges between individuals, one CSR per edge type,
+    with nodes numbered by an IdTable.
+
+    A child's parents are the husband and wife of the last family listing the child, and a missing
+    husband or wife is kept as a NO_ROW parent; traversals skip NO_ROW. Children are the reverse
+    of the parent edges, so p is in parents(c) exactly when c is in children(p), also for a child
+    listed in several families.
+    """
+
+    def __init__(self, ids: IdTable, parents: CSR, children: CSR, spouses: CSR, step_children: CSR):
+        self.ids = ids
+        self.parents_csr = parents
+        self.children_csr = children
+        self.spouses_csr = spouses
+        self.step_children_csr = step_children
+        self._generations = {}  # policy -> generation of every node
+        self._cyclic = False  # whether the last full generations pass met a parent cycle
+        self._step_parents = None  # reverse of step_children_csr, built on first use
+        self._siblings = {}  # sibling kind -> CSR, built on first use
+
+    @classmethod
+    def from_family_table(cls, families: FamilyTable) -> "KinshipGraph":
+        """Build straight from the parser's column tables, without going through per-family objects."""
+        husbands, wives = families.husbands, families.wives
+        offsets, children = families.child_offsets, families.children
+
+        def family_rows() -> Iterator[FamilyRows]:
+            for row in families.rows():
+                yield husbands[row], wives[row], children[offsets[row]:offsets[row + 1]]
+
+        return cls._build(families.individuals.ids, list(family_rows()))
+
+    @classmethod
+    def from_families(cls, families: Mapping, ids: IdTable) -> "KinshipGraph":
+        """Build from a mapping of Family objects, interning ids not yet in the table."""
+        intern = ids.intern
+
+        def row(xref_id) -> int:
+            node = intern(xref_id)
+            return NO_ROW if node is None else node
+
+        family_rows = [
+            (row(family.husband_id), row(family.wife_id), array("q", [intern(child.id) for child in family.children]))
+            for family in families.values()
+        ]
+        return cls._build(ids, family_rows)
+
+    @classmethod
+    def from_data(cls, families: Mapping, ids: Optional[IdTable]) -> "KinshipGraph":
+        """Build from whatever families a FamilyTreeData holds: a table view or a mapping of Family objects."""
+        if isinstance(families, TableView) and (ids is None or ids is families.table.individuals.ids):
+            return cls.from_family_table(families.table)
+        return cls.from_families(families, ids if ids is not None else IdTable())
+
+    @classmethod
+    def _build(cls, ids: IdTable, family_rows) -> "KinshipGraph":
+        n = len(ids)
+
+        # Last family listing each child
+        child_family = array("q", [NO_ROW]) * n
+        for family, (_, _, child_rows) in enumerate(family_rows):
+            for child in child_rows:
+                child_family[child] = family
+
+        # Parents and children are the two directions of one set of edges
+        parent_sources, parent_targets = array("q"), array("q")
+        child_sources, child_targets = array("q"), array("q")
+        for child, family in enumerate(child_family):
+            if family != NO_ROW:
+                husband, wife, _ = family_rows[family]
+                parent_sources.extend((child, child))
+                parent_targets.extend((husband, wife))
+                for parent in (husband, wife):
+                    if parent != NO_ROW:
+                        child_sources.append(parent)
+                        child_targets.append(child)
+        parents = CSR.from_edges(n, parent_sources, parent_targets)
+        children = CSR.from_edges(n, child_sources, child_targets)
+
+        # Children listed in any family of a spouse, including those whose parents are another family's
+        listed_sources, listed_targets = array("q"), array("q")
+        spouse_sources, spouse_targets = array("q"), array("q")
+        for husband, wife, child_rows in family_rows:
+            for parent in (husband, wife):
+                if parent != NO_ROW:
+                    listed_sources.extend([parent] * len(child_rows))
+                    listed_targets.extend(child_rows)
+            if husband != NO_ROW and wife != NO_ROW:
+                spouse_sources.extend((husband, wife))
+                spouse_targets.extend((wife, husband))
+        listed = CSR.from_edges(n, listed_sources, listed_targets)
+        spouses = CSR.from_edges(n, spouse_sources, spouse_targets)
+
+        # A spouse's children who are not listed in a family of one's own
+        step_sources, step_targets = array("q"), array("q")
+        for parent in range(n):
+            if not spouses.degree(parent):
+                continue
+            own = set(listed.neighbors(parent))
+            for child in {child for spouse in spouses.neighbors(parent) for child in children.neighbors(spouse)}:
+                if child not in own:
+                    step_sources.append(parent)
+                    step_targets.append(child)
+        step_children = CSR.from_edges(n, step_sources, step_targets)
+
+        return cls(ids, parents, children, spouses, step_children)
+
+    """ Neighbors """
+
+    def parents(self, node: int) -> array:
+        """Parent rows of a node, including NO_ROW for a missing husband or wife."""
+        return self.parents_csr.neighbors(node)
+
+    def children(self, node: int) -> array:
+        return self.children_csr.neighbors(node)
+
+    def spouses(self, node: int) -> array:
+        return self.spouses_csr.neighbors(node)
+
+    def step_children(self, node: int) -> array:
+        return self.step_children_csr.neighbors(node)
+
+    def step_parents(self, node: int) -> array:
+        if self._step_parents is None:
+            csr = self.step_children_csr
+            csr.compact()
+            sources = array("q")
+            for parent in range(len(csr)):
+                sources.extend([parent] * csr.degree(parent))
+            self._step_parents = CSR.from_edges(len(csr), csr.targets, sources)
+        return self._step_parents.neighbors(node)
+
+    def known_parents(self, node: int) -> Set[int]:
+        return {parent for parent in self.parents(node) if parent != NO_ROW}
+
+    def siblings(self, node: int, half: bool = False) -> Set[int]:
+        """
+        Other children of node's parents. Full siblings have the same known parents as node;
+        with half=True, returns the half-siblings instead, who share some but not all of them.
+        """
+        return set(self.sibling_index(HALF_SIBLINGS if half else FULL_SIBLINGS).neighbors(node))
+
+    def step_siblings(self, node: int) -> Set[int]:
+        """Children of node's step-parents, and step-children of node's parents, who share no parent with node."""
+        return set(self.sibling_index(STEP_SIBLINGS).neighbors(node))
+
+    def sibling_index(self, kind: str) -> CSR:
+        """
+        Siblings of one kind for every node as a CSR, built on first use in one pass over the nodes:
+        FULL_SIBLINGS, HALF_SIBLINGS or STEP_SIBLINGS.
+        """
+        if kind not in (FULL_SIBLINGS, HALF_SIBLINGS, STEP_SIBLINGS):
+            raise ValueError(f"Invalid sibling kind {kind!r}. Choose '{FULL_SIBLINGS}', '{HALF_SIBLINGS}' or "
+                             f"'{STEP_SIBLINGS}'.")
+        if kind not in self._siblings:
+            n = len(self.parents_csr)
+            sources, targets = array("q"), array("q")
+            for node in range(n):
+                found = self._sibling_nodes(node, kind)
+                sources.extend([node] * len(found))
+                targets.extend(found)
+            self._siblings[kind] = CSR.from_edges(n, sources, targets)
+        return self._siblings[kind]
+
+    def _sibling_nodes(self, node: int, kind: str) -> Set[int]:
+        parents = self.known_parents(node)
+        if kind == STEP_SIBLINGS:
+            candidates = {child for step_parent in self.step_parents(node) for child in self.children(step_parent)}
+            candidates.update(child for parent in parents for child in self.step_children(parent))
+            found = {child for child in candidates if not parents & self.known_parents(child)}
+        else:
+            candidates = {child for parent in parents for child in self.children(parent)}
+            full = kind == FULL_SIBLINGS
+            found = {child for child in candidates if (self.known_parents(child) == parents) == full}
+        found.discard(node)
+        return found
+
+    """ Edits """
+
+    def grow(self, n: int):
+        """Add nodes without edges up to n, e.g. for individuals added to the IdTable."""
+        for csr in (self.parents_csr, self.children_csr, self.spouses_csr, self.step_children_csr,
+                    self._step_parents, *self._siblings.values()):
+            if csr is not None:
+                csr.grow(n)
+        for generations in self._generations.values():
+            if n > len(generations):
+                generations.frombytes(bytes(8 * (n - len(generations))))
+
+    def _sibling_region(self, nodes: Iterable[int]) -> Set[int]:
+        """Nodes whose siblings may change when the edges of nodes change."""
+        region = set(nodes)
+        for node in list(region):
+            region.update(self.known_parents(node))
+            region.update(self.spouses(node))
+            if self._step_parents is not None:
+                region.update(self.step_parents(node))
+        affected = set(region)
+        for node in region:
+            affected.update(self.children(node))
+            affected.update(self.step_children(node))
+        return affected
+
+    def update(self, parents: dict = None, children: dict = None, spouses: dict = None, step_children: dict = None):
+        """
+        Replace the parents, children, spouses or step-children of some nodes (each a dict of node -> neighbors),
+        and patch the indexes built from them: step-parents, the sibling indexes of the nodes around them,
+        and the cached generations of the nodes below them. Costs the neighborhood of the nodes, not the tree.
+        """
+        parents, children, spouses, step_children = parents or {}, children or {}, spouses or {}, step_children or {}
+        changed = set(parents) | set(children) | set(spouses) | set(step_children)
+        if not changed:
+            return
+        siblings_before = self._sibling_region(changed) if self._siblings else set()
+        old_step_children = {node: set(self.step_children(node)) for node in step_children}
+
+        for csr, rows in ((self.parents_csr, parents), (self.children_csr, children), (self.spouses_csr, spouses),
+                          (self.step_children_csr, step_children)):
+            for node, neighbors in rows.items():
+                csr.set_neighbors(node, neighbors)
+
+        if self._step_parents is not None:
+            for parent, old in old_step_children.items():
+                new = set(self.step_children(parent))
+                for child in old - new:
+                    self._step_parents.set_neighbors(child, set(self.step_parents(child)) - {parent})
+                for child in new - old:
+                    self._step_parents.set_neighbors(child, set(self.step_parents(child)) | {parent})
+
+        if self._siblings:
+            region = siblings_before | self._sibling_region(changed)
+            for kind, csr in self._siblings.items():
+                for node in region:
+                    csr.set_neighbors(node, self._sibling_nodes(node, kind))
+
+        if parents:
+            self._update_generations(parents)
+
+    def _update_generations(self, nodes: Iterable[int]):
+        """Recompute the cached generations of nodes whose parents changed, and of their descendants in turn."""
+        if not self._generations:
+            return
+        nodes = list(nodes)
+        if self._cyclic or self._creates_cycle(nodes):
+            # A full pass gives nodes on or below a parent cycle generation 0, which patching cannot follow
+            self._generations.clear()
+            return
+        for policy, generation in self._generations.items():
+            pick = max if policy == "max" else min
+            pending = list(nodes)
+            while pending:
+                node = pending.pop()
+                parents = self.known_parents(node)
+                depth = pick(generation[parent] for parent in parents) + 1 if parents else 0
+                if depth != generation[node]:
+                    generation[node] = depth
+                    pending.extend(self.children(node))
+
+    def _creates_cycle(self, nodes: Iterable[int]) -> bool:
+        """Whether any of nodes is now its own ancestor, searching down from each node to its parents."""
+        for node in nodes:
+            parents = self.known_parents(node)
+            if not parents:
+                continue
+            seen, pending = {node}, [node]
+            while pending:
+                current = pending.pop()
+                if current in parents:
+                    return True
+                for child in self.children(current):
+                    if child not in seen:
+                        seen.add(child)
+                        pending.append(child)
+        return False
+
+    def hops(self, node: int, types: Iterable[str] = HOP_TYPES) -> Iterator[Tuple[str, int]]:
+        """(hop type, neighbor) of every typed edge from node. Siblings include half-siblings."""
+        for hop in types:
+            if hop == PARENT:
+                neighbors = self.known_parents(node)
+            elif hop == CHILD:
+                neighbors = self.children(node)
+            elif hop == SPOUSE:
+                neighbors = self.spouses(node)
+            elif hop == SIBLING:
+                neighbors = self.siblings(node) | self.siblings(node, half=True)
+            elif hop == STEP_PARENT:
+                neighbors = self.step_parents(node)
+            elif hop == STEP_CHILD:
+                neighbors = self.step_children(node)
+            else:
+                raise ValueError(f"Invalid hop type {hop!r}. Choose from {', '.join(HOP_TYPES)}.")
+            for neighbor in neighbors:
+                yield hop, neighbor
+
+    def predecessor_hops(self, node: int, types: Iterable[str] = HOP_TYPES) -> Iterator[Tuple[str, int]]:
+        """
+        (hop type, predecessor) of every typed edge into node, so each predecessor has a hop of that type to node.
+        No inverse has to be built: children are the exact reverse of known parents and step-parents of
+        step-children, and spouses and siblings are symmetric, including after update().
+        """
+        for hop in types:
+            for _, predecessor in self.hops(node, (INVERSE_HOP[hop],)):
+                yield hop, predecessor
+
+    """ Traversals """
+
+    @staticmethod
+    def iter_levels(csr: CSR, node: int, depth: Optional[int] = None,
+                    max_nodes: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """
+        (steps, node) of every node reached along a CSR, one frontier at a time, nearest first.
+        A node reached by several lines (pedigree collapse) is yielded once, at its fewest steps.
+        Memory is one byte per node for the visited marks plus the current frontier.
+        :param depth: Steps to go, or None for the full closure.
+        :param max_nodes: Stop after yielding this many nodes.
+        """
+        csr.compact()
+        offsets, targets = csr.offsets, csr.targets
+        n = len(offsets) - 1
+        if node is None or not 0 <= node < n:
+            return
+        visited = bytearray(n)
+        visited[node] = 1
+        frontier, steps, yielded = [node], 0, 0
+        while frontier and (depth is None or steps < depth):
+            steps += 1
+            next_frontier = []
+            for current in frontier:
+                for i in range(offsets[current], offsets[current + 1]):
+                    target = targets[i]
+                    if target != NO_ROW and not visited[target]:
+                        visited[target] = 1
+                        next_frontier.append(target)
+                        yield steps, target
+                        yielded += 1
+                        if max_nodes is not None and yielded >= max_nodes:
+                            return
+            frontier = next_frontier
+
+    @classmethod
+    def _levels(cls, csr: CSR, node: int, depth: int) -> Set[int]:
+        """Nodes reached in 1..depth steps along a CSR."""
+        return {target for _, target in cls.iter_levels(csr, node, depth)}
+
+    def ancestors(self, node: int, depth: int = 1) -> Set[int]:
+        return self._levels(self.parents_csr, node, depth)
+
+    def descendants(self, node: int, depth: int = 1) -> Set[int]:
+        return self._levels(self.children_csr, node, depth)
+
+    def iter_ancestors(self, node: int, depth: Optional[int] = None,
+                       max_nodes: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """(generations up, ancestor) of node, parents first, see iter_levels()."""
+        return self.iter_levels(self.parents_csr, node, depth, max_nodes)
+
+    def iter_descendants(self, node: int, depth: Optional[int] = None,
+                         max_nodes: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """(generations down, descendant) of node, children first, see iter_levels()."""
+        return self.iter_levels(self.children_csr, node, depth, max_nodes)
+
+    def generations(self, policy: str = "max") -> array:
+        """
+        Generation of every node, from one topological pass over the parent -> child edges in O(N + E).
+        Individuals without known parents are generation 0. A child is one generation below
+        the deepest of its parents with policy="max", or below the shallowest with policy="min".
+        Nodes on a parent cycle or descended from one, which only malformed files contain, are given generation 0.
+        The result is cached per policy.
+        """
+        if policy not in ("max", "min"):
+            raise ValueError("Invalid policy. Choose 'max' or 'min'.")
+        cached = self._generations.get(policy)
+        if cached is not None:
+            return cached
+
+        self.children_csr.compact()
+        offsets, targets = self.children_csr.offsets, self.children_csr.targets
+        n = len(self.children_csr)
+        pending = array("q", bytes(8 * n))  # parents not yet placed
+        for child in targets:
+            pending[child] += 1
+        generation = array("q", bytes(8 * n))
+        deepest = policy == "max"
+
+        order = [node for node in range(n) if not pending[node]]
+        position = 0
+        while position < len(order):
+            node = order[position]
+            position += 1
+            depth = generation[node] + 1
+            for i in range(offsets[node], offsets[node + 1]):
+                child = targets[i]
+                if deepest:
+                    if depth > generation[child]:
+                        generation[child] = depth
+                elif generation[child] == 0 or depth < generation[child]:
+                    # 0 means no parent placed yet, a child with parents is at least generation 1
+                    generation[child] = depth
+                pending[child] -= 1
+                if not pending[child]:
+                    order.append(child)
+        self._cyclic = len(order) < n
+        if self._cyclic:
+            for node in range(n):
+                if pending[node]:
+                    generation[node] = 0
+
+        self._generations[policy] = generation
+        return generation
+
+    def generation(self, node: int, policy: str = "max") -> int:
+        generations = self.generations(policy)
+        return generations[node] if node is not None and 0 <= node < len(generations) else 0
+
+    """ Paths """
+
+    def shortest_path(self, source: int, target: int, types: Iterable[str] = HOP_TYPES, weights: dict = None,
+                      max_visited: Optional[int] = None) -> Optional[Path]:
+        """
+        Shortest path of typed hops from source to target, searched from both ends at once,
+        so only about the square root of the nodes a one-sided search reaches are visited.
+        The target's side walks predecessor_hops(), so every hop of the path is one hops() gives.
+        :param types: Hop types the path may use.
+        :param weights: Cost of each hop type (1 for types not given); the search is then a
+                        bidirectional Dijkstra instead of a bidirectional breadth-first search.
+        :param max_visited: Give up once this many nodes have been reached from both ends together.
+        :return: [(hop type, node), ...] after source, [] when source is target,
+                 or None if there is no path or the search gave up.
+        """
+        n = len(self.parents_csr)
+        if source is None or target is None or not 0 <= source < n or not 0 <= target < n:
+            return None
+        if source == target:
+            return []
+        types = tuple(types)
+        invalid = [hop for hop in types if hop not in HOP_TYPES]
+        if invalid:
+            raise ValueError(f"Invalid hop types {invalid}. Choose from {', '.join(HOP_TYPES)}.")
+        if weights is None:
+            found = self._bidirectional_bfs(source, target, types, max_visited)
+        else:
+            found = self._bidirectional_dijkstra(source, target, types, weights, max_visited)
+        if found is None:
+            return None
+        meet, forward, backward = found
+
+        # forward: node -> (hop type, previous node) towards source;
+        # backward: node -> (hop type, next node) towards target, the backward side following predecessor_hops()
+        path = []
+        node = meet
+        while node != source:
+            hop, previous = forward[node]
+            path.append((hop, node))
+            node = previous
+        path.reverse()
+        node = meet
+        while node != target:
+            hop, following = backward[node]
+            path.append((hop, following))
+            node = following
+        return path
+
+    def _bidirectional_bfs(self, source, target, types, max_visited):
+        forward, backward = {source: None}, {target: None}
+        forward_frontier, backward_frontier = [source], [target]
+        while forward_frontier and backward_frontier:
+            # Expand the smaller side one whole level, the first level that meets gives the shortest paths
+            if len(forward_frontier) <= len(backward_frontier):
+                visited, other, frontier, expand, reverse = forward, backward, forward_frontier, self.hops, False
+            else:
+                visited, other, frontier, expand, reverse = \
+                    backward, forward, backward_frontier, self.predecessor_hops, True
+            next_frontier, meet = [], None
+            for node in frontier:
+                for hop, neighbor in expand(node, types):
+                    if neighbor in visited:
+                        continue
+                    visited[neighbor] = (hop, node)
+                    next_frontier.append(neighbor)
+                    if meet is None and neighbor in other:
+                        meet = neighbor
+            if meet is not None:
+                return meet, forward, backward
+            if max_visited is not None and len(forward) + len(backward) > max_visited:
+                return None
+            if reverse:
+                backward_frontier = next_frontier
+            else:
+                forward_frontier = next_frontier
+        return None
+
+    def _bidirectional_dijkstra(self, source, target, types, weights, max_visited):
+        forward, backward = {source: None}, {target: None}
+        forward_cost, backward_cost = {source: 0}, {target: 0}
+        forward_queue, backward_queue = [(0, source)], [(0, target)]
+        forward_done, backward_done = set(), set()
+        best, meet = None, None
+        while forward_queue and backward_queue:
+            # Once the cheapest unsettled nodes of both sides cost at least the best path, no cheaper one exists
+            if best is not None and forward_queue[0][0] + backward_queue[0][0] >= best:
+                break
+            if max_visited is not None and len(forward_cost) + len(backward_cost) > max_visited:
+                return None
+            if forward_queue[0][0] <= backward_queue[0][0]:
+                queue, done, costs, visited, other_costs, expand = \
+                    forward_queue, forward_done, forward_cost, forward, backward_cost, self.hops
+            else:
+                queue, done, costs, visited, other_costs, expand = \
+                    backward_queue, backward_done, backward_cost, backward, forward_cost, self.predecessor_hops
+            cost, node = heapq.heappop(queue)
+            if node in done:
+                continue
+            done.add(node)
+            for hop, neighbor in expand(node, types):
+                neighbor_cost = cost + weights.get(hop, 1)
+                if neighbor_cost < costs.get(neighbor, neighbor_cost + 1):
+                    costs[neighbor] = neighbor_cost
+                    visited[neighbor] = (hop, node)
+                    heapq.heappush(queue, (neighbor_cost, neighbor))
+                    if neighbor in other_costs and (best is None or neighbor_cost + other_costs[neighbor] < best):
+                        best, meet = neighbor_cost + other_costs[neighbor], neighbor
+        if meet is None:
+            return None
+        return meet, forward, backward
@@ -0,0 +1,44 @@
+from typing import Dict, Iterable, List, Optional
+
+
+class IdTable:
+    """
+    Two-way table between xref ids ("I0001") and dense integers (0, 1, 2, ...).
+    Internal maps are keyed by the integers; xref ids are only used at the API and output boundaries.
+    None (a missing spouse) maps to None in both directions.
+    """
+
+    def __init__(self, xrefs: Iterable[str] = ()):
+        self.xrefs: List[str] = list(xrefs)
+        self.index: Dict[str, int] = {xref: i for i, xref in enumerate(self.xrefs)}
+        if len(self.index) != len(self.xrefs):
+            # Duplicate ids, keep the first position of each
+            self.xrefs = list(self.index)
+            self.index = {xref: i for i, xref in enumerate(self.xrefs)}
+
+    def intern(self, xref: Optional[str]) -> Optional[int]:
+        """Integer for an xref id, assigning the next free one if the id is new."""
+        if xref is None:
+            return None
+        i = self.index.get(xref)
+        if i is None:
+            i = self.index[xref] = len(self.xrefs)
+            self.xrefs.append(xref)
+        return i
+
+    def get(self, xref: Optional[str]) -> Optional[int]:
+        """Integer for an xref id, or None if the id has not been interned."""
+        return self.index.get(xref)
+
+    def xref(self, i: Optional[int]) -> Optional[str]:
+        return None if i is None else self.xrefs[i]
+
+    def xref_set(self, ints: Iterable[Optional[int]]) -> set:
+        xrefs = self.xrefs
+        return {None if i is None else xrefs[i] for i in ints}
+
+    def __contains__(self, xref) -> bool:
+        return xref in self.index
+
+    def __len__(self) -> int:
+        return len(self.xrefs)
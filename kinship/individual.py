@@ -1,4 +1,6 @@
 class Individual:
+    __slots__ = ("id", "full_name", "birth_date", "birth_place", "death_date", "death_place")
+
     def __init__(self, id, full_name, birth_date=None, birth_place=None, death_date=None, death_place=None):
         self.id = id
         self.full_name = full_name
@@ -0,0 +1,147 @@
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .graph import KinshipGraph
+from .tables import NO_ROW
+
+# Rows of a generation filled per numpy operation, bounding the temporaries to ROW_BLOCK x N
+ROW_BLOCK = 1024
+
+
+def _closure(graph: KinshipGraph, nodes: Sequence[int]) -> List[int]:
+    """nodes and all their ancestors, parents before children."""
+    found = set(nodes)
+    stack = list(found)
+    while stack:
+        for parent in graph.parents(stack.pop()):
+            if parent != NO_ROW and parent not in found:
+                found.add(parent)
+                stack.append(parent)
+    generations = graph.generations("max")
+    return sorted(found, key=lambda node: (generations[node], node))
+
+
+def _fill(graph: KinshipGraph, order: List[int], dtype, path: Optional[str]) -> np.ndarray:
+    """
+    Kinship coefficients between every pair of order, by the tabular method one generation at a time.
+    Row and column len(order) stay zero and stand in for an unknown parent.
+    """
+    n = len(order)
+    shape = (n + 1, n + 1)
+    if path is None:
+        table = np.zeros(shape, dtype=dtype)
+    else:
+        table = np.memmap(path, dtype=dtype, mode="w+", shape=shape)
+
+    position = {node: i for i, node in enumerate(order)}
+    generations = graph.generations("max")
+    start = 0
+    while start < n:
+        generation = generations[order[start]]
+        end = start
+        while end < n and generations[order[end]] == generation:
+            end += 1
+
+        # Parents placed in an earlier generation; any other (a parent cycle) is treated as unknown
+        fathers = np.full(end - start, n, dtype=np.intp)
+        mothers = np.full(end - start, n, dtype=np.intp)
+        for i in range(start, end):
+            known = [position[parent] for parent in graph.parents(order[i])
+                     if parent != NO_ROW and position.get(parent, n) < start]
+            if known:
+                fathers[i - start] = known[0]
+            if len(known) > 1:
+                mothers[i - start] = known[1]
+
+        for block in range(start, end, ROW_BLOCK):
+            rows = slice(block, min(block + ROW_BLOCK, end))
+            f, m = fathers[rows.start - start:rows.stop - start], mothers[rows.start - start:rows.stop - start]
+            # With earlier generations: the mean of the parents' coefficients
+            earlier = (table[f, :start] + table[m, :start]) * 0.5
+            table[rows, :start] = earlier
+            table[:start, rows] = earlier.T
+        for block in range(start, end, ROW_BLOCK):
+            rows = slice(block, min(block + ROW_BLOCK, end))
+            f, m = fathers[rows.start - start:rows.stop - start], mothers[rows.start - start:rows.stop - start]
+            # Within the generation, neither is the other's ancestor, so the parents' rows just filled apply
+            table[rows, start:end] = (table[f, start:end] + table[m, start:end]) * 0.5
+            diagonal = np.arange(rows.start, rows.stop)
+            table[diagonal, diagonal] = (1 + table[f, m]) * 0.5
+        start = end
+    return table
+
+
+def _to_relationship(values: np.ndarray, diagonal1: np.ndarray, diagonal2: np.ndarray) -> np.ndarray:
+    """Coefficient of relationship from kinship: phi(i, j) / sqrt(phi(i, i) * phi(j, j))."""
+    return values / np.sqrt(np.outer(diagonal1, diagonal2))
+
+
+def kinship_matrix(graph: KinshipGraph, nodes: Sequence[int], dtype=np.float64, path: Optional[str] = None,
+                   relationship: bool = False) -> np.ndarray:
+    """
+    Coefficients between every pair of nodes, in the order given, as a len(nodes) x len(nodes) matrix.
+    The ancestors of nodes are included in the computation but not in the result.
+    :param dtype: np.float32 halves the memory of the working table and the result.
+    :param path: Keep the working table, and write the result, in memory-mapped files at path
+                 (the table at path + ".table", removed afterwards) instead of in RAM.
+    :param relationship: Coefficient of relationship instead of the kinship coefficient,
+                         e.g. 0.5 rather than 0.25 for a parent and child.
+    """
+    order = _closure(graph, nodes)
+    table = _fill(graph, order, dtype, None if path is None else path + ".table")
+    try:
+        position = {node: i for i, node in enumerate(order)}
+        index = np.array([position[node] for node in nodes], dtype=np.intp)
+        if path is None:
+            result = np.empty((len(index), len(index)), dtype=dtype)
+        else:
+            result = np.memmap(path, dtype=dtype, mode="w+", shape=(len(index), len(index)))
+        diagonal = table[index, index]
+        for block in range(0, len(index), ROW_BLOCK):
+            rows = index[block:block + ROW_BLOCK]
+            values = table[np.ix_(rows, index)]
+            if relationship:
+                values = _to_relationship(values, diagonal[block:block + ROW_BLOCK], diagonal)
+            result[block:block + len(rows)] = values
+        return result
+    finally:
+        if path is not None:
+            del table
+            os.remove(path + ".table")
+
+
+def kinship_pairs(graph: KinshipGraph, nodes: Sequence[int], threshold: float, dtype=np.float64,
+                  path: Optional[str] = None, relationship: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sparse form of kinship_matrix(): the pairs of distinct nodes whose coefficient is at least threshold,
+    as (first positions, second positions, coefficients) with first < second, positions indexing nodes.
+    The dense result is never built, so large cohorts of mostly unrelated people stay small.
+    :param path: Keep the working table in a memory-mapped file at path, removed afterwards.
+    """
+    order = _closure(graph, nodes)
+    table = _fill(graph, order, dtype, path)
+    try:
+        position = {node: i for i, node in enumerate(order)}
+        index = np.array([position[node] for node in nodes], dtype=np.intp)
+        diagonal = table[index, index]
+        firsts, seconds, coefficients = [], [], []
+        for block in range(0, len(index), ROW_BLOCK):
+            rows = index[block:block + ROW_BLOCK]
+            values = table[np.ix_(rows, index)]
+            if relationship:
+                values = _to_relationship(values, diagonal[block:block + ROW_BLOCK], diagonal)
+            first, second = np.nonzero(values >= threshold)
+            first_global = first + block
+            upper = first_global < second
+            firsts.append(first_global[upper])
+            seconds.append(second[upper])
+            coefficients.append(values[first[upper], second[upper]])
+        if not firsts:
+            return np.empty(0, np.intp), np.empty(0, np.intp), np.empty(0, dtype)
+        return np.concatenate(firsts), np.concatenate(seconds), np.concatenate(coefficients).astype(dtype)
+    finally:
+        if path is not None:
+            del table
+            os.remove(path)
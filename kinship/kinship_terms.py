@@ -0,0 +1,96 @@
+from typing import Optional, Tuple
+
+SELF = "self"
+BLOOD = "blood"
+MARRIAGE = "marriage"
+STEP = "step"
+UNRELATED = "unrelated"
+
+# Individuals carry no sex, so the terms are neutral
+_IN_LAW = {"parent": "parent-in-law", "child": "child-in-law", "sibling": "sibling-in-law"}
+_WORDS = {1: "first", 2: "second", 3: "third", 4: "fourth", 5: "fifth", 6: "sixth", 7: "seventh", 8: "eighth",
+          9: "ninth", 10: "tenth"}
+_TIMES = {1: "once", 2: "twice", 3: "three times"}
+
+
+def ordinal(n: int) -> str:
+    """1st, 2nd, 3rd, 4th, ..., 11th, 12th, 13th, 21st, ..."""
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+def _greats(grand_steps: int) -> str:
+    """Prefix for a relation grand_steps generations past "grand": "", "great-", "2nd great-", ..."""
+    if grand_steps <= 0:
+        return ""
+    if grand_steps == 1:
+        return "great-"
+    return f"{ordinal(grand_steps)} great-"
+
+
+def _grand(generations: int, base: str) -> str:
+    """
+    Term for a relation the given generations apart: parent, grandparent, great-grandparent,
+    2nd great-grandparent, ... and the same for child, aunt/uncle and niece/nephew.
+    """
+    if generations == 1:
+        return base
+    return f"{_greats(generations - 2)}grand{base}"
+
+
+def blood_term(generations1: int, generations2: int, half: bool = False) -> str:
+    """
+    Term for what person 1 is to person 2, from the generations each is below their most recent common ancestor.
+    Cousins are numbered by the nearer of the two (one less than its generations), and removed by the difference.
+    """
+    if generations1 == 0 and generations2 == 0:
+        return SELF
+    if generations1 == 0:
+        return _grand(generations2, "parent")
+    if generations2 == 0:
+        return _grand(generations1, "child")
+
+    prefix = "half " if half else ""
+    if generations1 == 1 and generations2 == 1:
+        return f"{prefix}sibling"
+    if generations1 == 1:
+        return prefix + _grand(generations2 - 1, "aunt/uncle")
+    if generations2 == 1:
+        return prefix + _grand(generations1 - 1, "niece/nephew")
+
+    degree = min(generations1, generations2) - 1
+    removed = abs(generations1 - generations2)
+    term = f"{prefix}{_WORDS.get(degree, ordinal(degree))} cousin"
+    if removed:
+        term += f" {_TIMES.get(removed, f'{removed} times')} removed"
+    return term
+
+
+def in_law_term(term: str) -> str:
+    """Term for a relative of one's spouse, or the spouse of one's relative: sibling -> sibling-in-law."""
+    return _IN_LAW.get(term, f"{term} by marriage")
+
+
+class RelationshipDescription:
+    """What person1 is to person2, as computed by RelationshipManager.describe_relationship()."""
+    __slots__ = ("person1", "person2", "term", "kind", "generations1", "generations2", "common_ancestors", "half",
+                 "text")
+
+    def __init__(self, person1: str, person2: str, term: Optional[str], kind: str,
+                 generations1: Optional[int] = None, generations2: Optional[int] = None,
+                 common_ancestors: Tuple[str, ...] = (), half: bool = False, text: str = None):
+        self.person1 = person1
+        self.person2 = person2
+        self.term = term  # None when no relationship was found
+        self.kind = kind  # SELF, BLOOD, MARRIAGE, STEP or UNRELATED
+        self.generations1 = generations1  # person1's generations below the common ancestor
+        self.generations2 = generations2
+        self.common_ancestors = common_ancestors
+        self.half = half
+        self.text = text or (f"{person1} is the {term} of {person2}" if term else f"{person1} is not related to {person2}")
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"RelationshipDescription({self.person1!r}, {self.person2!r}, {self.term!r}, {self.kind!r})"
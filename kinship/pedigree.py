@@ -0,0 +1,189 @@
+import csv
+import datetime
+import os
+from array import array
+from heapq import heappop, heappush
+from typing import Iterable, List, Optional, Tuple
+
+from .ancestor_index import AncestorIndex
+from .graph import KinshipGraph
+from .tables import NO_ROW
+
+# (generation, ancestor slots, distinct ancestors) of one generation of a pedigree
+CollapseRow = Tuple[int, int, int]
+
+
+def inbreeding_coefficients(graph: KinshipGraph, index: AncestorIndex) -> array:
+    """
+    Inbreeding coefficient of every node, by the Meuwissen and Luo (1992) algorithm: for each individual,
+    only its own ancestors are visited, latest first, so the cost per individual is linear in its ancestors
+    rather than in the paths between them. Full siblings share the result of the first of them.
+    Individuals are taken in the index's ancestor-first order; a parent placed after its child
+    (a parent cycle, which only malformed files contain) is treated as unknown.
+    """
+    rank, order = index.rank, index.order
+    n = len(order)
+    sires = array("q", [NO_ROW]) * n
+    dams = array("q", [NO_ROW]) * n
+    for position, node in enumerate(order):
+        known = sorted(rank[parent] for parent in graph.parents(node) if parent != NO_ROW and rank[parent] < position)
+        if known:
+            sires[position] = known[-1]
+        if len(known) > 1:
+            dams[position] = known[0]
+
+    inbreeding = array("d", bytes(8 * n))
+    variance = array("d", bytes(8 * n))  # Mendelian sampling variance of each individual
+    contribution = array("d", bytes(8 * n))  # share of the current individual's genes from each ancestor
+    by_parents = {}
+    for i in range(n):
+        sire, dam = sires[i], dams[i]
+        variance[i] = 0.5 - 0.25 * ((inbreeding[sire] if sire != NO_ROW else -1.0) +
+                                    (inbreeding[dam] if dam != NO_ROW else -1.0))
+        if dam == NO_ROW:
+            continue
+        known = by_parents.get((sire, dam))
+        if known is not None:
+            inbreeding[i] = known
+            continue
+
+        coefficient = -1.0
+        contribution[i] = 1.0
+        queue, queued, visited = [-i], {i}, []
+        while queue:
+            j = -heappop(queue)
+            visited.append(j)
+            share = contribution[j]
+            coefficient += share * share * variance[j]
+            for parent in (sires[j], dams[j]):
+                if parent != NO_ROW:
+                    contribution[parent] += 0.5 * share
+                    if parent not in queued:
+                        queued.add(parent)
+                        heappush(queue, -parent)
+        for j in visited:
+            contribution[j] = 0.0
+        inbreeding[i] = by_parents[(sire, dam)] = coefficient
+
+    by_node = array("d", bytes(8 * n))
+    for position, node in enumerate(order):
+        by_node[node] = inbreeding[position]
+    return by_node
+
+
+def _ancestor_first(graph: KinshipGraph, nodes: Iterable[int], within: Optional[set] = None) -> Optional[List[int]]:
+    """
+    nodes and their ancestors (only those in within, if given) in a depth-first post-order along the parent
+    edges, so parents come before their children. None if a parent cycle is met.
+    """
+    order, state = [], {}  # node -> 1 on the stack, 2 ordered
+    for root in nodes:
+        if root in state:
+            continue
+        state[root] = 1
+        stack = [(root, iter(graph.parents(root)))]
+        while stack:
+            node, parents = stack[-1]
+            for parent in parents:
+                if parent == NO_ROW or (within is not None and parent not in within):
+                    continue
+                seen = state.get(parent)
+                if seen == 1:
+                    return None
+                if seen is None:
+                    state[parent] = 1
+                    stack.append((parent, iter(graph.parents(parent))))
+                    break
+            else:
+                stack.pop()
+                state[node] = 2
+                order.append(node)
+    return order
+
+
+def update_inbreeding(graph: KinshipGraph, inbreeding: array, nodes: Iterable[int]) -> bool:
+    """
+    Recompute in place the inbreeding coefficients of nodes, which must include every descendant of each of them,
+    e.g. after their parents changed; everyone else keeps theirs. The Meuwissen and Luo walk of each node
+    visits only its own ancestors, so the cost is that of the nodes' pedigrees rather than of the tree.
+    Returns False, having changed nothing, if a parent cycle is met: inbreeding_coefficients() then has
+    to order the whole tree.
+    """
+    nodes = set(nodes)
+    order = _ancestor_first(graph, nodes, nodes)
+    pedigrees = [] if order is None else [_ancestor_first(graph, [node]) for node in order]
+    if order is None or None in pedigrees:
+        return False
+    if len(inbreeding) < len(graph.parents_csr):
+        inbreeding.frombytes(bytes(8 * (len(graph.parents_csr) - len(inbreeding))))
+
+    for node, pedigree in zip(order, pedigrees):
+        if len([parent for parent in graph.parents(node) if parent != NO_ROW]) < 2:
+            inbreeding[node] = 0.0
+            continue
+        position = {ancestor: i for i, ancestor in enumerate(pedigree)}
+        coefficient = -1.0
+        contribution = {node: 1.0}
+        queue = [-position[node]]
+        while queue:
+            j = pedigree[-heappop(queue)]
+            share = contribution[j]
+            known = [parent for parent in graph.parents(j) if parent != NO_ROW]
+            variance = 0.5 - 0.25 * (sum(inbreeding[parent] for parent in known) - (2 - len(known)))
+            coefficient += share * share * variance
+            for parent in known:
+                if parent not in contribution:
+                    contribution[parent] = 0.0
+                    heappush(queue, -position[parent])
+                contribution[parent] += 0.5 * share
+        inbreeding[node] = coefficient
+    return True
+
+
+def pedigree_collapse(graph: KinshipGraph, node: int) -> List[CollapseRow]:
+    """
+    Each generation of node's known pedigree: the ancestor slots filled (paths up to that generation,
+    at most 2^generation) and the distinct ancestors filling them. Fewer distinct ancestors than slots
+    is pedigree collapse; slots short of 2^generation are ancestors missing from the tree.
+    """
+    rows = []
+    level = {node: 1}  # ancestor -> paths from node
+    # No pedigree is deeper than the tree, unless parent cycles make it endless
+    for generation in range(1, len(graph.parents_csr) + 1):
+        next_level = {}
+        for current, paths in level.items():
+            for parent in graph.parents(current):
+                if parent != NO_ROW:
+                    next_level[parent] = next_level.get(parent, 0) + paths
+        if not next_level:
+            break
+        rows.append((generation, sum(next_level.values()), len(next_level)))
+        level = next_level
+    return rows
+
+
+def _output_path(report, base_name):
+    os.makedirs("output", exist_ok=True)
+    return os.path.join("output", f"{report}_{base_name}_{datetime.datetime.now():%Y%b%d}.csv")
+
+
+def write_inbreeding(rm, base_name):
+    """CSV of the inbreeding coefficient of every individual."""
+    coefficients = rm.inbreeding_coefficients()
+    with open(_output_path("inbreeding", base_name), "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["Individual_ID", "Inbreeding_Coefficient"])
+        writer.writerows(coefficients.items())
+
+
+def write_pedigree_collapse(rm, base_name):
+    """CSV of every generation of every individual's pedigree, with the theoretical 2^n ancestors."""
+    collapse = rm.pedigree_collapse()
+    with open(_output_path("pedigree_collapse", base_name), "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["Individual_ID", "Generation", "Possible_Ancestors", "Ancestor_Slots",
+                         "Distinct_Ancestors", "Collapse"])
+        for individual_id, rows in collapse.items():
+            for generation, slots, distinct in rows:
+                writer.writerow([individual_id, generation, 2 ** generation, slots, distinct,
+                                 f"{1 - distinct / slots:.4f}"])
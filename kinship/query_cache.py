@@ -0,0 +1,131 @@
+import functools
+import inspect
+import sys
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+# Cap for the query results a RelationshipManager keeps
+DEFAULT_QUERY_CACHE_BYTES = 64 << 20
+
+_MISSING = object()
+
+
+def freeze(value):
+    """Immutable copy of a query result: sets become frozensets, lists tuples, recursively."""
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(item) for item in value)
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def _size(value) -> int:
+    """Approximate bytes held by a frozen result: its containers, not the interned xref ids they share."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (frozenset, tuple)):
+        size += sum(_size(item) for item in value if isinstance(item, (frozenset, tuple)))
+    return size
+
+
+class QueryCache:
+    """
+    Results of RelationshipManager queries, keyed by (method name, arguments), least recently used first.
+    Results are valid for one version of the manager's data; the first lookup after an edit clears them.
+    With max_bytes the results kept are capped, evicting the least recently used; 0 disables caching.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = DEFAULT_QUERY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.version = None
+        self.cached_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (result, size)
+
+    def get(self, key: Hashable, version: int):
+        """Cached result for key, or _MISSING."""
+        if version != self.version:
+            self.clear()
+            self.version = version
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return _MISSING
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: Hashable, result, version: int):
+        if version != self.version or self.max_bytes == 0:
+            return
+        size = _size(key) + _size(result)
+        self._entries[key] = (result, size)
+        self.cached_bytes += size
+        if self.max_bytes is not None:
+            while self.cached_bytes > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.cached_bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.cached_bytes = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self._entries), "bytes": self.cached_bytes}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _freeze_argument(value):
+    return freeze(sorted(value.items()) if isinstance(value, dict) else value)
+
+
+def cached_query(method):
+    """
+    Memoize a RelationshipManager method in its query_cache, keyed by its arguments in signature order with
+    the defaults filled in, so positional, keyword and left out default spellings of a call share one key.
+    The key is built from a name -> position table made once, not by binding each call to the signature.
+    The result is frozen before it is kept. Only queries that cost more than building their key are worth decorating.
+    """
+    signature = inspect.signature(method)
+    parameters = list(signature.parameters.values())[1:]  # after self
+    positions = {parameter.name: i for i, parameter in enumerate(parameters)}
+    defaults = [parameter.default for parameter in parameters]
+    simple = all(parameter.kind is inspect.Parameter.POSITIONAL_OR_KEYWORD for parameter in parameters)
+
+    def arguments(self, args, kwargs) -> tuple:
+        if simple and len(args) <= len(defaults):
+            if not kwargs and len(args) == len(defaults):
+                return args
+            values = list(args) + defaults[len(args):]
+            for name, value in kwargs.items():
+                position = positions.get(name)
+                if position is None or position < len(args):
+                    break
+                values[position] = value
+            else:
+                if not any(value is inspect.Parameter.empty for value in values):
+                    return tuple(values)
+        # Anything else, e.g. a missing or unknown argument, is left to the signature to normalise or reject
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        return tuple(bound.arguments.values())[1:]
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = self.query_cache
+        try:
+            key = (method.__name__, tuple(_freeze_argument(value) for value in arguments(self, args, kwargs)))
+            result = cache.get(key, self.version)
+        except TypeError:  # Unhashable arguments
+            return freeze(method(self, *args, **kwargs))
+        if result is _MISSING:
+            result = freeze(method(self, *args, **kwargs))
+            cache.put(key, result, self.version)
+        return result
+
+    return wrapper
@@ -1,7 +1,40 @@
-from typing import Final
-
-from kinship.gedcom_parser import create_parent_to_children, create_parent_to_step_children
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Final, Iterable, Iterator, List, Optional, Set, Tuple
+
+from kinship.ancestor_index import AncestorIndex, DEFAULT_MAX_BYTES
+from kinship.components import ComponentIndex
+from kinship.delta import Changeset
+from kinship.edges import EdgeTable, SIBLING, SPOUSE
+from kinship.family_index import FamilyIndex
 from kinship.family_tree_data import FamilyTreeData
+from kinship.gedcom_parser import iter_sibling_relationships
+from kinship.graph import CSR, FULL_SIBLINGS, HALF_SIBLINGS, HOP_TYPES, STEP_SIBLINGS, KinshipGraph
+from kinship.family import Family
+from kinship.id_table import IdTable
+from kinship.individual import Individual
+from kinship.kinship_matrix import kinship_matrix, kinship_pairs
+from kinship.pedigree import inbreeding_coefficients, pedigree_collapse, update_inbreeding
+from kinship.query_cache import QueryCache, cached_query
+from kinship.sqlite_store import DOWN, UP
+from kinship.kinship_terms import (BLOOD, MARRIAGE, SELF, STEP, UNRELATED, RelationshipDescription, blood_term,
+                                   in_law_term)
+from kinship.tables import NO_ROW, FamilyTable, IndividualTable, TableView
+from kinship.util import date_string
+
+logger = logging.getLogger(__name__)
+
+# Default of update_family() for the fields left as they are
+_KEEP = object()
+
+_INDIVIDUAL_FIELDS = ("full_name", "birth_date", "birth_place", "death_date", "death_place")
+
+# Attributes of a RelationshipManager built on first use when its data is in a SqliteStore
+_STORE_INDEXES = ("ids", "graph", "family_index", "edges")
 
 
 class RelationshipManager:
@@ -11,22 +44,43 @@ class RelationshipManager:
         self.individuals: Final = data.individuals
         self.families: Final = data.families
         self.relationships: Final = data.relationships
-        self.child_to_parents = {}
-        self.parent_to_children = {}
-        self.parent_to_step_children = {}
         self.spouse_relationships = {}
         self.sibling_relationships = {}
         self.total_generations = 0
+        self._relationship_graphs = {}  # relationship type -> CSR of its stored edges
+        self.ancestor_index = None  # built on first use, see build_ancestor_index()
+        self.component_index = None  # built on first use, see _components()
+        self.analyses = data.analyses  # whole-tree results, saved with the data's snapshot
+        self.version = 0  # bumped by every edit, so caches of query results can tell they are stale
+        self.query_cache = QueryCache()  # results of the @cached_query methods, see QueryCache for the bound
+
+        # Ancestor and descendant queries on a SQLite-backed tree run in SQL; the indexes below are
+        # only built, reading the whole tree, once another query needs them (see __getattr__)
+        self.store = data.store
 
         # self.validate_family_tree_data()
 
-        for fam in self.families.values():
-            for child in fam.children:
-                self.child_to_parents[child.id] = {fam.husband_id, fam.wife_id}
-        self.parent_to_children = create_parent_to_children(self.families)
-        self.parent_to_step_children = create_parent_to_step_children(self.families, self.parent_to_children)
+        if self.store is None:
+            self._build_indexes(data.ids if data.ids is not None else IdTable(self.individuals))
+
+    def _build_indexes(self, ids: IdTable):
+        # Graph nodes and lookups are the integers in self.ids; public methods take and return xref ids
+        self.ids = ids
+        self.graph = KinshipGraph.from_data(self.families, self.ids)
+        self.family_index = FamilyIndex.from_data(self.families, self.ids)
+        if isinstance(self.relationships, EdgeTable) and self.relationships.ids is self.ids:
+            self.edges = self.relationships
+        else:
+            self.edges = EdgeTable.from_rows(self.ids, self.relationships)
         self.generate_spouse_and_sibling_lookups()
 
+    def __getattr__(self, name):
+        # Only called for attributes not set yet: the indexes of a SQLite-backed tree, before first use
+        if name in _STORE_INDEXES and self.__dict__.get("store") is not None:
+            self._build_indexes(self.store.id_table())
+            return self.__dict__[name]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
     """ Validation methods """
 
     def validate_family_tree_data(self):
@@ -41,44 +95,86 @@ class RelationshipManager:
 
     def generate_spouse_and_sibling_lookups(self):
         """
-        Generate spouse and sibling lookups from the relationships data.
+        Generate spouse and sibling lookups from the relationships data: each individual's
+        stored spouses and siblings, as a frozenset since one may have several.
         """
 
-        # Build spouse relationship - each spouse pair is bidirectional
-        for rel in [rel for rel in self.relationships if rel['Relationship'] == 'spouse']:
-            self.spouse_relationships[rel['Source']] = rel['Target']
-            self.spouse_relationships[rel['Target']] = rel['Source']
-
-        # Build sibling relationships - each sibling pair is bidirectional
-        for rel in [rel for rel in self.relationships if rel['Relationship'] == 'sibling']:
-            self.sibling_relationships[rel['Source']] = rel['Target']
-            self.sibling_relationships[rel['Target']] = rel['Source']
+        def node(i):
+            return None if i == NO_ROW else i
+
+        spouses, siblings = {}, {}
+        # Each spouse and sibling pair is bidirectional.
+        # Parsed trees do not store sibling pairs, see iter_relationships()
+        for relationship, lookup in ((SPOUSE, spouses), (SIBLING, siblings)):
+            for source, target in self.edges.pairs(relationship):
+                source, target = node(source), node(target)
+                lookup.setdefault(source, set()).add(target)
+                lookup.setdefault(target, set()).add(source)
+        self.spouse_relationships = {individual: frozenset(others) for individual, others in spouses.items()}
+        self.sibling_relationships = {individual: frozenset(others) for individual, others in siblings.items()}
+
+    def relationships_patched(self, nodes: Set[int], start: int):
+        """
+        Refresh what is built from the stored relationships after the edges of nodes were removed from them
+        and their new edges appended from index start on, as GedcomParser.apply_changeset() does.
+        """
+        self._relationship_graphs.clear()
+        for lookup in (self.spouse_relationships, self.sibling_relationships):
+            for node in nodes:
+                for other in lookup.pop(node, ()):
+                    if other in lookup:
+                        lookup[other] = lookup[other] - {node}
+        edges = self.edges
+        for relationship, lookup in ((SPOUSE, self.spouse_relationships), (SIBLING, self.sibling_relationships)):
+            code = edges.type_code(relationship)
+            for i in range(start, len(edges)):
+                if edges.types[i] == code:
+                    source, target = edges.sources[i], edges.targets[i]
+                    source, target = None if source == NO_ROW else source, None if target == NO_ROW else target
+                    lookup[source] = lookup.get(source, frozenset()) | {target}
+                    lookup[target] = lookup.get(target, frozenset()) | {source}
+
+    def iter_relationships(self):
+        """
+        Iterate every relationship, adding the sibling relationships derived from the families
+        when the stored relationships do not already include them.
+        """
+        yield from self.relationships
+        if not self.sibling_relationships:
+            yield from iter_sibling_relationships(self.families)
 
     """ Predicate Methods """
 
     def individual_exists(self, individual_id):
         """Check if the individual ID is valid."""
         if individual_id not in self.individuals:
-            print(f"Individual ID {individual_id} not found.")
+            logger.info("Individual ID %s not found.", individual_id)
             return False
         return True
 
     def is_spouse(self, spouse1_id: str, spouse2_id: str):
-        """Check if two individuals are spouses."""
-        return self.spouse_relationships.get(spouse1_id) == spouse2_id
+        """Check if two individuals are spouses, in a family or in the stored relationships."""
+        spouse1, spouse2 = self.ids.get(spouse1_id), self.ids.get(spouse2_id)
+        if spouse1 is None or spouse2 is None:
+            return False
+        return spouse2 in self.graph.spouses(spouse1) or spouse2 in self.spouse_relationships.get(spouse1, ())
 
     def is_parent(self, child_id: str, parent_id: str):
         """Check if param2 (parent) is a parent of param1 (child)."""
-        return parent_id in self.child_to_parents.get(child_id)
+        parent = self.ids.get(parent_id)
+        return parent is not None and parent in self.graph.parents(self.ids.get(child_id))
 
     def are_siblings(self, individual1_id, individual2_id):
         """Check if two individuals share at least one parent."""
-        parents1 = self.individuals[individual1_id].parents
-        parents2 = self.individuals[individual2_id].parents
-        return bool(set(parents1) & set(parents2))
+        individual1, individual2 = self.ids.get(individual1_id), self.ids.get(individual2_id)
+        if individual1 is None or individual2 is None:
+            return False
+        return individual2 in self.graph.siblings(individual1) or \
+            individual2 in self.graph.siblings(individual1, half=True)
 
     def is_connected(self, ind_id):
-        return any(rel["Source"] == ind_id or rel["Target"] == ind_id for rel in self.relationships)
+        """Check if the individual shares a family with anyone."""
+        return self._components().size_of(self.ids.get(ind_id)) > 1
 
     def is_oldest_ancestor(self, ind_id):
         return len(self.get_ancestors(ind_id)) == 0
@@ -93,100 +189,425 @@ class RelationshipManager:
         return self.families.get(family_id)
 
     def get_family_of_individual(self, individual_id):
-        """Retrieve the family of an individual."""
+        """Retrieve the first family listing an individual, as a child or as a spouse."""
         if individual_id not in self.individuals:
             raise ValueError(f"Individual ID {individual_id} not found.")
-        for family in self.families.values():
-            if individual_id in family.children:
-                return family
-            if individual_id in family.parents:
-                return family
-        raise ValueError(f"Unable to find family for individual ID {individual_id}.")
-
-    def get_ancestors(self, individual_id, depth=1) -> set:
-        """Retrieve ancestors up to a given depth."""
-        ancestors = set()
+        family_id = self.family_index.first(self.ids.get(individual_id))
+        if family_id is None:
+            raise ValueError(f"Unable to find family for individual ID {individual_id}.")
+        return self.families[family_id]
+
+    def get_families_as_child(self, individual_id) -> list:
+        """Retrieve the families listing an individual as a child, in file order."""
+        if not self.individual_exists(individual_id):
+            return []
+        return [self.families[family_id] for family_id in self.family_index.as_child(self.ids.get(individual_id))]
+
+    def get_families_as_spouse(self, individual_id) -> list:
+        """Retrieve the families of each marriage of an individual, in file order."""
+        if not self.individual_exists(individual_id):
+            return []
+        return [self.families[family_id] for family_id in self.family_index.as_spouse(self.ids.get(individual_id))]
+
+    @cached_query
+    def get_ancestors(self, individual_id, depth=1) -> frozenset:
+        """Retrieve ancestors up to a given depth, or all of them for depth=None. Cached, see QueryCache."""
         if not self.individual_exists(individual_id):
-            return ancestors
-        current_generation = {individual_id}
-        for _ in range(depth):
-            next_generation = set()
-            for person_id in current_generation:
-                next_generation.update([parent for parent in self.get_parents(person_id) if parent])
-            ancestors.update(next_generation)
-            current_generation = next_generation
-        return ancestors
+            return set()
+        if self.store is not None:
+            return self.store.ancestors(individual_id, depth)
+        return self.ids.xref_set(self.graph.ancestors(self.ids.get(individual_id), depth))
+
+    def iter_ancestors(self, individual_id, depth=None, stop=None, max_nodes=None):
+        """
+        Iterate (generation, ID) of the ancestors of an individual, parents (generation 1) first,
+        one generation at a time. An ancestor on several lines is yielded once, at their nearest generation.
+        :param depth: Generations to go up, or None for all.
+        :param stop: Called with each (generation, ID) yielded; the traversal ends once it returns True.
+        :param max_nodes: End the traversal after this many ancestors.
+        """
+        if individual_id not in self.individuals:
+            logger.info("Individual ID %s not found.", individual_id)
+            return
+        if self.store is not None:
+            levels = self.store.iter_levels(UP, individual_id, depth, max_nodes)
+        else:
+            levels = ((generation, self.ids.xref(node))
+                      for generation, node in self.graph.iter_ancestors(self.ids.get(individual_id), depth, max_nodes))
+        for generation, xref in levels:
+            yield generation, xref
+            if stop is not None and stop(generation, xref):
+                return
+
+    def iter_descendents(self, individual_id, depth=None, stop=None, max_nodes=None):
+        """
+        Iterate (generation, ID) of the descendents of an individual, children (generation 1) first,
+        one generation at a time. The parameters are those of iter_ancestors().
+        """
+        if individual_id not in self.individuals:
+            logger.info("Individual ID %s not found.", individual_id)
+            return
+        if self.store is not None:
+            levels = self.store.iter_levels(DOWN, individual_id, depth, max_nodes)
+        else:
+            levels = ((generation, self.ids.xref(node))
+                      for generation, node in self.graph.iter_descendants(self.ids.get(individual_id), depth, max_nodes))
+        for generation, xref in levels:
+            yield generation, xref
+            if stop is not None and stop(generation, xref):
+                return
 
     def get_parents(self, child_id) -> []:
         """Retrieve the parents of an individual."""
-        parents = []
         if not self.individual_exists(child_id):
             return []
-        if child_id in self.child_to_parents:
-            parents = self.child_to_parents[child_id]
-        return parents
+        parents = self.graph.parents(self.ids.get(child_id))
+        if not parents:
+            return []
+        # A missing husband or wife is reported as a None parent
+        return self.ids.xref_set(None if parent == NO_ROW else parent for parent in parents)
 
     def get_children(self, individual_id) -> []:
         """Retrieve the children of an individual."""
-        children = []
         if not self.individual_exists(individual_id):
             return []
-        if individual_id in self.parent_to_children:
-            children = self.parent_to_children[individual_id]
-        return children
-
-    def get_descendents(self, individual_id, depth=1):
-        """Retrieve descendents up to a given depth."""
-        descendents = set()
-        current_generation = {individual_id}
-        for _ in range(depth):
-            next_generation = set()
-            for person_id in current_generation:
-                next_generation.update(self.get_children(person_id))
-            descendents.update(next_generation)
-            current_generation = next_generation
-        return descendents
+        children = self.graph.children(self.ids.get(individual_id))
+        return self.ids.xref_set(children) if children else []
+
+    def get_spouses(self, individual_id) -> set:
+        """Retrieve every spouse of an individual."""
+        if not self.individual_exists(individual_id):
+            return set()
+        return self.ids.xref_set(self.graph.spouses(self.ids.get(individual_id)))
+
+    def get_siblings(self, individual_id, kind=FULL_SIBLINGS) -> set:
+        """
+        Retrieve the siblings of an individual.
+        :param kind: "full" for those with the same known parents, "half" for those sharing some
+                     but not all of them, "step" for the children of a step-parent who share none,
+                     or "all" for full and half siblings.
+        """
+        if not self.individual_exists(individual_id):
+            return set()
+        node = self.ids.get(individual_id)
+        if kind == "all":
+            return self.ids.xref_set(self.graph.siblings(node) | self.graph.siblings(node, half=True))
+        return self.ids.xref_set(self.graph.sibling_index(kind).neighbors(node))
+
+    def get_half_siblings(self, individual_id) -> set:
+        """Retrieve the individuals who share some, but not all, known parents."""
+        return self.get_siblings(individual_id, HALF_SIBLINGS)
+
+    def get_step_siblings(self, individual_id) -> set:
+        """Retrieve the children of an individual's step-parents who share no parent with them."""
+        return self.get_siblings(individual_id, STEP_SIBLINGS)
+
+    @cached_query
+    def get_descendents(self, individual_id, depth=1) -> frozenset:
+        """Retrieve descendents up to a given depth, or all of them for depth=None. Cached, see QueryCache."""
+        if not self.individual_exists(individual_id):
+            return set()
+        if self.store is not None:
+            return self.store.descendants(individual_id, depth)
+        return self.ids.xref_set(self.graph.descendants(self.ids.get(individual_id), depth))
 
     """ Analysis Methods """
 
-    def describe_relationship(self, person1_id, person2_id):
-        """Describe the relationship of person1 to person2."""
-        pass
+    def describe_relationship(self, person1_id, person2_id) -> RelationshipDescription:
+        """
+        Describe the relationship of person1 to person2, e.g. "I1 is the first cousin once removed of I2".
+        Blood relationships are named from the generations each is below their most recent common ancestor,
+        otherwise spouse, step and in-law relationships are looked for through the spouse and step-child edges.
+        Uses the ancestor index and cached generations, so repeated lookups do not walk the whole tree.
+        :return: The description, whose kind is UNRELATED if none was found, or None if an individual does not exist.
+        """
+        if not self.individual_exists(person1_id) or not self.individual_exists(person2_id):
+            return None
+        if person1_id == person2_id:
+            return RelationshipDescription(person1_id, person2_id, SELF, SELF, 0, 0, text=f"{person1_id} is themself")
+        node1, node2 = self.ids.get(person1_id), self.ids.get(person2_id)
+
+        blood = self._blood_relationship(node1, node2)
+        if blood is not None:
+            generations1, generations2, ancestors, half = blood
+            return RelationshipDescription(person1_id, person2_id, blood_term(generations1, generations2, half), BLOOD,
+                                           generations1, generations2, tuple(self.ids.xref(a) for a in ancestors), half)
+
+        graph = self.graph
+        if node2 in graph.spouses(node1):
+            return RelationshipDescription(person1_id, person2_id, "spouse", MARRIAGE)
+        if node2 in graph.step_children(node1):
+            return RelationshipDescription(person1_id, person2_id, "stepparent", STEP)
+        if node1 in graph.step_children(node2):
+            return RelationshipDescription(person1_id, person2_id, "stepchild", STEP)
+        if node2 in graph.step_siblings(node1):
+            return RelationshipDescription(person1_id, person2_id, "step-sibling", STEP)
+
+        # In-laws: a blood relative of person2's spouse, or the spouse of a blood relative of person2, nearest first
+        in_laws = []
+        for spouse in graph.spouses(node2):
+            blood = self._blood_relationship(node1, spouse)
+            if blood is not None:
+                in_laws.append((blood[0] + blood[1], in_law_term(blood_term(blood[0], blood[1], blood[3])), blood))
+        for spouse in graph.spouses(node1):
+            blood = self._blood_relationship(spouse, node2)
+            if blood is not None:
+                term = blood_term(blood[0], blood[1], blood[3])
+                # The spouse of one's parent is a stepparent, not a parent-in-law
+                in_laws.append((blood[0] + blood[1], "stepparent" if term == "parent" else in_law_term(term), blood))
+        if in_laws:
+            _, term, (generations1, generations2, ancestors, half) = min(in_laws, key=lambda in_law: in_law[0])
+            return RelationshipDescription(person1_id, person2_id, term, MARRIAGE, generations1, generations2,
+                                           tuple(self.ids.xref(a) for a in ancestors), half)
+        return RelationshipDescription(person1_id, person2_id, None, UNRELATED)
+
+    def describe_relationships(self, pairs: Iterable[Tuple[str, str]], workers: Optional[int] = 1,
+                               chunk_size: int = 1024) -> Iterator[RelationshipDescription]:
+        """
+        describe_relationship() for many (person1, person2) pairs, yielded in the order of pairs.
+        Pairs are read and answered a chunk at a time, so memory stays flat however many are asked for.
+        Repeated pairs within a chunk are described once, and pairs share the ancestor bitsets
+        of the people they have in common. A pool keeps the configured ancestor index, lazy and bounded
+        by default: forked workers share the bitsets built so far copy-on-write and build the rest
+        for the people in their own chunks.
+        :param workers: Process pool size, 1 answers in this process, None uses the number of CPUs.
+                        Workers inherit the indexes by fork where the platform supports it,
+                        otherwise the manager is pickled once per worker rather than per chunk.
+        :param chunk_size: Pairs handed to a worker at a time.
+        """
+        self.graph.generations()
+        chunks = _chunks(pairs, chunk_size)
+        workers = workers or os.cpu_count() or 1
+        self._ancestors()
+        if workers == 1:
+            for chunk in chunks:
+                yield from _describe_chunk(chunk, self)
+            return
+
+        # A fork context hands initargs to the workers as they are forked, without pickling; other start methods
+        # pickle the manager once per worker. Either way each pool carries its own manager, so batches
+        # running from several threads do not share one
+        context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+        pool = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_batch_worker, initargs=(self,))
+        with pool:
+            # A bounded window of chunks in flight, so the input is not read ahead of the output
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(_describe_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def _blood_relationship(self, node1, node2):
+        """
+        (generations of node1 below, generations of node2 below, the nearest most recent common ancestors, half)
+        or None without a common ancestor. The nearest common ancestors are those with the fewest steps
+        from both; the relationship is half when the lines below them descend from children
+        of different known parents.
+        """
+        index = self._ancestors()
+        nearest, best = [], None
+        for ancestor in index.most_recent_common_ancestors(node1, node2):
+            generations = (index.distance(node1, ancestor), index.distance(node2, ancestor))
+            if best is None or sum(generations) < sum(best):
+                nearest, best = [ancestor], generations
+            elif generations == best:
+                nearest.append(ancestor)
+        if best is None:
+            return None
+
+        half = False
+        if best[0] and best[1]:
+            ancestor = nearest[0]
+            top1 = self._child_on_line(ancestor, node1)
+            top2 = self._child_on_line(ancestor, node2)
+            half = self.graph.known_parents(top1) != self.graph.known_parents(top2)
+        return best[0], best[1], nearest, half
+
+    def _child_on_line(self, ancestor, node):
+        """The child of ancestor that node is, or descends from."""
+        index = self._ancestors()
+        for child in self.graph.children(ancestor):
+            if child == node or index.is_ancestor(child, node):
+                return child
+        return None
+
+    def _components(self) -> ComponentIndex:
+        if self.component_index is None:
+            self.component_index = ComponentIndex.from_data(self.families, self.ids)
+        return self.component_index
+
+    def component_of(self, individual_id):
+        """Number of the connected component of an individual, 0 for the largest, or None if they do not exist."""
+        if not self.individual_exists(individual_id):
+            return None
+        return self._components().component_of(self.ids.get(individual_id))
+
+    def component_sizes(self) -> list:
+        """Number of individuals in each connected component, largest first."""
+        return list(self._components().sizes)
+
+    def isolated_individuals(self) -> set:
+        """Individuals who share no family with anyone."""
+        return {individual_id for individual_id in self.ids.xref_set(self._components().isolated())
+                if individual_id in self.individuals}
+
+    def iter_components(self):
+        """Iterate the sets of IDs of each connected component, largest first, e.g. to process them in parallel."""
+        for members in self._components():
+            yield self.ids.xref_set(members)
+
+    @cached_query
+    def find_relationship_path(self, individual1, individual2, types=HOP_TYPES, weights=None, max_visited=None):
+        """
+        Find the shortest chain of typed hops connecting two individuals, e.g.
+        [("I1", "spouse", "I2"), ("I2", "parent", "I3")] when I3 is the parent of I1's spouse.
+        :param types: Hop types the chain may use: "parent", "child", "spouse", "sibling", "step-parent", "step-child".
+        :param weights: Cost per hop type, unlisted types cost 1. The chain with the lowest total cost is returned.
+        :param max_visited: Give up after reaching this many individuals, for a bounded query time.
+        :return: Tuple of (from ID, hop type, to ID), () for the same individual,
+                 or None if they are not connected (or the search gave up).
+        """
+        if not self.individual_exists(individual1) or not self.individual_exists(individual2):
+            return None
+        path = self.graph.shortest_path(self.ids.get(individual1), self.ids.get(individual2), types, weights,
+                                        max_visited)
+        if path is None:
+            return None
+        chain, previous = [], individual1
+        for hop, node in path:
+            chain.append((previous, hop, self.ids.xref(node)))
+            previous = chain[-1][2]
+        return chain
 
     def calculate_total_generations(self) -> int:
         """Logic to determine total generation number using the longest lineage,
         based on parent-child relationships"""
-        pass
+        generations = self.graph.generations("max")
+        self.total_generations = max(generations) + 1 if generations else 0
+        return self.total_generations
 
-    def calculate_generation(self, individual_id) -> int:
-        """Calculate the generation level of an individual."""
+    def calculate_generation(self, individual_id, policy="max") -> int:
+        """
+        Calculate the generation level of an individual.
+        Generations of the whole tree are computed in one pass on the first call; later calls are lookups.
+        :param policy: "max" places a child below the deepest of its parents, "min" below the shallowest.
+        """
         if individual_id not in self.individuals:
             return None
-        generation = 0
-        child_to_parents_copy = self.child_to_parents.copy()
-        while individual_id in child_to_parents_copy and child_to_parents_copy[individual_id]:
-            individual_id = child_to_parents_copy[individual_id].pop()
-            generation += 1
-        return generation
+        return self.graph.generation(self.ids.get(individual_id), policy)
+
+
+    def _cohort(self, individual_ids) -> List[int]:
+        nodes = [self.ids.get(individual_id) for individual_id in individual_ids]
+        missing = [individual_id for individual_id, node in zip(individual_ids, nodes) if node is None]
+        if missing:
+            raise ValueError(f"Individual IDs {missing} not found.")
+        return nodes
+
+    def kinship_matrix(self, individual_ids, dtype="float64", path=None, relationship=False):
+        """
+        Kinship coefficients between every pair of a cohort, as a numpy matrix in the order of individual_ids.
+        Computed by the tabular method over the cohort and their ancestors, one generation at a time.
+        :param dtype: "float32" halves the memory needed.
+        :param path: Hold the working table and the result in memory-mapped files instead of in RAM,
+                     for cohorts whose matrix does not fit. The result is the memory map at path.
+        :param relationship: Coefficient of relationship instead, e.g. 0.5 for a parent and child.
+        :raises ValueError: If an individual does not exist.
+        """
+        individual_ids = list(individual_ids)
+        return kinship_matrix(self.graph, self._cohort(individual_ids), dtype, path, relationship)
+
+    def kinship_pairs(self, individual_ids, threshold, dtype="float64", path=None, relationship=False):
+        """
+        The pairs of a cohort whose kinship coefficient is at least threshold, without building the full matrix.
+        :param path: Hold the working table in a memory-mapped file, removed afterwards.
+        :return: List of (individual1, individual2, coefficient).
+        :raises ValueError: If an individual does not exist.
+        """
+        individual_ids = list(individual_ids)
+        firsts, seconds, coefficients = kinship_pairs(self.graph, self._cohort(individual_ids), threshold, dtype,
+                                                      path, relationship)
+        return [(individual_ids[first], individual_ids[second], float(coefficient))
+                for first, second, coefficient in zip(firsts, seconds, coefficients)]
+
+    def inbreeding_coefficients(self) -> dict:
+        """
+        Inbreeding coefficient of every individual, 0 when their parents are unrelated or unknown.
+        Computed once for the whole tree and kept with the data, so a snapshot saved afterwards includes it.
+        """
+        if "inbreeding" not in self.analyses:
+            self.analyses["inbreeding"] = inbreeding_coefficients(self.graph, self._ancestors())
+        coefficients = self.analyses["inbreeding"]
+        return {individual_id: coefficients[self.ids.get(individual_id)] for individual_id in self.individuals}
 
+    def pedigree_collapse(self, individual_id=None):
+        """
+        Pedigree collapse report: for each generation back, the ancestor slots filled in the tree
+        and the distinct ancestors filling them, against the theoretical 2^generation.
+        Computed once for the whole tree and kept with the data, like inbreeding_coefficients().
+        :return: List of (generation, ancestor slots, distinct ancestors) for one individual,
+                 or individual ID -> that list for everyone when no ID is given.
+        """
+        if "pedigree_collapse" not in self.analyses:
+            self.analyses["pedigree_collapse"] = {node: pedigree_collapse(self.graph, node)
+                                                  for node in range(len(self.ids))}
+        collapse = self.analyses["pedigree_collapse"]
+        if individual_id is not None:
+            return collapse.get(self.ids.get(individual_id), []) if self.individual_exists(individual_id) else []
+        return {individual_id: collapse.get(self.ids.get(individual_id), []) for individual_id in self.individuals}
+
+    def build_relationship_graph(self, relationship_type) -> CSR:
+        """Adjacency of the stored relationships of one type, Source -> Target. Edges to a missing individual are dropped."""
+        if relationship_type not in self._relationship_graphs:
+            pairs = [(source, target) for source, target in self.edges.pairs(relationship_type)
+                     if source != NO_ROW and target != NO_ROW]
+            self._relationship_graphs[relationship_type] = CSR.from_edges(
+                len(self.ids), (source for source, _ in pairs), (target for _, target in pairs))
+        return self._relationship_graphs[relationship_type]
+
+    def longest_relationship_chains(self, relationship_type, k=1):
+        """
+        Find the k longest chains of IDs for the specified relationship type, e.g. the deepest
+        documented lines for "parent-child". Chains end at distinct individuals.
+        :return: List of (chain length in steps, chain of IDs), longest first.
+        :raises ValueError: If the relationships of this type form a cycle, as spouse and sibling relationships do.
+        """
+        return [(length, [self.ids.xref(node) for node in path])
+                for length, path in self.build_relationship_graph(relationship_type).longest_paths(k)]
 
     def longest_relationship_chain(self, relationship_type):
         """
         Find the longest chain of IDs for the specified relationship type.
         """
-        # Build the graph
-        graph = self.build_relationship_graph(self.relationships, relationship_type)
+        chains = self.longest_relationship_chains(relationship_type)
+        return chains[0][1] if chains else []
+
+    def build_ancestor_index(self, lazy=True, max_bytes=DEFAULT_MAX_BYTES) -> AncestorIndex:
+        """
+        (Re)build the ancestor bitset index used by the common ancestor queries.
+        :param lazy: Build each individual's bitset on first use instead of for the whole tree up front.
+        :param max_bytes: Cap on the bitsets kept, or None for no cap.
+        """
+        self.ancestor_index = AncestorIndex(self.graph, lazy=lazy, max_bytes=max_bytes)
+        return self.ancestor_index
 
-        # Find the longest chain by exploring all nodes
-        longest_chain = []
-        visited = set()
-        for node in graph:
-            chain = self.dfs_longest_chain(graph, node, visited)
-            if len(chain) > len(longest_chain):
-                longest_chain = chain
+    def _ancestors(self) -> AncestorIndex:
+        if self.ancestor_index is None:
+            self.build_ancestor_index()
+        return self.ancestor_index
 
-        return longest_chain
+    @cached_query
+    def get_common_ancestors(self, individual1, individual2) -> frozenset:
+        """
+        Retrieve the common ancestors of two individuals, counting each individual as their own ancestor.
+        Cached, like the other traversal and ancestor queries: results are frozen and kept until the next edit.
+        """
+        index = self._ancestors()
+        return self.ids.xref_set(index.nodes(index.common_ancestors(self.ids.get(individual1), self.ids.get(individual2))))
 
+    @cached_query
     def find_common_ancestor(self, individual1, individual2):
         """
         Find the most recent common ancestor between two individuals.
@@ -194,77 +615,370 @@ class RelationshipManager:
         :param individual2: ID of the second individual.
         :return: The most recent common ancestor or None if no common ancestor exists.
         """
-        # Helper function to trace ancestors of a given individual
-        def trace_ancestors(individual):
-            ancestors = set()
-            stack = [individual]
-            while stack:
-                current = stack.pop()
-                if current in ancestors:
-                    continue
-                ancestors.add(current)
-                parents = self.families.get(current, {}).get('parents', [])
-                stack.extend(parents)
-            return ancestors
-
-        # Get ancestors for both individuals
-        ancestors1 = trace_ancestors(individual1)
-        ancestors2 = trace_ancestors(individual2)
-
-        # Find common ancestors
-        common_ancestors = ancestors1.intersection(ancestors2)
-
-        if not common_ancestors:
-            return None
-
-        # Determine the most recent common ancestor
-        def generational_distance(ancestor):
-            return max(
-                self.calculate_generational_distance(individual1, ancestor),
-                self.calculate_generational_distance(individual2, ancestor)
-            )
-
-        most_recent_common_ancestor = min(common_ancestors, key=generational_distance)
-        return most_recent_common_ancestor
+        ancestors = self._ancestors().most_recent_common_ancestors(self.ids.get(individual1), self.ids.get(individual2))
+        return self.ids.xref(ancestors[0]) if ancestors else None
 
+    @cached_query
     def calculate_generational_distance(self, individual1, individual2):
         """
-        Calculate the generational distance between two individuals, considering relationships such as parent-child,
-        siblings, and spouses.
+        Calculate the generational distance between two individuals: the generations from the further of the two
+        up to their most recent common ancestor. 1 for a parent and child, also 1 for siblings.
+        :return: The distance, or None if the individuals have no common ancestor (e.g. spouses).
         """
-        # Helper function to trace ancestors of a given individual
-        def trace_ancestors(individual):
-            ancestors = set()
-            stack = [individual]
-            while stack:
-                current = stack.pop()
-                if current in ancestors:
-                    continue
-                ancestors.add(current)
-                parents = self.get_parents(current)
-                stack.extend(parents)
-            return ancestors
-
-        # Get ancestors for both individuals
-        ancestors1 = trace_ancestors(individual1)
-        ancestors2 = trace_ancestors(individual2)
-
-        # Find common ancestors
-        common_ancestors = ancestors1.intersection(ancestors2)
+        index = self._ancestors()
+        node1, node2 = self.ids.get(individual1), self.ids.get(individual2)
+        distances = [max(index.distance(node1, ancestor), index.distance(node2, ancestor))
+                     for ancestor in index.most_recent_common_ancestors(node1, node2)]
+        return min(distances) if distances else None
+
+    """ Mutation Methods """
+
+    # Edits patch the graph, the family index and the component index in place, costing the neighborhood
+    # of the edit rather than a rebuild. The ancestor index is dropped and rebuilt on next use; the analyses
+    # are recomputed for the individuals below the edit only. Stored relationships are the source's record
+    # and are not rewritten.
+
+    def _individual_table(self) -> Optional[IndividualTable]:
+        if isinstance(self.individuals, TableView) and self.individuals.table.ids is self.ids:
+            return self.individuals.table
+        return None
+
+    def _family_table(self) -> Optional[FamilyTable]:
+        if isinstance(self.families, TableView) and self.families.table.individuals.ids is self.ids:
+            return self.families.table
+        return None
+
+    def _require_individual(self, individual_id):
+        if individual_id is not None and individual_id not in self.individuals:
+            raise ValueError(f"Individual ID {individual_id} not found.")
 
-        if not common_ancestors:
+    def _family_members(self, family_id) -> Optional[Tuple[int, int, List[int]]]:
+        """(husband, wife, children) nodes of a family, NO_ROW for a missing spouse, or None if there is none."""
+        table = self._family_table()
+        if table is not None:
+            row = table.ids.get(family_id)
+            if row is None or not table.has_row(row):
+                return None
+            return table.husbands[row], table.wives[row], list(table.child_rows(row))
+        family = self.families.get(family_id)
+        if family is None:
             return None
 
-        # Determine the most recent common ancestor
-        def generational_distance(ancestor):
-            return max(
-                self.calculate_generational_distance(individual1, ancestor),
-                self.calculate_generational_distance(individual2, ancestor)
-            )
-
-        most_recent_common_ancestor = min(common_ancestors, key=generational_distance)
-        return most_recent_common_ancestor
-
+        def node(xref_id) -> int:
+            number = self.ids.get(xref_id)
+            return NO_ROW if number is None else number
+
+        return node(family.husband_id), node(family.wife_id), [node(child.id) for child in family.children]
+
+    def _last_family(self, child: int) -> Optional[int]:
+        """Number of the last family listing child, whose spouses are their parents, or None."""
+        families = self.family_index.as_child_csr.neighbors(child)
+        return max(families) if len(families) else None
+
+    def _edited(self, nodes: Iterable[int] = ()):
+        """:param nodes: Nodes added or whose parents changed."""
+        self.ancestor_index = None
+        self._update_analyses(nodes)
+        self.version += 1
+
+    def _update_analyses(self, nodes: Iterable[int]):
+        """Recompute the analyses of nodes and their descendants, the only pedigrees an edit of their parents changes."""
+        if not self.analyses:
+            return
+        below, pending = set(nodes), list(nodes)
+        while pending:
+            for child in self.graph.children(pending.pop()):
+                if child not in below:
+                    below.add(child)
+                    pending.append(child)
+        if not below:
+            return
+        inbreeding = self.analyses.get("inbreeding")
+        if inbreeding is not None and not update_inbreeding(self.graph, inbreeding, below):
+            # A parent cycle, recomputed for the whole tree on next use
+            del self.analyses["inbreeding"]
+        collapse = self.analyses.get("pedigree_collapse")
+        if collapse is not None:
+            for node in below:
+                collapse[node] = pedigree_collapse(self.graph, node)
+
+    def add_individual(self, individual: Individual):
+        """
+        Add an individual, in no family yet.
+        :raises ValueError: If the ID already exists.
+        """
+        if individual.id in self.individuals:
+            raise ValueError(f"Individual ID {individual.id} already exists.")
+        table = self._individual_table()
+        if table is not None:
+            table.add_individual(individual)
+        else:
+            self.individuals[individual.id] = individual
+            self.ids.intern(individual.id)
+        n = len(self.ids)
+        self.graph.grow(n)
+        self.family_index.grow(n)
+        if self.component_index is not None:
+            self.component_index.grow(n)
+        self._edited([self.ids.get(individual.id)])
+
+    def update_individual(self, individual_id, **fields):
+        """
+        Change the details of an individual, e.g. update_individual("I1", death_date="1901").
+        :raises ValueError: If the individual does not exist or a field is not one of theirs.
+        """
+        self._require_individual(individual_id)
+        unknown = set(fields) - set(_INDIVIDUAL_FIELDS)
+        if unknown:
+            raise ValueError(f"Invalid individual fields {sorted(unknown)}. Choose from {_INDIVIDUAL_FIELDS}.")
+        table = self._individual_table()
+        if table is not None:
+            row = self.ids.get(individual_id)
+            for field, value in fields.items():
+                getattr(table, field + "s")[row] = value
+        else:
+            individual = self.individuals[individual_id]
+            for field, value in fields.items():
+                setattr(individual, field, value)
+        self.version += 1
+
+    def remove_individual(self, individual_id):
+        """
+        Remove an individual, taking them out of every family they are a child or spouse in.
+        :raises ValueError: If the individual does not exist.
+        """
+        self._require_individual(individual_id)
+        node = self.ids.get(individual_id)
+        for family_id in self.family_index.as_child(node):
+            self.remove_child_from_family(family_id, individual_id)
+        for family_id in self.family_index.as_spouse(node):
+            husband, wife, _ = self._family_members(family_id)
+            self.update_family(family_id, **{"husband_id" if husband == node else "wife_id": None})
+        table = self._individual_table()
+        if table is not None:
+            table.remove(individual_id)
+        else:
+            del self.individuals[individual_id]
+        for lookup in (self.spouse_relationships, self.sibling_relationships):
+            for other in lookup.pop(node, ()):
+                if other in lookup:
+                    lookup[other] = lookup[other] - {node}
+        self._edited()
+
+    def add_family(self, family_id, husband_id=None, wife_id=None, child_ids=(), marr_date=None):
+        """
+        Add a family of existing individuals.
+        :raises ValueError: If the family already exists or one of its members does not.
+        """
+        if self._family_members(family_id) is not None:
+            raise ValueError(f"Family ID {family_id} already exists.")
+        self._set_family(family_id, husband_id, wife_id, list(child_ids), marr_date)
 
+    def update_family(self, family_id, husband_id=_KEEP, wife_id=_KEEP, child_ids=_KEEP, marr_date=_KEEP):
+        """
+        Change the spouses, children or marriage date of a family; fields not given are kept.
+        Pass None to leave a spouse unknown.
+        :raises ValueError: If the family or one of its new members does not exist.
+        """
+        members = self._family_members(family_id)
+        if members is None:
+            raise ValueError(f"Family ID {family_id} not found.")
+        family = self.families[family_id]
+        husband, wife, children = members
+        self._set_family(
+            family_id,
+            self.ids.xref(None if husband == NO_ROW else husband) if husband_id is _KEEP else husband_id,
+            self.ids.xref(None if wife == NO_ROW else wife) if wife_id is _KEEP else wife_id,
+            [self.ids.xref(child) for child in children] if child_ids is _KEEP else list(child_ids),
+            family.marr_date if marr_date is _KEEP else marr_date,
+        )
+
+    def remove_family(self, family_id):
+        """
+        Remove a family. Its members stay, without the links the family gave them.
+        :raises ValueError: If the family does not exist.
+        """
+        if self._family_members(family_id) is None:
+            raise ValueError(f"Family ID {family_id} not found.")
+        self._set_family(family_id, None, None, [], None, remove=True)
 
+    def add_child_to_family(self, family_id, child_id):
+        """
+        Add an existing individual as the last child of a family.
+        :raises ValueError: If the family or the individual does not exist.
+        """
+        members = self._family_members(family_id)
+        if members is None:
+            raise ValueError(f"Family ID {family_id} not found.")
+        child_ids = [self.ids.xref(child) for child in members[2]]
+        if child_id not in child_ids:
+            self.update_family(family_id, child_ids=child_ids + [child_id])
+
+    def remove_child_from_family(self, family_id, child_id):
+        """
+        Remove a child from a family, keeping the individual.
+        :raises ValueError: If the family does not exist.
+        """
+        members = self._family_members(family_id)
+        if members is None:
+            raise ValueError(f"Family ID {family_id} not found.")
+        self.update_family(family_id, child_ids=[self.ids.xref(child) for child in members[2]
+                                                 if self.ids.xref(child) != child_id])
 
+    def apply_changeset(self, changeset: Changeset) -> Set[int]:
+        """
+        Apply the records added, modified and removed between two GEDCOM exports through the edit methods above.
+        Pointers to individuals not in the tree are dropped, as the parser drops them.
+        :return: Nodes whose parents, children, spouses or step-children may have changed.
+        """
+        touched = set()
+
+        def touch(family_id):
+            members = self._family_members(family_id)
+            if members is not None:
+                husband, wife, children = members
+                touched.update(children)
+                for spouse in (husband, wife):
+                    if spouse != NO_ROW:
+                        touched.add(spouse)
+                        touched.update(self.graph.spouses(spouse))
+
+        removed = [self.ids.get(individual_id) for individual_id in changeset.removed_individuals
+                   if individual_id in self.individuals]
+        changed_families = [family_id for family_id in (*changeset.removed_families, *changeset.families)
+                            if family_id in self.families]
+        changed_families += [family_id for node in removed
+                             for family_id in (*self.family_index.as_child(node), *self.family_index.as_spouse(node))]
+        for family_id in changed_families:
+            touch(family_id)
+
+        for individual_id, individual in changeset.individuals.items():
+            if individual_id in self.individuals:
+                self.update_individual(individual_id, **{field: getattr(individual, field)
+                                                         for field in _INDIVIDUAL_FIELDS})
+            else:
+                self.add_individual(individual)
+        for family_id in changeset.removed_families:
+            if family_id in self.families:
+                self.remove_family(family_id)
+        for family_id, (_, husband_id, wife_id, child_ids, marr_date) in changeset.families.items():
+            known = [individual_id if individual_id in self.individuals else None
+                     for individual_id in (husband_id, wife_id)]
+            child_ids = [child_id for child_id in child_ids if child_id in self.individuals]
+            if family_id in self.families:
+                self.update_family(family_id, *known, child_ids=child_ids, marr_date=marr_date)
+            else:
+                self.add_family(family_id, *known, child_ids=child_ids, marr_date=marr_date)
+        for node in removed:
+            self.remove_individual(self.ids.xref(node))
+
+        touched.update(removed)
+        for family_id in (*changed_families, *changeset.families):
+            touch(family_id)
+        touched.discard(NO_ROW)
+        return touched
+
+    def _set_family(self, family_id, husband_id, wife_id, child_ids, marr_date, remove=False):
+        """Write a family and patch the indexes built from the families around it."""
+        for individual_id in (husband_id, wife_id, *child_ids):
+            self._require_individual(individual_id)
+        old_husband, old_wife, old_children = self._family_members(family_id) or (NO_ROW, NO_ROW, [])
+
+        table = self._family_table()
+        if remove:
+            if table is not None:
+                table.remove(family_id)
+            else:
+                del self.families[family_id]
+        elif table is not None:
+            table.add(family_id, self.ids.get(husband_id), self.ids.get(wife_id), date_string(marr_date),
+                      [self.ids.get(child_id) for child_id in child_ids])
+        else:
+            self.families[family_id] = Family.from_individuals(
+                family_id, self.individuals.get(husband_id), self.individuals.get(wife_id), marr_date,
+                [self.individuals[child_id] for child_id in child_ids])
+        husband, wife, children = (NO_ROW, NO_ROW, []) if remove else self._family_members(family_id)
+
+        index = self.family_index
+        index.update(family_id, ((old_husband, old_wife), old_children), ((husband, wife), children))
+        if remove:
+            index.remove(family_id)
+
+        # A child's parents are the spouses of the last family listing them, and their children the reverse,
+        # so the old and new parents of the family's children are touched along with its spouses
+        parents = {}
+        touched = {husband, wife, old_husband, old_wife}
+        for child in set(old_children) | set(children):
+            touched.update(self.graph.known_parents(child))
+            family = self._last_family(child)
+            parents[child] = self._family_members(index.family_ids[family])[:2] if family is not None else ()
+            touched.update(parents[child])
+        touched.discard(NO_ROW)
+
+        children_of, spouses_of, listed_of = {}, {}, {}
+        for node in touched:
+            children_of[node], spouses_of[node] = set(), set()
+            for family in index.as_spouse_csr.neighbors(node):
+                family_husband, family_wife, family_children = self._family_members(index.family_ids[family])
+                children_of[node].update(child for child in family_children if self._last_family(child) == family)
+                if family_husband != NO_ROW and family_wife != NO_ROW:
+                    spouses_of[node].add(family_wife if family_husband == node else family_husband)
+
+        def listed(node) -> Set[int]:
+            # Children listed in any family of node as a spouse, after the edit
+            if node not in listed_of:
+                listed_of[node] = {child for family_id in index.as_spouse(node)
+                                   for child in self._family_members(family_id)[2]}
+            return listed_of[node]
+
+        # A step-child is a spouse's child not listed in a family of one's own, so the spouses
+        # of the touched nodes, before and after the edit, may gain or lose step-children too
+        step_children = {}
+        for node in touched:
+            for spouse in {node, *self.graph.spouses(node), *spouses_of[node]}:
+                if spouse in step_children:
+                    continue
+                step_children[spouse] = {child for partner in spouses_of.get(spouse, self.graph.spouses(spouse))
+                                         for child in children_of.get(partner, self.graph.children(partner))
+                                         if child not in listed(spouse)}
+
+        self.graph.update(parents=parents, children=children_of, spouses=spouses_of, step_children=step_children)
+
+        if self.component_index is not None:
+            old_members = {old_husband, old_wife, *old_children} - {NO_ROW}
+            new_members = {husband, wife, *children} - {NO_ROW}
+            if old_members <= new_members:
+                self.component_index.union(new_members)
+            else:
+                # Union-find cannot split a component, rebuild on next use
+                self.component_index = None
+        self._edited(parents)
+
+
+# The RelationshipManager whose indexes a batch worker process answers from, set as the worker starts,
+# see describe_relationships()
+_batch_manager: Optional[RelationshipManager] = None
+
+
+def _init_batch_worker(manager: RelationshipManager):
+    global _batch_manager
+    _batch_manager = manager
+
+
+def _chunks(pairs: Iterable[Tuple[str, str]], size: int) -> Iterator[List[Tuple[str, str]]]:
+    pairs = iter(pairs)
+    while True:
+        chunk = [tuple(pair) for pair in islice(pairs, size)]
+        if not chunk:
+            return
+        yield chunk
+
+
+def _describe_chunk(chunk: List[Tuple[str, str]], manager: RelationshipManager = None) -> List[RelationshipDescription]:
+    """Descriptions of a chunk of pairs, each distinct pair described once."""
+    manager = manager or _batch_manager
+    described = {}
+    for pair in chunk:
+        if pair not in described:
+            described[pair] = manager.describe_relationship(*pair)
+    return [described[pair] for pair in chunk]
@@ -0,0 +1,273 @@
+import gc
+import hashlib
+import os
+import pickle
+from contextlib import contextmanager
+
+from .edges import EdgeTable
+from .id_table import IdTable
+from .tables import IndividualTable, FamilyTable, TableView
+
+SNAPSHOT_VERSION = 8
+SNAPSHOT_MAGIC = b"KINSNAP\n"
+SNAPSHOT_SUFFIX = ".snap"
+DEFAULT_CACHE_DIR = os.path.join("output", "cache")
+DEFAULT_CACHE_BYTES = 1 << 30
+
+_INDIVIDUAL_COLUMNS = ("full_names", "birth_dates", "birth_places", "death_dates", "death_places")
+
+# What pickle.load() raises on a truncated or damaged stream, besides UnpicklingError
+_UNPICKLE_ERRORS = (pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError, ValueError, TypeError)
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot is unreadable or was written by another format version."""
+
+
+@contextmanager
+def _gc_paused():
+    # Unpickling allocates millions of small containers, each of which would trigger collections
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def file_digest(file_path, chunk_size=1 << 20) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_key(file_path, digest=None) -> dict:
+    """Identity of a GEDCOM file: content hash, size and mtime."""
+    stat = os.stat(file_path)
+    return {
+        "digest": digest or file_digest(file_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def _individual_table(data) -> IndividualTable:
+    """The individuals table behind data, or a new one filled from plain Individual objects."""
+    if isinstance(data.individuals, TableView):
+        return data.individuals.table
+    table = IndividualTable(IdTable(data.ids.xrefs) if data.ids is not None else None)
+    for ind in data.individuals.values():
+        table.add_individual(ind)
+    return table
+
+
+def _family_table(data, individuals: IndividualTable) -> FamilyTable:
+    if isinstance(data.families, TableView) and data.families.table.individuals is individuals:
+        return data.families.table
+    table = FamilyTable(individuals)
+    index = individuals.ids.index
+    for fam in data.families.values():
+        table.add(fam.id, index.get(fam.husband_id), index.get(fam.wife_id), fam.marr_date,
+                  [index[child.id] for child in fam.children])
+    return table
+
+
+def save_snapshot(data, path, source=None):
+    """
+    Write individuals, families, relationships, the analyses and the record digests of a FamilyTreeData.
+    Individuals and families are stored as the columns of their tables, so loading needs
+    no per-record objects.
+    """
+    individuals = _individual_table(data)
+    families = _family_table(data, individuals)
+    relationships = data.relationships
+    if not isinstance(relationships, EdgeTable) or relationships.ids is not individuals.ids:
+        relationships = EdgeTable.from_rows(individuals.ids, relationships)
+    body = {
+        "ids": individuals.ids.xrefs,
+        "individuals": (bytes(individuals.present),) + tuple(getattr(individuals, c) for c in _INDIVIDUAL_COLUMNS),
+        "families": (
+            families.ids.xrefs, bytes(families.present), families.husbands, families.wives,
+            families.marr_dates, families.child_offsets, families.children,
+        ),
+        "relationships": (relationships.sources, relationships.targets, relationships.types, relationships.type_names),
+        "analyses": data.analyses,
+        "record_digests": data.record_digests,
+    }
+    header = {"version": SNAPSHOT_VERSION, "source": source}
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(SNAPSHOT_MAGIC)
+        pickle.dump(header, file, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(body, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def read_snapshot_header(file) -> dict:
+    if file.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+        raise SnapshotError("Not a kinship snapshot.")
+    try:
+        header = pickle.load(file)
+    except _UNPICKLE_ERRORS as e:
+        raise SnapshotError(f"Unreadable snapshot header: {e}")
+    if not isinstance(header, dict):
+        raise SnapshotError("Malformed snapshot header.")
+    if header.get("version") != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Snapshot version {header.get('version')} is not {SNAPSHOT_VERSION}.")
+    return header
+
+
+def load_snapshot(data, path, digest=None):
+    """
+    Fill a FamilyTreeData from a snapshot written by save_snapshot(). Returns the snapshot header.
+    :param digest: When given, the snapshot must have been saved from a GEDCOM file with this content hash.
+    """
+    with open(path, "rb") as file, _gc_paused():
+        header = read_snapshot_header(file)
+        if digest is not None and (header.get("source") or {}).get("digest") != digest:
+            raise SnapshotError("Snapshot was saved from a different GEDCOM file.")
+        try:
+            body = pickle.load(file)
+        except _UNPICKLE_ERRORS as e:
+            raise SnapshotError(f"Unreadable snapshot body: {e}")
+
+        try:
+            individuals = IndividualTable(IdTable(body["ids"]))
+            present, *columns = body["individuals"]
+            individuals.present = bytearray(present)
+            individuals.count = individuals.present.count(1)
+            for name, column in zip(_INDIVIDUAL_COLUMNS, columns):
+                setattr(individuals, name, column)
+
+            family_xrefs, present, husbands, wives, marr_dates, child_offsets, children = body["families"]
+            families = FamilyTable(individuals, IdTable(family_xrefs))
+            families.present = bytearray(present)
+            families.count = families.present.count(1)
+            families.husbands, families.wives, families.marr_dates = husbands, wives, marr_dates
+            families.child_offsets, families.children = child_offsets, children
+
+            relationships = EdgeTable(individuals.ids, *body["relationships"])
+            analyses, digests = body["analyses"], body["record_digests"]
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            # A body missing fields or holding the wrong types, checked before data is touched
+            raise SnapshotError(f"Malformed snapshot body: {e!r}")
+
+    data._load_from_objs(TableView(individuals), TableView(families), relationships)
+    data.ids = individuals.ids
+    data.analyses = analyses
+    data.record_digests = digests
+    return header
+
+
+class SnapshotCache:
+    """
+    Directory of snapshots named by the content hash of the GEDCOM file they were parsed from.
+    A small hint file per GEDCOM path records the size, mtime and hash seen last time,
+    so an unchanged file is matched without hashing it again, and the hash of the snapshot put last,
+    so a changed file can be diffed against it (see latest()).
+    Least recently used snapshots are evicted once the directory grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _hint_path(self, file_path):
+        path_hash = hashlib.blake2b(os.path.abspath(file_path).encode(), digest_size=10).hexdigest()
+        return os.path.join(self.cache_dir, f"{path_hash}.hint")
+
+    def _latest_path(self, file_path):
+        return self._hint_path(file_path)[:-len(".hint")] + ".latest"
+
+    def _snapshot_path(self, digest):
+        return os.path.join(self.cache_dir, digest + SNAPSHOT_SUFFIX)
+
+    def _digest(self, file_path):
+        """Content hash of the file, reusing the hinted hash when size and mtime are unchanged."""
+        stat = os.stat(file_path)
+        try:
+            with open(self._hint_path(file_path)) as file:
+                size, mtime_ns, digest = file.read().split()
+            if int(size) == stat.st_size and int(mtime_ns) == stat.st_mtime_ns:
+                return digest
+        except (OSError, ValueError):
+            pass
+        digest = file_digest(file_path)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._hint_path(file_path), "w") as file:
+            file.write(f"{stat.st_size} {stat.st_mtime_ns} {digest}")
+        return digest
+
+    def get(self, file_path, data) -> bool:
+        """
+        Load the snapshot of file_path into data. Returns False on a miss or a stale snapshot;
+        an unreadable snapshot is removed too, so the full parse that follows can put a good one.
+        """
+        digest = self._digest(file_path)
+        path = self._snapshot_path(digest)
+        try:
+            load_snapshot(data, path, digest)
+        except OSError:
+            return False
+        except SnapshotError:
+            _remove(path)
+            return False
+        os.utime(path)
+        return True
+
+    def latest(self, file_path, data) -> bool:
+        """
+        Load the snapshot put last for file_path into data, whatever the file holds now, e.g. the previous
+        night's export to diff a new one against. Returns False if there is none.
+        """
+        try:
+            with open(self._latest_path(file_path)) as file:
+                path = self._snapshot_path(file.read().strip())
+            load_snapshot(data, path)
+        except OSError:
+            return False
+        except SnapshotError:
+            _remove(path)
+            return False
+        os.utime(path)
+        return True
+
+    def put(self, file_path, data):
+        digest = self._digest(file_path)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        save_snapshot(data, self._snapshot_path(digest), source_key(file_path, digest))
+        with open(self._latest_path(file_path), "w") as file:
+            file.write(digest)
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used snapshots until the cache fits in max_bytes."""
+        snapshots = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(SNAPSHOT_SUFFIX):
+                stat = entry.stat()
+                snapshots.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in snapshots)
+        for _, size, path in sorted(snapshots):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def clear(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith((SNAPSHOT_SUFFIX, ".hint", ".latest")):
+                os.remove(entry.path)
@@ -0,0 +1,272 @@
+import os
+import sqlite3
+from collections.abc import Mapping
+from typing import Iterator, List, Optional, Tuple
+
+from .edges import EdgeTable
+from .family import Family
+from .graph import KinshipGraph
+from .id_table import IdTable
+from .individual import Individual
+from .tables import NO_ROW
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE individuals (
+    id TEXT PRIMARY KEY, node INTEGER NOT NULL, full_name TEXT,
+    birth_date TEXT, birth_place TEXT, death_date TEXT, death_place TEXT
+);
+CREATE TABLE families (id TEXT PRIMARY KEY, husband_id TEXT, wife_id TEXT, marr_date TEXT);
+CREATE TABLE family_children (family_id TEXT NOT NULL, child_id TEXT NOT NULL, position INTEGER NOT NULL);
+-- Known parents as KinshipGraph derives them: the spouses of the last family listing the child
+CREATE TABLE parents (child_id TEXT NOT NULL, parent_id TEXT NOT NULL);
+CREATE TABLE relationships (source_id TEXT, target_id TEXT, relationship TEXT NOT NULL);
+"""
+
+_INDEXES = """
+CREATE UNIQUE INDEX individuals_node ON individuals (node);
+CREATE INDEX families_husband ON families (husband_id);
+CREATE INDEX families_wife ON families (wife_id);
+CREATE INDEX family_children_family ON family_children (family_id, position);
+CREATE INDEX family_children_child ON family_children (child_id);
+CREATE INDEX parents_child ON parents (child_id, parent_id);
+CREATE INDEX parents_parent ON parents (parent_id, child_id);
+CREATE INDEX relationships_source ON relationships (source_id, relationship);
+CREATE INDEX relationships_target ON relationships (target_id, relationship);
+"""
+
+_INDIVIDUAL_COLUMNS = "id, full_name, birth_date, birth_place, death_date, death_place"
+
+# Closure along the parents table, each individual once, so a parent cycle cannot recurse forever
+_CLOSURE = """
+WITH RECURSIVE closure(id) AS (
+    SELECT {next} FROM parents WHERE {this} = ?
+    UNION
+    SELECT parents.{next} FROM parents JOIN closure ON parents.{this} = closure.id
+)
+SELECT id FROM closure
+"""
+
+# Closure up to a number of generations; pairs repeat only per generation, so the depth bounds the rows
+_LEVELS = """
+WITH RECURSIVE levels(id, generation) AS (
+    SELECT {next}, 1 FROM parents WHERE {this} = ?
+    UNION
+    SELECT parents.{next}, levels.generation + 1 FROM parents JOIN levels ON parents.{this} = levels.id
+    WHERE levels.generation < ?
+)
+SELECT DISTINCT id FROM levels
+"""
+
+UP = ("child_id", "parent_id")
+DOWN = ("parent_id", "child_id")
+
+
+class SqliteError(Exception):
+    """Raised when a file is not a kinship database or was written by another schema version."""
+
+
+def _text(value) -> Optional[str]:
+    return None if value is None or value == "" else str(value)
+
+
+def save_sqlite(data, path):
+    """
+    Write the individuals, families, family children, known parents and relationships of a FamilyTreeData
+    to a new SQLite database at path, in one transaction of executemany() inserts, then index the lookup columns.
+    Dates are stored as their text, as in the CSV output.
+    """
+    ids = data.ids if data.ids is not None else IdTable(data.individuals)
+    graph = KinshipGraph.from_data(data.families, ids)
+    relationships = data.relationships
+    if not isinstance(relationships, EdgeTable) or relationships.ids is not ids:
+        relationships = EdgeTable.from_rows(ids, relationships)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        with connection:
+            connection.executescript(_SCHEMA)
+            connection.executemany(
+                f"INSERT INTO individuals (node, {_INDIVIDUAL_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((ids.get(individual_id), individual_id, ind.full_name, _text(ind.birth_date), _text(ind.birth_place),
+                  _text(ind.death_date), _text(ind.death_place)) for individual_id, ind in data.individuals.items()))
+            connection.executemany(
+                "INSERT INTO families (id, husband_id, wife_id, marr_date) VALUES (?, ?, ?, ?)",
+                ((family_id, family.husband_id, family.wife_id, _text(family.marr_date))
+                 for family_id, family in data.families.items()))
+            connection.executemany(
+                "INSERT INTO family_children (family_id, child_id, position) VALUES (?, ?, ?)",
+                ((family_id, child.id, position) for family_id, family in data.families.items()
+                 for position, child in enumerate(family.children)))
+            connection.executemany(
+                "INSERT INTO parents (child_id, parent_id) VALUES (?, ?)",
+                ((ids.xref(child), ids.xref(parent)) for child in range(len(ids))
+                 for parent in graph.parents(child) if parent != NO_ROW))
+            connection.executemany(
+                "INSERT INTO relationships (source_id, target_id, relationship) VALUES (?, ?, ?)",
+                relationships.xref_rows())
+            connection.executescript(_INDEXES)
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    finally:
+        connection.close()
+    os.replace(tmp_path, path)
+
+
+class SqliteStore:
+    """
+    Read-only family tree in a SQLite database written by save_sqlite(). Records are read when looked up,
+    and ancestor and descendant queries run as recursive CTEs over the indexed parents table,
+    so nothing is loaded up front. Each process opens its own connection, so worker processes
+    can share one database file.
+    """
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self.path = path
+        self._connection = None
+        self._pid = None
+        try:
+            version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        except sqlite3.DatabaseError as e:
+            raise SqliteError(f"Unreadable database: {e}")
+        if version != SCHEMA_VERSION:
+            self.close()
+            raise SqliteError(f"Database schema version {version} is not {SCHEMA_VERSION}.")
+        self.individuals = SqliteIndividuals(self)
+        self.families = SqliteFamilies(self)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # A connection must not cross a fork, so a worker opens its own on first use
+        if self._connection is None or self._pid != os.getpid():
+            try:
+                self._connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            except sqlite3.DatabaseError as e:
+                raise SqliteError(f"Unreadable database: {e}")
+            self._pid = os.getpid()
+        return self._connection
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def id_table(self) -> IdTable:
+        """IdTable numbering the individuals as they were numbered when saved."""
+        return IdTable(row[0] for row in self.connection.execute("SELECT id FROM individuals ORDER BY node"))
+
+    def ancestors(self, individual_id, depth: Optional[int] = 1) -> set:
+        """IDs of the ancestors of an individual up to depth generations, or all of them for depth=None."""
+        return self._closure(UP, individual_id, depth)
+
+    def descendants(self, individual_id, depth: Optional[int] = 1) -> set:
+        return self._closure(DOWN, individual_id, depth)
+
+    def _closure(self, direction: Tuple[str, str], individual_id, depth: Optional[int]) -> set:
+        this, next_ = direction
+        if depth is None:
+            rows = self.connection.execute(_CLOSURE.format(this=this, next=next_), (individual_id,))
+        elif depth < 1:
+            return set()
+        else:
+            rows = self.connection.execute(_LEVELS.format(this=this, next=next_), (individual_id, depth))
+        found = {row[0] for row in rows}
+        found.discard(individual_id)
+        return found
+
+    def iter_levels(self, direction: Tuple[str, str], individual_id, depth: Optional[int] = None,
+                    max_nodes: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """
+        (generation, ID) of each individual reached from individual_id along direction (UP or DOWN), once,
+        at their nearest generation. One indexed query per generation, so the caller can stop early.
+        """
+        this, next_ = direction
+        seen, frontier, generation, yielded = {individual_id}, [individual_id], 0, 0
+        while frontier and (depth is None or generation < depth):
+            generation += 1
+            found = set()
+            for start in range(0, len(frontier), 500):  # SQLite caps the parameters of one statement
+                chunk = frontier[start:start + 500]
+                found.update(row[0] for row in self.connection.execute(
+                    f"SELECT DISTINCT {next_} FROM parents WHERE {this} IN ({', '.join('?' * len(chunk))})", chunk))
+            frontier = sorted(found - seen)
+            seen.update(frontier)
+            for found_id in frontier:
+                yield generation, found_id
+                yielded += 1
+                if max_nodes is not None and yielded >= max_nodes:
+                    return
+
+    def relationships_of(self, individual_id) -> List[dict]:
+        """Stored relationships with the individual as source or target."""
+        rows = self.connection.execute(
+            "SELECT source_id, target_id, relationship FROM relationships WHERE source_id = ? "
+            "UNION ALL SELECT source_id, target_id, relationship FROM relationships WHERE target_id = ? "
+            "AND source_id IS NOT ?", (individual_id, individual_id, individual_id))
+        return [{"Source": source, "Target": target, "Relationship": relationship}
+                for source, target, relationship in rows]
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class SqliteIndividuals(Mapping):
+    """Read-only dict-like view of the individuals of a SqliteStore, reading each one when it is looked up."""
+
+    def __init__(self, store: SqliteStore):
+        self._store = store
+
+    def __getitem__(self, individual_id):
+        row = self._store.connection.execute(
+            f"SELECT {_INDIVIDUAL_COLUMNS} FROM individuals WHERE id = ?", (individual_id,)).fetchone()
+        if row is None:
+            raise KeyError(individual_id)
+        xref_id, full_name, birth_date, birth_place, death_date, death_place = row
+        return Individual(xref_id, full_name, birth_date, birth_place, death_date, death_place)
+
+    def __contains__(self, individual_id):
+        return self._store.connection.execute(
+            "SELECT 1 FROM individuals WHERE id = ?", (individual_id,)).fetchone() is not None
+
+    def __iter__(self):
+        return (row[0] for row in self._store.connection.execute("SELECT id FROM individuals ORDER BY node"))
+
+    def __len__(self):
+        return self._store.connection.execute("SELECT COUNT(*) FROM individuals").fetchone()[0]
+
+
+class SqliteFamilies(Mapping):
+    """Read-only dict-like view of the families of a SqliteStore, with their spouses and children read on lookup."""
+
+    def __init__(self, store: SqliteStore):
+        self._store = store
+
+    def __getitem__(self, family_id):
+        connection, individuals = self._store.connection, self._store.individuals
+        row = connection.execute(
+            "SELECT husband_id, wife_id, marr_date FROM families WHERE id = ?", (family_id,)).fetchone()
+        if row is None:
+            raise KeyError(family_id)
+        husband_id, wife_id, marr_date = row
+        children = [individuals[child_id] for (child_id,) in connection.execute(
+            "SELECT child_id FROM family_children WHERE family_id = ? ORDER BY position", (family_id,))]
+        return Family.from_individuals(family_id, individuals.get(husband_id) if husband_id else None,
+                                       individuals.get(wife_id) if wife_id else None, marr_date, children)
+
+    def __contains__(self, family_id):
+        return self._store.connection.execute(
+            "SELECT 1 FROM families WHERE id = ?", (family_id,)).fetchone() is not None
+
+    def __iter__(self):
+        return (row[0] for row in self._store.connection.execute("SELECT id FROM families ORDER BY rowid"))
+
+    def __len__(self):
+        return self._store.connection.execute("SELECT COUNT(*) FROM families").fetchone()[0]
@@ -0,0 +1,280 @@
+from array import array
+from collections.abc import ItemsView, Mapping, ValuesView
+from typing import List, Optional
+
+from .family import Family
+from .id_table import IdTable
+from .individual import Individual
+
+NO_ROW = -1
+
+
+class IndividualRow(Individual):
+    """Lightweight view of one row of an IndividualTable, with the Individual attribute API."""
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: "IndividualTable", row: int):
+        self._table = table
+        self._row = row
+
+    @property
+    def row(self) -> int:
+        return self._row
+
+    @property
+    def id(self):
+        return self._table.ids.xrefs[self._row]
+
+    @property
+    def full_name(self):
+        return self._table.full_names[self._row]
+
+    @property
+    def birth_date(self):
+        return self._table.birth_dates[self._row]
+
+    @property
+    def birth_place(self):
+        return self._table.birth_places[self._row]
+
+    @property
+    def death_date(self):
+        return self._table.death_dates[self._row]
+
+    @property
+    def death_place(self):
+        return self._table.death_places[self._row]
+
+    def __eq__(self, other):
+        return isinstance(other, IndividualRow) and other._table is self._table and other._row == self._row
+
+    def __hash__(self):
+        return hash((id(self._table), self._row))
+
+
+class FamilyRow(Family):
+    """Lightweight view of one row of a FamilyTable, with the Family attribute API."""
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: "FamilyTable", row: int):
+        self._table = table
+        self._row = row
+
+    @property
+    def row(self) -> int:
+        return self._row
+
+    @property
+    def id(self):
+        return self._table.ids.xrefs[self._row]
+
+    def _spouse(self, rows):
+        row = rows[self._row]
+        return None if row == NO_ROW else row
+
+    @property
+    def husband_id(self):
+        return self._table.individuals.ids.xref(self._spouse(self._table.husbands))
+
+    @property
+    def husband_name(self):
+        row = self._spouse(self._table.husbands)
+        return None if row is None else self._table.individuals.full_names[row]
+
+    @property
+    def wife_id(self):
+        return self._table.individuals.ids.xref(self._spouse(self._table.wives))
+
+    @property
+    def wife_name(self):
+        row = self._spouse(self._table.wives)
+        return None if row is None else self._table.individuals.full_names[row]
+
+    @property
+    def marr_date(self):
+        return self._table.marr_dates[self._row]
+
+    @property
+    def child_rows(self) -> array:
+        """Rows of the children in the individuals table."""
+        return self._table.child_rows(self._row)
+
+    @property
+    def children(self) -> List[IndividualRow]:
+        individuals = self._table.individuals
+        return [IndividualRow(individuals, row) for row in self.child_rows]
+
+    def __eq__(self, other):
+        return isinstance(other, FamilyRow) and other._table is self._table and other._row == self._row
+
+    def __hash__(self):
+        return hash((id(self._table), self._row))
+
+
+class _RowValues(ValuesView):
+    def __iter__(self):
+        table = self._mapping.table
+        for row in table.rows():
+            yield table.row(row)
+
+
+class _RowItems(ItemsView):
+    def __iter__(self):
+        table = self._mapping.table
+        xrefs = table.ids.xrefs
+        for row in table.rows():
+            yield xrefs[row], table.row(row)
+
+
+class TableView(Mapping):
+    """Read-only dict-like view of a table, mapping xref ids to row proxies."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def __getitem__(self, xref_id):
+        row = self.table.ids.index[xref_id]
+        if not self.table.has_row(row):
+            raise KeyError(xref_id)
+        return self.table.row(row)
+
+    def __contains__(self, xref_id):
+        row = self.table.ids.index.get(xref_id)
+        return row is not None and self.table.has_row(row)
+
+    def __iter__(self):
+        xrefs = self.table.ids.xrefs
+        return (xrefs[row] for row in self.table.rows())
+
+    def __len__(self):
+        return self.table.count
+
+    def values(self):
+        return _RowValues(self)
+
+    def items(self):
+        return _RowItems(self)
+
+
+class _Table:
+    """
+    Rows are numbered by an IdTable. The IdTable may hold ids that are not rows of this table
+    (it can be shared with the relationship maps), so each row carries a present flag.
+    Subclasses list their per-row columns in _COLUMNS, which _claim() grows together.
+    """
+    _COLUMNS = ()  # (column attribute, value of an empty row)
+
+    def __init__(self, ids: IdTable = None):
+        self.ids = ids if ids is not None else IdTable()
+        self.present = bytearray()
+        self.count = 0
+
+    def has_row(self, row: int) -> bool:
+        return row < len(self.present) and self.present[row] == 1
+
+    def rows(self):
+        if self.count == len(self.present):
+            return range(self.count)
+        return (row for row, flag in enumerate(self.present) if flag)
+
+    def _claim(self, xref_id: str) -> int:
+        """Row for an xref id, growing every column with empty values up to it."""
+        row = self.ids.intern(xref_id)
+        missing = row + 1 - len(self.present)
+        if missing > 0:
+            self.present.extend(bytes(missing))
+            self._grow(missing)
+        if not self.present[row]:
+            self.present[row] = 1
+            self.count += 1
+        return row
+
+    def remove(self, xref_id: str):
+        """Clear the row of an xref id. Its number stays in the IdTable."""
+        row = self.ids.get(xref_id)
+        if row is not None and self.has_row(row):
+            self.present[row] = 0
+            self.count -= 1
+
+    def _grow(self, n: int):
+        for name, empty in self._COLUMNS:
+            getattr(self, name).extend([empty] * n)
+
+    def view(self) -> TableView:
+        return TableView(self)
+
+
+class IndividualTable(_Table):
+    """Individuals stored as parallel columns, one row per individual."""
+    _COLUMNS = (("full_names", None), ("birth_dates", None), ("birth_places", None), ("death_dates", None),
+                ("death_places", None))
+
+    def __init__(self, ids: IdTable = None):
+        super().__init__(ids)
+        self.full_names: list = []
+        self.birth_dates: list = []
+        self.birth_places: list = []
+        self.death_dates: list = []
+        self.death_places: list = []
+
+    def add(self, xref_id, full_name, birth_date=None, birth_place=None, death_date=None, death_place=None) -> int:
+        row = self._claim(xref_id)
+        self.full_names[row] = full_name
+        self.birth_dates[row] = birth_date
+        self.birth_places[row] = birth_place
+        self.death_dates[row] = death_date
+        self.death_places[row] = death_place
+        return row
+
+    def add_individual(self, individual: Individual) -> int:
+        return self.add(individual.id, individual.full_name, individual.birth_date, individual.birth_place,
+                        individual.death_date, individual.death_place)
+
+    def row(self, row: int) -> IndividualRow:
+        return IndividualRow(self, row)
+
+
+class FamilyTable(_Table):
+    """
+    Families stored as parallel columns. Spouses and children are rows of the individuals table;
+    children of all families share one array, sliced by child_offsets.
+    """
+    _COLUMNS = (("husbands", NO_ROW), ("wives", NO_ROW), ("marr_dates", ""))
+
+    def __init__(self, individuals: IndividualTable, ids: IdTable = None):
+        super().__init__(ids)
+        self.individuals = individuals
+        self.husbands = array("q")
+        self.wives = array("q")
+        self.marr_dates: list = []
+        self.child_offsets = array("q", [0])
+        self.children = array("q")
+
+    def _grow(self, n: int):
+        super()._grow(n)
+        # New rows start with no children: their offsets repeat the end of the children array
+        self.child_offsets.extend([self.child_offsets[-1]] * n)
+
+    def add(self, xref_id, husband_row: Optional[int], wife_row: Optional[int], marr_date, child_rows) -> int:
+        row = self._claim(xref_id)
+        self.husbands[row] = NO_ROW if husband_row is None else husband_row
+        self.wives[row] = NO_ROW if wife_row is None else wife_row
+        self.marr_dates[row] = marr_date
+        self.set_children(row, child_rows)
+        return row
+
+    def set_children(self, row: int, child_rows):
+        start, end = self.child_offsets[row], self.child_offsets[row + 1]
+        child_rows = array("q", child_rows)
+        # Replacing the children of the last family, the case while parsing, only appends
+        self.children[start:end] = child_rows
+        shift = len(child_rows) - (end - start)
+        if shift:
+            for later in range(row + 1, len(self.child_offsets)):
+                self.child_offsets[later] += shift
+
+    def child_rows(self, row: int) -> array:
+        return self.children[self.child_offsets[row]:self.child_offsets[row + 1]]
+
+    def row(self, row: int) -> FamilyRow:
+        return FamilyRow(self, row)
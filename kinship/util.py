@@ -33,14 +33,14 @@ def display(individuals, content) -> str:
     if content is None:
         result = "None"
 
-    elif isinstance(content, list):
+    elif isinstance(content, (list, tuple)):
         if not content:
             result = "list[]"
         elif isinstance(content[0], Individual) or \
                 isinstance(content[0], Family):
             result = "\n".join([display(individuals, ind) for ind in content])
 
-    elif isinstance(content, set):
+    elif isinstance(content, (set, frozenset)):
         if not content:
             result = "set()"
         else:
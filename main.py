@@ -4,31 +4,77 @@ import os
 from kinship import chart
 from kinship.family_tree_data import FamilyTreeData
 from kinship.gedcom_parser import GedcomParser
+from kinship.pedigree import write_inbreeding, write_pedigree_collapse
 from kinship.relationship_manager import RelationshipManager
+from kinship.snapshot import SnapshotCache
 from kinship.util import display
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
+    flags = {arg for arg in sys.argv[1:] if arg.startswith("--")}
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    cache = SnapshotCache()
+    if "--clear-cache" in flags:
+        cache.clear()
+        print("Snapshot cache cleared.")
+        if not args:
+            sys.exit(0)
+
+    if len(args) < 1:
         if "__loader__" in globals() and __loader__.path.endswith("pydevd.py"):
             gedcom_file_path = os.path.join("data", "FamilyTree.ged")
         else:
-            print("Usage: python main.py <path_to_gedcom_file>")
+            print("Usage: python main.py [--no-cache] [--clear-cache] [--delta] <path_to_gedcom_file>")
             print("Example: python main.py data/shakespeare.ged")
             sys.exit(1)
     else:
-        gedcom_file_path = os.path.join(sys.argv[1])
+        gedcom_file_path = os.path.join(args[0])
 
     try:
         parser = GedcomParser(gedcom_file_path)
-        parser.parse_gedcom_file()
         data = FamilyTreeData()
-        data.load_from_gedcom(parser)
+        rm = None
+        changed = True  # whether the tree or its analyses differ from the snapshot cached for this file
+        if "--no-cache" not in flags and cache.get(gedcom_file_path, data):
+            parser.load_from_data(data)
+            changed = False
+            print("Loaded parsed tree from snapshot cache.")
+        elif "--no-cache" not in flags and "--delta" in flags and cache.latest(gedcom_file_path, data) \
+                and data.record_digests is not None:
+            # Only the records changed since the previous export are decoded and applied
+            parser.load_from_data(data)
+            changeset = parser.parse_delta()
+            data.record_digests = parser.record_digests
+            if not len(changeset):
+                # Only the header or layout of the file changed: the outputs of the previous run stand,
+                # and the snapshot is put under the file's new hash so the next run loads it straight away
+                cache.put(gedcom_file_path, data)
+                print("No records changed since the previous snapshot. Outputs are up to date.")
+                sys.exit(0)
+            rm = RelationshipManager(data)
+            # Patches the relationships and the analyses around the changed records only
+            parser.apply_changeset(changeset, rm)
+            data.relationships = parser.relationships
+            print(f"Applied changes since the previous snapshot. {changeset}")
+        else:
+            parser.parse_gedcom_file()
+            data.load_from_gedcom(parser)
         parser.write_individuals()
         parser.write_families()
         parser.write_relationships()
         print("Parsing and CSV generation completed successfully!")
 
-        rm = RelationshipManager(data)
+        if rm is None:
+            rm = RelationshipManager(data)
+        changed = changed or not ("inbreeding" in data.analyses and "pedigree_collapse" in data.analyses)
+        write_inbreeding(rm, parser.base_gedcom_filename)
+        write_pedigree_collapse(rm, parser.base_gedcom_filename)
+        print("Inbreeding and pedigree collapse reports completed successfully!")
+        if "--no-cache" not in flags and changed:
+            # Snapshot the tree together with the analyses, so the next run loads both,
+            # and with the record digests, so a --delta run can diff the next export against it
+            if data.record_digests is None:
+                data.record_digests = parser.hash_records()
+            cache.put(gedcom_file_path, data)
         id = "I0001"
         fam_id = "F12"
         print(f"### Ancestors of {display(rm.individuals, id)}:")
@@ -0,0 +1,23 @@
+import pytest
+
+from kinship.family_tree_data import FamilyTreeData
+from kinship.gedcom_parser import GedcomParser
+from kinship.graph import KinshipGraph
+
+
+@pytest.fixture(scope="session")
+def shakespeare():
+    """The parsed data/shakespeare.ged, shared by every test that reads it; tests that edit the tree parse their own."""
+    parser = GedcomParser("data/shakespeare.ged")
+    parser.parse_gedcom_file()
+    return parser
+
+
+@pytest.fixture(scope="session")
+def graph(shakespeare):
+    return KinshipGraph.from_family_table(shakespeare.families.table)
+
+
+@pytest.fixture(scope="session")
+def parsed(shakespeare):
+    return FamilyTreeData().load_from_gedcom(shakespeare)
@@ -0,0 +1,49 @@
+from kinship.individual import Individual
+
+
+def fields(ind, as_text=False):
+    """Every field of an individual, for comparing individuals read different ways. as_text for dates read back as text."""
+    values = (getattr(ind, name) for name in Individual.__slots__)
+    if as_text:
+        return tuple(None if value is None else str(value) for value in values)
+    return tuple(values)
+
+
+def random_tree(seed, people=60, families=30):
+    """
+    Individuals and Family objects of a random tree in which many children are listed in more than one family,
+    as adoptions and duplicate FAM records give, and some families lack a spouse.
+    """
+    import random
+
+    from kinship.family import Family
+
+    rng = random.Random(seed)
+    individuals = {f"I{number}": Individual(f"I{number}", f"Person {number}") for number in range(people)}
+    ids = list(individuals)
+    tree = {}
+    for number in range(families):
+        husband, wife = rng.choice(ids + [None]), rng.choice(ids + [None])
+        children = rng.sample(ids, rng.randrange(4))
+        tree[f"F{number}"] = Family.from_individuals(
+            f"F{number}", individuals.get(husband), individuals.get(wife), None,
+            [individuals[child] for child in children if child not in (husband, wife)])
+    return individuals, tree
+
+
+def derived_maps(families, ids):
+    """
+    (parents, children, step-children) of every individual who has any, keyed by xref id,
+    from a KinshipGraph of the families. A missing husband or wife is a None parent.
+    """
+    from kinship.graph import KinshipGraph
+    from kinship.tables import NO_ROW
+
+    graph = KinshipGraph.from_data(families, ids)
+    xref = graph.ids.xref
+
+    def keyed(neighbors):
+        return {xref(node): {xref(None if other == NO_ROW else other) for other in neighbors(node)}
+                for node in range(len(graph.ids)) if len(neighbors(node))}
+
+    return keyed(graph.parents), keyed(graph.children), keyed(graph.step_children)
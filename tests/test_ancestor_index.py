@@ -0,0 +1,27 @@
+import pytest
+
+from kinship.ancestor_index import AncestorIndex
+
+
+@pytest.mark.parametrize("options", [{}, {"lazy": True}, {"max_bytes": 16}])
+def test_ancestors_match_traversal(graph, options):
+    index = AncestorIndex(graph, **options)
+    for node in range(len(graph.parents_csr)):
+        assert set(index.nodes(index.ancestors(node))) == graph.ancestors(node, depth=len(graph.parents_csr))
+        # Ancestors come first in the bit order
+        assert all(index.rank[ancestor] < index.rank[node] for ancestor in index.nodes(index.ancestors(node)))
+    if "max_bytes" in options:
+        assert index.cached_bytes <= 16 or len(index._cache) == 1
+
+
+def test_most_recent_common_ancestors(graph):
+    ids = graph.ids
+    index = AncestorIndex(graph)
+    # Susanna (I0005) and Judith (I0007) are both children of William and Anne
+    mrca = index.most_recent_common_ancestors(ids.get("I0005"), ids.get("I0007"))
+    assert ids.xref_set(mrca) == {"I0001", "I0004"}
+    # Elizabeth Hall (I0021) is Susanna's daughter
+    assert index.most_recent_common_ancestors(ids.get("I0021"), ids.get("I0005")) == [ids.get("I0005")]
+    assert index.distance(ids.get("I0021"), ids.get("I0001")) == 2
+    assert index.distance(ids.get("I0001"), ids.get("I0021")) is None
+    assert index.common_ancestors(ids.get("I0001"), None) == 0
@@ -0,0 +1,30 @@
+from kinship.components import ComponentIndex
+from kinship.graph import HOP_TYPES, KinshipGraph
+from kinship.tables import NO_ROW
+
+
+def test_components_match_reachability(shakespeare):
+    index = ComponentIndex.from_data(shakespeare.families, shakespeare.ids)
+    graph = KinshipGraph.from_family_table(shakespeare.families.table)
+    for node in range(len(shakespeare.ids)):
+        reached = {node}
+        frontier = [node]
+        while frontier:
+            current = frontier.pop()
+            for _, neighbor in graph.hops(current, HOP_TYPES):
+                if neighbor not in reached:
+                    reached.add(neighbor)
+                    frontier.append(neighbor)
+        assert set(index.members(index.component_of(node))) == reached
+    assert list(index.sizes) == sorted(index.sizes, reverse=True)
+    assert sum(index.sizes) == len(shakespeare.ids)
+
+
+def test_union_find():
+    # Families {0, 1, 2} and {3, 2}, a family of children only {4, 5}, and 6 on their own
+    index = ComponentIndex(7, [[0, 1, 2], [3, NO_ROW, 2], [NO_ROW, NO_ROW, 4, 5]])
+    assert list(index.sizes) == [4, 2, 1]
+    assert [sorted(members) for members in index] == [[0, 1, 2, 3], [4, 5], [6]]
+    assert index.component_of(3) == 0 and index.component_of(None) is None
+    assert index.isolated() == [6]
+    assert index.size_of(5) == 2 and len(index) == 3
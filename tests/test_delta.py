@@ -0,0 +1,93 @@
+import shutil
+
+import pytest
+
+from kinship.family_tree_data import FamilyTreeData
+from kinship.gedcom_parser import GedcomParser
+from kinship.relationship_manager import RelationshipManager
+from kinship.snapshot import SnapshotCache
+from tests.helpers import derived_maps, fields
+
+
+def tree(parser):
+    """Everything a parse yields, keyed by xref ids so trees numbered differently compare equal."""
+    return (
+        {ind_id: fields(ind) for ind_id, ind in parser.individuals.items()},
+        {fam_id: (fam.husband_id, fam.wife_id, [child.id for child in fam.children], fam.marr_date)
+         for fam_id, fam in parser.families.items()},
+        derived_maps(parser.families, parser.ids),
+        sorted(parser.get_relationships().xref_rows(), key=str),
+    )
+
+
+def stored_spouses(manager):
+    return {manager.ids.xref(node): manager.ids.xref_set(spouses)
+            for node, spouses in manager.spouse_relationships.items() if spouses}
+
+
+def edit(path):
+    """Rename Mary Arden, drop I9999 and the family F012, and add a father I9000 for John Shakespeare."""
+    with open(path, newline="") as file:
+        records = file.read().split("\r\n0 ")
+    records = [record for record in records if not record.startswith(("@I9999@", "@F012@"))]
+    records = [record.replace("1 NAME Mary /Arden/", "1 NAME Mary /Ardenne/") for record in records]
+    records.insert(-1, "@I9000@ INDI\r\n1 NAME Richard /Shakespeare/\r\n1 SEX M")
+    records.insert(-1, "@F9000@ FAM\r\n1 HUSB @I9000@\r\n1 CHIL @I0003@")
+    with open(path, "w", newline="") as file:
+        file.write("\r\n0 ".join(records))
+
+
+@pytest.fixture
+def exports(tmp_path):
+    path = str(tmp_path / "tree.ged")
+    shutil.copy("data/shakespeare.ged", path)
+    cache = SnapshotCache(str(tmp_path / "cache"))
+    parser = GedcomParser(path)
+    parser.parse_gedcom_file()
+    parser.hash_records()
+    cache.put(path, FamilyTreeData().load_from_gedcom(parser))
+    edit(path)
+    return path, cache
+
+
+def test_changeset(exports):
+    path, cache = exports
+    data = FamilyTreeData()
+    assert not cache.get(path, data)
+    assert cache.latest(path, data)
+    changeset = GedcomParser(path).load_from_data(data).parse_delta()
+
+    assert changeset.added_individuals == {"I9000"} and changeset.removed_individuals == {"I9999"}
+    assert changeset.added_families == {"F9000"} and changeset.removed_families == {"F012"}
+    assert changeset.modified_individuals == {"I0002"} and not changeset.modified_families
+    assert list(changeset.individuals) == ["I0002", "I9000"]
+    assert changeset.individuals["I0002"].full_name == "Mary Ardenne"
+    assert changeset.families["F9000"][1:4] == ("I9000", None, ["I0003"])
+    assert len(changeset) == 5
+
+
+def test_delta_matches_full_parse(exports):
+    path, cache = exports
+    data = FamilyTreeData()
+    cache.latest(path, data)
+    parser = GedcomParser(path).load_from_data(data)
+    manager = RelationshipManager(data)
+    edges = parser.relationships
+    parser.apply_changeset(parser.parse_delta(), manager)
+    # Patched in place, not regenerated
+    assert parser.relationships is edges
+
+    fresh = GedcomParser(path)
+    fresh.parse_gedcom_file()
+    assert tree(parser) == tree(fresh)
+    assert parser.record_digests == fresh.hash_records()
+    assert manager.get_parents("I0003") == {"I9000", None}
+    assert not manager.individual_exists("I9999")
+    # The lookups built from the stored relationships follow the patch
+    rebuilt = RelationshipManager(FamilyTreeData().load_from_gedcom(fresh))
+    assert stored_spouses(manager) == stored_spouses(rebuilt)
+
+    # The patched tree is what the next night diffs against
+    cache.put(path, FamilyTreeData().load_from_gedcom(parser))
+    cache.latest(path, data)
+    assert len(GedcomParser(path).load_from_data(data).parse_delta()) == 0
@@ -0,0 +1,63 @@
+from kinship.edges import EdgeTable, SPOUSE, SIBLING
+from kinship.id_table import IdTable
+
+
+def sample_edges():
+    edges = EdgeTable(IdTable(["I1", "I2", "I3"]))
+    edges.append("I1", "I3", "parent-child")
+    edges.append("I1", "I2", "spouse")
+    edges.append("I2", "I1", "spouse")
+    edges.append(None, "I3", "parent-child")
+    edges.append("I3", "I4", "godparent")
+    return edges
+
+
+def test_rows_read_as_dicts():
+    edges = sample_edges()
+    assert len(edges) == 5
+    assert edges[0] == {"Source": "I1", "Target": "I3", "Relationship": "parent-child"}
+    assert edges[-2] == {"Source": None, "Target": "I3", "Relationship": "parent-child"}
+    assert [rel["Relationship"] for rel in edges][-1] == "godparent"
+    assert list(edges.xref_rows())[1] == ("I1", "I2", "spouse")
+    assert edges == list(edges)
+    assert EdgeTable.from_rows(IdTable(), list(edges)) == edges
+
+
+def test_filter_by_type():
+    edges = sample_edges()
+    assert list(edges.of_type(SPOUSE)) == [1, 2]
+    assert list(edges.pairs(SPOUSE)) == [(0, 1), (1, 0)]
+    assert list(edges.of_type(SIBLING)) == []
+    assert list(edges.of_type("unknown")) == []
+    edges.append("I2", "I3", SIBLING)
+    assert list(edges.of_type(SIBLING)) == [5]
+
+
+def test_edges_of_node():
+    edges = sample_edges()
+    assert list(edges.edges_of(edges.ids.get("I3"))) == [0, 3, 4]
+    assert edges.degree(edges.ids.get("I4")) == 1
+    assert edges.degree(None) == 0
+    edges.ids.intern("I5")
+    assert edges.degree(edges.ids.get("I5")) == 0
+
+
+def test_remove_edges_of():
+    edges = sample_edges()
+    edges.remove_edges_of({edges.ids.get("I3")}, ("parent-child",))
+    assert list(edges.xref_rows()) == [("I1", "I2", "spouse"), ("I2", "I1", "spouse"), ("I3", "I4", "godparent")]
+    assert list(edges.edges_of(edges.ids.get("I3"))) == [2]
+    edges.remove_edges_of({edges.ids.get("I1")})
+    assert list(edges.xref_rows()) == [("I3", "I4", "godparent")]
+    edges.remove_edges_of(set())
+    assert len(edges) == 1
+
+
+def test_remove_edges_of_matches_whole_entries():
+    edges = EdgeTable(IdTable([f"I{i}" for i in range(600)]))
+    spouse = edges.type_code(SPOUSE)
+    # The bytes of sources 512 and 0 hold those of 2 across the two entries
+    edges.add(512, 1, spouse)
+    edges.add(0, 2, spouse)
+    edges.remove_edges_of({2})
+    assert list(edges.pairs(SPOUSE)) == [(512, 1)]
@@ -0,0 +1,15 @@
+from kinship.family_index import FamilyIndex
+
+
+def test_family_index(shakespeare):
+    families = shakespeare.families
+    from_table = FamilyIndex.from_data(families, shakespeare.ids)
+    from_objects = FamilyIndex.from_data(dict(families), shakespeare.ids)
+    for node in range(len(shakespeare.ids)):
+        xref_id = shakespeare.ids.xref(node)
+        as_child = [family.id for family in families.values() if xref_id in [c.id for c in family.children]]
+        as_spouse = [family.id for family in families.values() if xref_id in (family.husband_id, family.wife_id)]
+        assert from_table.as_child(node) == from_objects.as_child(node) == as_child
+        assert from_table.as_spouse(node) == from_objects.as_spouse(node) == as_spouse
+    # William married twice
+    assert len(from_table.as_spouse(shakespeare.ids.get("I0001"))) == 2
@@ -0,0 +1,76 @@
+import os
+import pickle
+import shutil
+
+from kinship.family_tree_data import FamilyTreeData
+from kinship.gedcom_index import INDEX_MAGIC, GedcomIndex
+from kinship.gedcom_parser import GedcomParser
+from kinship.relationship_manager import RelationshipManager
+from tests.helpers import fields
+
+
+def test_lazy_lookup_matches_parse(tmp_path):
+    parsed = GedcomParser("data/shakespeare.ged")
+    parsed.parse_gedcom_file()
+
+    with GedcomIndex.open("data/shakespeare.ged", index_path=str(tmp_path / "shakespeare.kidx")) as index:
+        assert index.individuals.materialized == 0
+        assert list(index.individuals) == list(parsed.individuals)
+        assert list(index.families) == list(parsed.families)
+
+        assert fields(index.individuals["I0001"]) == fields(parsed.individuals["I0001"])
+        assert index.individuals["I0001"] is index.individuals["I0001"]
+        assert index.individuals.materialized == 1
+
+        fam = index.families["F001"]
+        assert (fam.husband_id, fam.wife_id, fam.marr_date) == ("I0003", "I0002", "ABOUT 1557")
+        assert [c.id for c in fam.children] == [c.id for c in parsed.families["F001"].children]
+        assert "I9999" in index.individuals
+        assert "F999" not in index.families
+
+
+def test_saved_index_is_reused_until_file_changes(tmp_path):
+    gedcom_path = str(tmp_path / "shakespeare.ged")
+    shutil.copy("data/shakespeare.ged", gedcom_path)
+
+    GedcomIndex.open(gedcom_path).close()
+    assert os.path.exists(gedcom_path + ".kidx")
+    assert GedcomIndex.load(gedcom_path, gedcom_path + ".kidx") is not None
+
+    with open(gedcom_path, "a") as file:
+        file.write("\n")
+    assert GedcomIndex.load(gedcom_path, gedcom_path + ".kidx") is None
+
+
+def test_damaged_index_is_rebuilt(tmp_path):
+    gedcom_path, index_path = str(tmp_path / "shakespeare.ged"), str(tmp_path / "shakespeare.kidx")
+    shutil.copy("data/shakespeare.ged", gedcom_path)
+    GedcomIndex.open(gedcom_path, index_path).close()
+    with open(index_path, "rb") as file:
+        saved = file.read()
+
+    old_layout = INDEX_MAGIC + pickle.dumps({"version": 2, "size": os.path.getsize(gedcom_path)})
+    for damaged in (saved[:len(saved) // 2], saved[:3], old_layout, pickle.dumps(["not", "an", "index"])):
+        with open(index_path, "wb") as file:
+            file.write(damaged)
+        assert GedcomIndex.load(gedcom_path, index_path) is None
+        with GedcomIndex.open(gedcom_path, index_path) as index:
+            assert "I0001" in index.individuals
+    assert GedcomIndex.load(gedcom_path, index_path) is not None
+
+
+def test_empty_file(tmp_path):
+    gedcom_path = str(tmp_path / "empty.ged")
+    open(gedcom_path, "w").close()
+    with GedcomIndex.open(gedcom_path) as index:
+        assert len(index.individuals) == 0 and len(index.families) == 0
+
+
+def test_relationship_manager_on_lazy_views(tmp_path):
+    parser = GedcomParser("data/shakespeare.ged")
+    index = parser.open_index(str(tmp_path / "shakespeare.kidx"))
+    manager = RelationshipManager(FamilyTreeData().load_from_index(index))
+
+    assert manager.get_parents("I0001") == {"I0002", "I0003"}
+    assert {"I0005", "I0006", "I0007", "I9998"} == manager.get_children("I0001")
+    index.close()
@@ -0,0 +1,92 @@
+from kinship.gedcom_parser import GedcomParser
+from kinship.gedcom_reader import scan_records, format_name, level0_offsets
+from tests.helpers import derived_maps, fields
+
+
+def test_stream_matches_ged4py():
+    streamed = GedcomParser("data/shakespeare.ged")
+    streamed.parse_gedcom_file()
+    walked = GedcomParser("data/shakespeare.ged")
+    walked.parse_gedcom_file(reader="ged4py")
+
+    assert list(streamed.individuals) == list(walked.individuals)
+    for ind_id, ind in walked.individuals.items():
+        assert fields(streamed.individuals[ind_id]) == fields(ind)
+    assert list(streamed.families) == list(walked.families)
+    for fam_id, fam in walked.families.items():
+        streamed_fam = streamed.families[fam_id]
+        assert streamed_fam.husband_id == fam.husband_id
+        assert streamed_fam.wife_name == fam.wife_name
+        assert streamed_fam.marr_date == fam.marr_date
+        assert [c.id for c in streamed_fam.children] == [c.id for c in fam.children]
+    assert derived_maps(streamed.families, streamed.ids) == derived_maps(walked.families, walked.ids)
+
+
+def test_scan_records_keeps_only_kinship_tags():
+    lines = [
+        b"0 HEAD\n",
+        b"1 CHAR UTF-8\n",
+        b"0 @I1@ INDI\r\n",
+        b"1 NAME Johnny /Doe/\n",
+        b"2 TYPE aka\n",
+        b"1 NAME John /Doe/ Jr.\n",
+        b"1 BIRT\n",
+        b"2 DATE 1 JAN 1990\n",
+        b"2 PLAC New\n",
+        b"3 CONC  York\n",
+        b"1 CHR\n",
+        b"2 DATE 2 JAN 1990\n",
+        b"0 @N1@ NOTE ignored\n",
+        b"1 CONT still ignored\n",
+        b"0 @F1@ FAM\n",
+        b"1 HUSB @I1@\n",
+        b"1 CHIL @I2@\n",
+        b"1 MARR\n",
+        b"2 DATE 2010\n",
+        b"0 TRLR\n",
+    ]
+    indi, fam = list(scan_records(lines))
+
+    assert indi.xref_id == b"@I1@"
+    assert format_name(indi, "utf-8") == "John Doe Jr."
+    assert indi.birth_date == b"1 JAN 1990"
+    assert indi.birth_place == b"New York"
+    assert fam.husband == b"@I1@"
+    assert fam.wife is None
+    assert fam.children == [b"@I2@"]
+    assert fam.marr_date == b"2010"
+
+
+def test_parallel_matches_stream():
+    streamed = GedcomParser("data/shakespeare.ged")
+    streamed.parse_gedcom_file()
+    pooled = GedcomParser("data/shakespeare.ged")
+    pooled.parse_gedcom_file(reader="parallel", workers=2)
+
+    assert list(pooled.individuals) == list(streamed.individuals)
+    for ind_id, ind in streamed.individuals.items():
+        assert fields(pooled.individuals[ind_id]) == fields(ind)
+    assert list(pooled.families) == list(streamed.families)
+    for fam_id, fam in streamed.families.items():
+        assert [c.id for c in pooled.families[fam_id].children] == [c.id for c in fam.children]
+    assert derived_maps(pooled.families, pooled.ids) == derived_maps(streamed.families, streamed.ids)
+
+
+def test_level0_offsets():
+    offsets = level0_offsets("tests/mock_file.ged")
+    with open("tests/mock_file.ged", "rb") as file:
+        data = file.read()
+    assert [data[offset:offset + 2] for offset in offsets] == [b"0 "] * 5
+
+
+def test_unknown_pointers_are_dropped(tmp_path):
+    path = tmp_path / "dangling.ged"
+    path.write_text("0 HEAD\n1 CHAR UTF-8\n0 @I1@ INDI\n1 NAME John /Doe/\n0 @I2@ INDI\n1 NAME Jane /Doe/\n"
+                    "0 @F1@ FAM\n1 HUSB @I1@\n1 WIFE @I8@\n1 CHIL @I2@\n1 CHIL @I9@\n"
+                    "0 @F2@ FAM\n1 HUSB @I7@\n1 WIFE @I2@\n0 TRLR\n")
+    for reader in ("stream", "ged4py"):
+        parser = GedcomParser(str(path))
+        parser.parse_gedcom_file(reader=reader)
+        first, second = parser.families["F1"], parser.families["F2"]
+        assert (first.husband_id, first.wife_id, [child.id for child in first.children]) == ("I1", None, ["I2"])
+        assert (second.husband_id, second.wife_id, second.children) == (None, "I2", [])
@@ -0,0 +1,319 @@
+import random
+
+import pytest
+
+from kinship.ancestor_index import AncestorIndex
+from kinship.components import ComponentIndex
+from kinship.family_index import FamilyIndex
+from kinship.family_tree_data import FamilyTreeData
+from kinship.gedcom_parser import GedcomParser
+from kinship.graph import CSR, FULL_SIBLINGS, HALF_SIBLINGS, STEP_SIBLINGS, KinshipGraph
+from kinship.individual import Individual
+from kinship.pedigree import inbreeding_coefficients, pedigree_collapse
+from kinship.relationship_manager import RelationshipManager
+from kinship.id_table import IdTable
+from kinship.tables import NO_ROW
+from tests.helpers import random_tree
+
+
+def test_csr_from_edges():
+    csr = CSR.from_edges(3, [2, 0, 2, 0], [0, 1, 1, 1])
+    assert list(csr.offsets) == [0, 1, 1, 3]
+    assert list(csr.neighbors(0)) == [1]
+    assert list(csr.neighbors(1)) == []
+    assert list(csr.neighbors(2)) == [0, 1]
+    assert csr.degree(2) == 2 and csr.edge_count == 3
+    assert list(csr.neighbors(7)) == [] and list(csr.neighbors(None)) == []
+
+
+def test_graph_matches_families(shakespeare):
+    from kinship.edges import PARENT_CHILD, STEP_PARENT
+    graph = KinshipGraph.from_family_table(shakespeare.families.table)
+    ids = shakespeare.ids
+    last_family = {child.id: family for family in shakespeare.families.values() for child in family.children}
+    for child_id, family in last_family.items():
+        assert ids.xref_set(None if parent == NO_ROW else parent for parent in graph.parents(ids.get(child_id))) == \
+            {family.husband_id, family.wife_id}
+    rows = set(shakespeare.get_relationships().xref_rows())
+    for node in range(len(ids)):
+        for child in graph.children(node):
+            assert (ids.xref(node), ids.xref(child), PARENT_CHILD) in rows
+    assert {(source, target) for source, target, relationship in rows if relationship == STEP_PARENT} == \
+        {(ids.xref(node), ids.xref(child)) for node in range(len(ids)) for child in graph.step_children(node)}
+
+
+def test_child_in_several_families():
+    from kinship.family import Family
+    people = {xref: Individual(xref, xref) for xref in ("I1", "I2", "I3", "I4", "I5")}
+    families = {
+        "F1": Family.from_individuals("F1", people["I1"], people["I2"], None, [people["I3"]]),
+        "F2": Family.from_individuals("F2", people["I4"], people["I5"], None, [people["I3"]]),
+    }
+    ids = IdTable(people)
+    graph = KinshipGraph.from_families(families, ids)
+    # The last family listing I3 gives their parents, in both directions
+    assert ids.xref_set(graph.known_parents(ids.get("I3"))) == {"I4", "I5"}
+    assert list(graph.children(ids.get("I1"))) == [] and list(graph.children(ids.get("I4"))) == [ids.get("I3")]
+    # A child listed in one's own family is no step-child
+    assert list(graph.step_children(ids.get("I1"))) == []
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_parents_and_children_are_inverse(seed):
+    individuals, families = random_tree(seed)
+    graph = KinshipGraph.from_families(families, IdTable(individuals))
+    for node in range(len(graph.ids)):
+        for parent in graph.known_parents(node):
+            assert node in graph.children(parent)
+        for child in graph.children(node):
+            assert node in graph.parents(child)
+
+
+def test_graph_from_family_objects(shakespeare):
+    from_table = KinshipGraph.from_family_table(shakespeare.families.table)
+    from_objects = KinshipGraph.from_families(dict(shakespeare.families), shakespeare.ids)
+    for csr in ("parents_csr", "children_csr", "spouses_csr", "step_children_csr"):
+        assert getattr(from_objects, csr).offsets == getattr(from_table, csr).offsets
+        assert getattr(from_objects, csr).targets == getattr(from_table, csr).targets
+
+
+def test_traversals(graph):
+    ids = graph.ids
+    william = ids.get("I0001")
+
+    assert ids.xref_set(graph.spouses(william)) == {"I0004", "I9999"}
+    assert ids.xref_set(graph.ancestors(william, depth=2)) == {"I0002", "I0003", "I0015", "I0031", "I0018", "I0019"}
+    assert ids.xref_set(graph.descendants(ids.get("I0003"), depth=1)) == ids.xref_set(graph.children(ids.get("I0003")))
+    assert graph.generation(ids.get("I0015")) == 0
+    assert graph.generation(william) == 2
+
+
+def test_siblings(graph):
+    ids = graph.ids
+
+    # I0030 is Thomas Quiney's (I0024) child with another woman than Judith (I0007)
+    assert ids.xref_set(graph.siblings(ids.get("I0025"))) == {"I0026", "I0027"}
+    assert ids.xref_set(graph.siblings(ids.get("I0025"), half=True)) == {"I0030"}
+    assert ids.xref_set(graph.siblings(ids.get("I0030"), half=True)) == {"I0025", "I0026", "I0027"}
+    assert graph.siblings(ids.get("I0015")) == set()
+
+
+def test_generation_policies():
+    from kinship.graph import CSR
+    from kinship.id_table import IdTable
+    # 0 -> 1 -> 2, and 0 -> 2 directly: 2 is two generations down the longest line, one down the shortest
+    children = CSR.from_edges(4, [0, 1, 0], [1, 2, 2])
+    empty = CSR.from_edges(4, [], [])
+    graph = KinshipGraph(IdTable(["A", "B", "C", "D"]), empty, children, empty, empty)
+    assert list(graph.generations("max")) == [0, 1, 2, 0]
+    assert list(graph.generations("min")) == [0, 1, 1, 0]
+    assert graph.generations("max") is graph.generations("max")
+    with pytest.raises(ValueError):
+        graph.generations("mean")
+
+
+def test_generations_ignore_cycles():
+    from kinship.id_table import IdTable
+    # 1 and 2 are each other's parent
+    children = CSR.from_edges(3, [0, 1, 2], [1, 2, 1])
+    empty = CSR.from_edges(3, [], [])
+    graph = KinshipGraph(IdTable(["A", "B", "C"]), empty, children, empty, empty)
+    assert list(graph.generations()) == [0, 0, 0]
+
+
+def test_longest_paths():
+    # Two lines from 0, the longer through 2; 5 -> 6 is a separate line
+    csr = CSR.from_edges(7, [0, 0, 2, 3, 5], [1, 2, 3, 4, 6])
+    assert list(csr.topological_order())[:3] == [0, 5, 1]
+    assert csr.longest_paths() == [(3, [0, 2, 3, 4])]
+    assert csr.longest_paths(k=5) == [(3, [0, 2, 3, 4]), (1, [0, 1]), (1, [5, 6])]
+    assert CSR.from_edges(2, [], []).longest_paths() == []
+    with pytest.raises(ValueError):
+        CSR.from_edges(2, [0, 1], [1, 0]).longest_paths()
+
+
+def one_sided_distances(graph, source, weights):
+    """Dijkstra from source alone, as the reference for shortest_path()."""
+    import heapq
+    costs, queue = {source: 0}, [(0, source)]
+    while queue:
+        cost, node = heapq.heappop(queue)
+        if cost > costs[node]:
+            continue
+        for hop, neighbor in graph.hops(node):
+            neighbor_cost = cost + weights.get(hop, 1)
+            if neighbor_cost < costs.get(neighbor, neighbor_cost + 1):
+                costs[neighbor] = neighbor_cost
+                heapq.heappush(queue, (neighbor_cost, neighbor))
+    return costs
+
+
+def assert_shortest_paths(graph, sources, weights):
+    """Every path from sources is made of real forward hops and costs what one-sided Dijkstra gives."""
+    n = len(graph.parents_csr)
+    for source in sources:
+        costs = one_sided_distances(graph, source, weights or {})
+        for target in range(n):
+            path = graph.shortest_path(source, target, weights=weights)
+            if target not in costs:
+                assert path is None
+                continue
+            assert sum((weights or {}).get(hop, 1) for hop, _ in path) == costs[target]
+            node = source
+            for hop, following in path:
+                assert (hop, following) in set(graph.hops(node))
+                node = following
+            assert node == target
+
+
+@pytest.mark.parametrize("weights", [None, {"spouse": 3, "sibling": 0.5}])
+def test_shortest_path_is_shortest(graph, weights):
+    assert_shortest_paths(graph, range(0, len(graph.parents_csr), 3), weights)
+
+
+@pytest.mark.parametrize("weights", [None, {"spouse": 3, "sibling": 0.5, "step-child": 2}])
+@pytest.mark.parametrize("seed", range(4))
+def test_shortest_path_children_in_several_families(seed, weights):
+    individuals, families = random_tree(seed)
+    graph = KinshipGraph.from_families(families, IdTable(individuals))
+    assert any(sum(child in family.children for family in families.values()) > 1
+               for child in individuals.values())
+    assert_shortest_paths(graph, range(0, len(graph.parents_csr), 2), weights)
+
+
+def assert_predecessors_invert_hops(graph):
+    """predecessor_hops() gives exactly the hops() edges into each node."""
+    inverse = {}
+    for node in range(len(graph.parents_csr)):
+        for hop, neighbor in graph.hops(node):
+            inverse.setdefault(neighbor, set()).add((hop, node))
+    for node in range(len(graph.parents_csr)):
+        assert set(graph.predecessor_hops(node)) == inverse.get(node, set())
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_predecessor_hops(seed):
+    individuals, families = random_tree(seed)
+    assert_predecessors_invert_hops(KinshipGraph.from_families(families, IdTable(individuals)))
+
+
+def test_shortest_path_filters(graph):
+    ids = graph.ids
+    susanna, judith = ids.get("I0005"), ids.get("I0007")
+    assert graph.shortest_path(susanna, judith) == [("sibling", judith)]
+    path = graph.shortest_path(susanna, judith, types=("parent", "child"))
+    assert [hop for hop, _ in path] == ["parent", "child"]
+    assert graph.shortest_path(susanna, judith, types=("spouse",)) is None
+    assert graph.shortest_path(susanna, ids.get("I0015"), max_visited=3) is None
+    with pytest.raises(ValueError):
+        graph.shortest_path(susanna, judith, types=("cousin",))
+
+
+def test_step_siblings(graph):
+    ids = graph.ids
+    for node in range(len(ids)):
+        for sibling in graph.step_siblings(node):
+            assert node in graph.step_siblings(sibling)
+            assert not graph.known_parents(node) & graph.known_parents(sibling)
+    assert list(graph.sibling_index("full").neighbors(ids.get("I0025"))) == \
+        sorted(ids.get(xref) for xref in ("I0026", "I0027"))
+    with pytest.raises(ValueError):
+        graph.sibling_index("cousin")
+
+
+def test_csr_set_neighbors():
+    csr = CSR.from_edges(3, [0, 2], [1, 0])
+    csr.set_neighbors(2, [1, 0, 1])
+    csr.set_neighbors(4, [3])
+    assert list(csr.neighbors(2)) == [0, 1] and csr.degree(2) == 2
+    assert len(csr) == 5 and list(csr.neighbors(3)) == []
+    csr.compact()
+    assert csr.overrides is None and list(csr.offsets) == [0, 1, 1, 3, 3, 4]
+    assert list(csr.targets) == [1, 0, 1, 3]
+
+
+def assert_matches_rebuild(rm):
+    rebuilt = KinshipGraph.from_data(rm.families, rm.ids)
+    index = FamilyIndex.from_data(rm.families, rm.ids)
+    for node in range(len(rm.ids)):
+        for csr in ("parents_csr", "children_csr", "spouses_csr", "step_children_csr"):
+            assert list(getattr(rm.graph, csr).neighbors(node)) == list(getattr(rebuilt, csr).neighbors(node))
+        assert set(rm.graph.step_parents(node)) == set(rebuilt.step_parents(node))
+        for child in rm.graph.children(node):
+            assert node in rm.graph.parents(child)
+        for kind in (FULL_SIBLINGS, HALF_SIBLINGS, STEP_SIBLINGS):
+            assert set(rm.graph.sibling_index(kind).neighbors(node)) == set(rebuilt.sibling_index(kind).neighbors(node))
+        assert rm.family_index.as_child(node) == index.as_child(node)
+        assert rm.family_index.as_spouse(node) == index.as_spouse(node)
+    for policy in ("max", "min"):
+        assert list(rm.graph.generations(policy)) == list(rebuilt.generations(policy))
+    assert_predecessors_invert_hops(rm.graph)
+    components = ComponentIndex.from_data(rm.families, rm.ids)
+    assert sorted(map(sorted, rm._components())) == sorted(map(sorted, components))
+    if rm.analyses:
+        # Analyses patched below the edits, against the whole tree computed afresh
+        inbreeding = inbreeding_coefficients(rebuilt, AncestorIndex(rebuilt))
+        assert rm.inbreeding_coefficients() == pytest.approx(
+            {individual_id: inbreeding[rm.ids.get(individual_id)] for individual_id in rm.individuals})
+        assert rm.pedigree_collapse() == {individual_id: pedigree_collapse(rebuilt, rm.ids.get(individual_id))
+                                          for individual_id in rm.individuals}
+
+
+@pytest.mark.parametrize("tables", [True, False])
+def test_edits_match_rebuild(tables):
+    # Random edits patched into the indexes must leave them as a rebuild from the edited families would
+    parser = GedcomParser("data/shakespeare.ged")
+    parser.parse_gedcom_file()
+    data = FamilyTreeData().load_from_gedcom(parser)
+    if not tables:
+        data.individuals, data.families = dict(data.individuals), dict(data.families)
+    rm = RelationshipManager(data)
+    for kind in (FULL_SIBLINGS, HALF_SIBLINGS, STEP_SIBLINGS):
+        rm.graph.sibling_index(kind)
+    rm.graph.generations("max"), rm.graph.generations("min"), rm.graph.step_parents(0)
+    rm.is_connected("I0001")
+    rm.inbreeding_coefficients(), rm.pedigree_collapse()
+
+    rng = random.Random(7)
+    listed_twice = False
+    for step in range(150):
+        people, families = list(rm.individuals), list(rm.families)
+        action = rng.randrange(7)
+        if action == 0:
+            rm.add_individual(Individual(f"N{step}", f"New {step}"))
+        elif action == 1:
+            rm.add_family(f"NF{step}", rng.choice(people + [None]), rng.choice(people + [None]),
+                          rng.sample(people, rng.randrange(3)))
+        elif action == 2:
+            rm.add_child_to_family(rng.choice(families), rng.choice(people))
+        elif action == 3:
+            family_id = rng.choice(families)
+            children = [child.id for child in rm.families[family_id].children]
+            if children:
+                rm.remove_child_from_family(family_id, rng.choice(children))
+        elif action == 4:
+            rm.update_family(rng.choice(families), wife_id=rng.choice(people + [None]))
+        elif action == 5:
+            rm.remove_family(rng.choice(families))
+        else:
+            rm.remove_individual(rng.choice(people))
+        if step % 30 == 29:
+            listed_twice |= any(len(rm.family_index.as_child(node)) > 1 for node in range(len(rm.ids)))
+            assert_matches_rebuild(rm)
+    # Edits also made children of several families, whose parents come from the last one
+    assert listed_twice
+
+
+
+def test_generations_follow_edits_through_cycles():
+    parser = GedcomParser("data/shakespeare.ged")
+    parser.parse_gedcom_file()
+    data = FamilyTreeData().load_from_gedcom(parser)
+    rm = RelationshipManager(data)
+    rm.graph.generations("max"), rm.graph.generations("min")
+    # William becomes his father's parent, then the family making the cycle is removed again
+    for edit in (lambda: rm.add_family("FX", "I0001", None, ["I0003"]), lambda: rm.remove_family("FX")):
+        edit()
+        rebuilt = KinshipGraph.from_data(rm.families, rm.ids)
+        for policy in ("max", "min"):
+            assert list(rm.graph.generations(policy)) == list(rebuilt.generations(policy))
@@ -0,0 +1,26 @@
+from kinship.id_table import IdTable
+
+
+def test_intern_round_trip():
+    ids = IdTable(["I1", "I2"])
+    assert ids.get("I2") == 1
+    assert ids.intern("I3") == 2
+    assert ids.intern("I3") == 2
+    assert ids.xref(2) == "I3"
+    assert ids.xref_set([0, None]) == {"I1", None}
+    assert ids.intern(None) is None
+    assert ids.get("I9") is None
+    assert len(ids) == 3 and "I1" in ids
+
+
+def test_parser_relationships_are_interned():
+    from kinship.edges import STEP_PARENT
+    from kinship.gedcom_parser import GedcomParser
+    parser = GedcomParser("data/shakespeare.ged")
+    parser.parse_gedcom_file()
+    ids = parser.ids
+
+    assert list(ids.xrefs) == list(parser.individuals)
+    edges = parser.get_relationships()
+    assert edges.ids is ids
+    assert ("I0004", "I9998", STEP_PARENT) in set(edges.xref_rows())
@@ -0,0 +1,46 @@
+from functools import lru_cache
+
+import numpy as np
+
+from kinship.kinship_matrix import kinship_matrix, kinship_pairs
+
+
+def recursive_kinship(graph):
+    generations = graph.generations()
+
+    @lru_cache(maxsize=None)
+    def phi(a, b):
+        if a == b:
+            parents = sorted(graph.known_parents(a))
+            return 0.5 * (1 + (phi(*parents) if len(parents) == 2 else 0))
+        # Recurse on the later of the two, who cannot be the other's ancestor
+        if (generations[a], a) < (generations[b], b):
+            a, b = b, a
+        return 0.5 * sum(phi(parent, b) for parent in graph.known_parents(a))
+
+    return phi
+
+
+def test_matches_recursive_definition(graph):
+    ids = graph.ids
+    nodes = [ids.get(xref) for xref in ("I0001", "I0004", "I0005", "I0007", "I0021", "I0003")]
+    phi = recursive_kinship(graph)
+    expected = np.array([[phi(a, b) for b in nodes] for a in nodes])
+    assert np.allclose(kinship_matrix(graph, nodes), expected)
+    # William and Susanna are parent and child
+    assert kinship_matrix(graph, nodes)[0, 2] == 0.25
+    assert kinship_matrix(graph, nodes, relationship=True)[0, 2] == 0.5
+    assert kinship_matrix(graph, nodes, dtype=np.float32).dtype == np.float32
+
+
+def test_pairs_and_memmap(graph, tmp_path):
+    nodes = list(range(len(graph.parents_csr)))
+    dense = kinship_matrix(graph, nodes)
+    firsts, seconds, coefficients = kinship_pairs(graph, nodes, 0.125, path=str(tmp_path / "table"))
+    assert len(firsts) and all(first < second for first, second in zip(firsts, seconds))
+    assert np.array_equal(coefficients, dense[firsts, seconds])
+    assert np.count_nonzero(np.triu(dense >= 0.125, 1)) == len(firsts)
+
+    mapped = kinship_matrix(graph, nodes, path=str(tmp_path / "matrix"))
+    assert isinstance(mapped, np.memmap) and np.array_equal(mapped, dense)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["matrix"]
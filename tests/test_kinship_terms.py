@@ -0,0 +1,39 @@
+from kinship.kinship_terms import SELF, blood_term, in_law_term, ordinal
+
+
+def test_ordinal():
+    assert [ordinal(n) for n in (1, 2, 3, 4, 11, 12, 13, 21, 102)] == \
+        ["1st", "2nd", "3rd", "4th", "11th", "12th", "13th", "21st", "102nd"]
+
+
+def test_lineal_terms():
+    assert blood_term(0, 0) == SELF
+    assert blood_term(0, 1) == "parent"
+    assert blood_term(0, 2) == "grandparent"
+    assert blood_term(0, 3) == "great-grandparent"
+    assert blood_term(0, 5) == "3rd great-grandparent"
+    assert blood_term(4, 0) == "2nd great-grandchild"
+
+
+def test_collateral_terms():
+    assert blood_term(1, 1) == "sibling"
+    assert blood_term(1, 1, half=True) == "half sibling"
+    assert blood_term(1, 2) == "aunt/uncle"
+    assert blood_term(1, 3) == "grandaunt/uncle"
+    assert blood_term(4, 1) == "great-grandniece/nephew"
+    assert blood_term(2, 3, half=True) == "half first cousin once removed"
+
+
+def test_cousin_terms():
+    # Examples from docs/UseMathCalculateFamilyRelationships
+    assert blood_term(2, 2) == "first cousin"
+    assert blood_term(4, 4) == "third cousin"
+    assert blood_term(4, 3) == "second cousin once removed"
+    assert blood_term(3, 5) == "second cousin twice removed"
+    assert blood_term(2, 6) == "first cousin 4 times removed"
+    assert blood_term(12, 12) == "11th cousin"
+
+
+def test_in_law_terms():
+    assert in_law_term("sibling") == "sibling-in-law"
+    assert in_law_term("aunt/uncle") == "aunt/uncle by marriage"
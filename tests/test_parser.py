@@ -41,3 +41,16 @@ def test_parse_family(mock_parser):
     assert len(family.children) == 2
     assert family.children[0].id == "I3"
     assert family.children[1].id == "I4"
+
+
+def test_sibling_relationships_are_derived():
+    parser = GedcomParser("data/shakespeare.ged")
+    parser.parse_gedcom_file()
+
+    stored = parser.get_relationships()
+    assert not [rel for rel in stored if rel["Relationship"] == "sibling"]
+
+    siblings = [rel for rel in parser.iter_relationships() if rel["Relationship"] == "sibling"]
+    n_children = [len(family.children) for family in parser.families.values()]
+    assert len(siblings) == sum(n * (n - 1) for n in n_children)
+    assert {"Source": "I0001", "Target": "I0008", "Relationship": "sibling"} in siblings
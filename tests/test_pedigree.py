@@ -0,0 +1,54 @@
+import pytest
+
+from kinship.ancestor_index import AncestorIndex
+from kinship.family import Family
+from kinship.gedcom_parser import GedcomParser
+from kinship.graph import KinshipGraph
+from kinship.id_table import IdTable
+from kinship.individual import Individual
+from kinship.kinship_matrix import kinship_matrix
+from kinship.pedigree import inbreeding_coefficients, pedigree_collapse
+
+
+def person(xref_id):
+    return Individual(xref_id, xref_id)
+
+
+@pytest.fixture
+def inbred():
+    # A and B have children C and D; C marries their half-sibling E (A and X's child); D marries C's child G
+    people = {xref: person(xref) for xref in "ABCDEFGHX"}
+    families = {
+        "F1": Family.from_individuals("F1", people["A"], people["B"], children=[people["C"], people["D"]]),
+        "F2": Family.from_individuals("F2", people["A"], people["X"], children=[people["E"]]),
+        "F3": Family.from_individuals("F3", people["C"], people["E"], children=[people["F"], people["G"]]),
+        "F4": Family.from_individuals("F4", people["D"], people["G"], children=[people["H"]]),
+    }
+    ids = IdTable(people)
+    return KinshipGraph.from_families(families, ids)
+
+
+def test_inbreeding_matches_kinship(inbred):
+    coefficients = inbreeding_coefficients(inbred, AncestorIndex(inbred))
+    ids = inbred.ids
+    # Children of half-siblings
+    assert coefficients[ids.get("F")] == pytest.approx(1 / 8)
+    assert coefficients[ids.get("A")] == coefficients[ids.get("C")] == 0
+    # F = 2 * kinship with oneself - 1
+    nodes = list(range(len(ids)))
+    kinship = kinship_matrix(inbred, nodes)
+    assert list(coefficients) == pytest.approx([2 * kinship[node, node] - 1 for node in nodes])
+
+
+def test_inbreeding_of_outbred_tree():
+    parser = GedcomParser("data/shakespeare.ged")
+    parser.parse_gedcom_file()
+    graph = KinshipGraph.from_family_table(parser.families.table)
+    assert set(inbreeding_coefficients(graph, AncestorIndex(graph))) == {0}
+
+
+def test_pedigree_collapse(inbred):
+    ids = inbred.ids
+    # F's grandparents are A, B, A and X: four slots, three people
+    assert pedigree_collapse(inbred, ids.get("F")) == [(1, 2, 2), (2, 4, 3)]
+    assert pedigree_collapse(inbred, ids.get("A")) == []
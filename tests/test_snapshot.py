@@ -0,0 +1,77 @@
+import os
+import pickle
+
+import pytest
+
+from kinship.family_tree_data import FamilyTreeData
+from kinship.snapshot import SnapshotCache, SnapshotError, SNAPSHOT_MAGIC, read_snapshot_header
+from tests.helpers import derived_maps, fields
+
+
+def test_snapshot_round_trip(parsed, tmp_path):
+    path = str(tmp_path / "tree.snap")
+    parsed.save_snapshot(path)
+    loaded = FamilyTreeData().load_snapshot(path)
+
+    assert list(loaded.individuals) == list(parsed.individuals)
+    assert fields(loaded.individuals["I0001"]) == fields(parsed.individuals["I0001"])
+    assert loaded.families["F002"].wife_name == "Anne Hathaway"
+    assert [c.id for c in loaded.families["F002"].children] == ["I0005", "I0006", "I0007"]
+    assert loaded.families["F002"].children[0] == loaded.individuals["I0005"]
+    assert loaded.relationships == parsed.relationships
+    assert derived_maps(loaded.families, loaded.ids) == derived_maps(parsed.families, parsed.ids)
+
+
+def test_snapshot_keeps_analyses(shakespeare, tmp_path):
+    from kinship.relationship_manager import RelationshipManager
+    path = str(tmp_path / "tree.snap")
+    # Its own data, the analyses are stored on it
+    data = FamilyTreeData().load_from_gedcom(shakespeare)
+    RelationshipManager(data).inbreeding_coefficients()
+    data.save_snapshot(path)
+    loaded = FamilyTreeData().load_snapshot(path)
+    assert list(loaded.analyses["inbreeding"]) == list(data.analyses["inbreeding"])
+
+
+def test_snapshot_version_mismatch(parsed, tmp_path):
+    path = str(tmp_path / "old.snap")
+    with open(path, "wb") as file:
+        file.write(SNAPSHOT_MAGIC)
+        pickle.dump({"version": 0}, file)
+    with pytest.raises(SnapshotError):
+        FamilyTreeData().load_snapshot(path)
+
+
+def test_cache_hit_miss_and_eviction(parsed, tmp_path):
+    cache = SnapshotCache(str(tmp_path / "cache"))
+    assert not cache.get("data/shakespeare.ged", FamilyTreeData())
+
+    cache.put("data/shakespeare.ged", parsed)
+    warm = FamilyTreeData()
+    assert cache.get("data/shakespeare.ged", warm)
+    assert list(warm.families) == list(parsed.families)
+
+    cache.max_bytes = 0
+    cache.evict()
+    assert not cache.get("data/shakespeare.ged", FamilyTreeData())
+
+
+def test_malformed_snapshot_is_a_miss(parsed, tmp_path):
+    cache = SnapshotCache(str(tmp_path / "cache"))
+    cache.put("data/shakespeare.ged", parsed)
+    path = cache._snapshot_path(cache._digest("data/shakespeare.ged"))
+    with open(path, "rb") as file:
+        header = read_snapshot_header(file)
+    for body in ({"ids": []}, ["not", "a", "body"]):
+        with open(path, "wb") as file:
+            file.write(SNAPSHOT_MAGIC)
+            pickle.dump(header, file)
+            pickle.dump(body, file)
+        data = FamilyTreeData()
+        assert not cache.get("data/shakespeare.ged", data)
+        assert not os.path.exists(path) and not data.individuals
+        cache.put("data/shakespeare.ged", parsed)
+    with open(path, "r+b") as file:
+        file.truncate(os.path.getsize(path) // 2)
+    assert not cache.latest("data/shakespeare.ged", FamilyTreeData())
+    assert not os.path.exists(path)
@@ -0,0 +1,72 @@
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from kinship.family_tree_data import FamilyTreeData
+from kinship.relationship_manager import RelationshipManager
+from kinship.sqlite_store import SqliteError, SqliteStore
+from tests.helpers import fields
+
+
+@pytest.fixture(scope="module")
+def database(parsed, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("sqlite") / "tree.db")
+    parsed.save_sqlite(path)
+    return path
+
+
+def test_round_trip(parsed, database):
+    loaded = FamilyTreeData().load_sqlite(database)
+    assert list(loaded.individuals) == list(parsed.individuals)
+    assert list(loaded.families) == list(parsed.families)
+    for individual_id, ind in parsed.individuals.items():
+        assert fields(loaded.individuals[individual_id], as_text=True) == fields(ind, as_text=True)
+    family = loaded.families["F002"]
+    assert (family.husband_id, family.wife_id, family.wife_name) == ("I0001", "I0004", "Anne Hathaway")
+    assert [child.id for child in family.children] == ["I0005", "I0006", "I0007"]
+    assert "F999" not in loaded.families and len(loaded.individuals) == len(parsed.individuals)
+    assert {"Source": "I0001", "Target": "I0004", "Relationship": "spouse"} in \
+        loaded.store.relationships_of("I0001")
+
+
+def test_queries_match_in_memory(parsed, database):
+    in_memory = RelationshipManager(parsed)
+    manager = RelationshipManager(FamilyTreeData().load_sqlite(database))
+    for individual_id in parsed.individuals:
+        for depth in (1, 2, None):
+            assert manager.get_ancestors(individual_id, depth) == in_memory.get_ancestors(individual_id, depth)
+            assert manager.get_descendents(individual_id, depth) == in_memory.get_descendents(individual_id, depth)
+        assert sorted(manager.iter_ancestors(individual_id)) == sorted(in_memory.iter_ancestors(individual_id))
+        assert sorted(manager.iter_descendents(individual_id, depth=2)) == \
+            sorted(in_memory.iter_descendents(individual_id, depth=2))
+    assert len(list(manager.iter_descendents("I0003", max_nodes=2))) == 2
+    # Answered in SQL without reading the tree into memory
+    assert "graph" not in vars(manager)
+
+    assert manager.get_parents("I0001") == in_memory.get_parents("I0001")
+    assert "graph" in vars(manager)
+
+
+def _ancestors(store_and_id):
+    store, individual_id = store_and_id
+    return store.ancestors(individual_id, None)
+
+
+def test_workers_share_database(database):
+    store = SqliteStore(database)
+    ids = ["I0001", "I0005", "I0030"]
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        shared = list(pool.map(_ancestors, [(store, individual_id) for individual_id in ids]))
+    assert shared == [store.ancestors(individual_id, None) for individual_id in ids]
+
+
+def test_schema_version_mismatch(tmp_path):
+    path = str(tmp_path / "other.db")
+    sqlite3.connect(path).close()
+    with pytest.raises(SqliteError):
+        SqliteStore(path)
+    with open(path, "w") as file:
+        file.write("not a database")
+    with pytest.raises(SqliteError):
+        SqliteStore(path)